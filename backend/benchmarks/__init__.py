@@ -0,0 +1,2 @@
+# Benchmarks Module
+# Performance benchmarks for the watcher hot paths
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Measure CRITICAL dispatch latency on the EventBus behind a large low-priority backlog.
+
+Run from the backend directory:
+    python -m benchmarks.event_bus_lanes_bench [backlog]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from core.event_bus import EventBus, Event, EventPriority
+
+BACKLOG = 100_000
+CRITICAL_EVENTS = 200
+CRITICAL_INTERVAL = 0.002
+
+async def run(backlog: int = BACKLOG):
+    bus = EventBus(max_queue_size=backlog + CRITICAL_EVENTS, workers=4)
+
+    async def handler(event: Event):
+        await asyncio.sleep(0)
+
+    for event_type in ("noise", "alert"):
+        bus.subscribe(event_type, handler)
+
+    priorities = [EventPriority.LOW, EventPriority.MEDIUM, EventPriority.HIGH]
+    for i in range(backlog):
+        bus.publish_nowait(Event("noise", {'n': i}, priorities[i % 3], time.time()))
+
+    await bus.start_processing()
+    for i in range(CRITICAL_EVENTS):
+        bus.publish_nowait(Event("alert", {'n': i}, EventPriority.CRITICAL, time.time()))
+        await asyncio.sleep(CRITICAL_INTERVAL)
+    await bus.stop_processing()
+
+    lanes = bus.get_lane_stats()
+    return {
+        'backlog': backlog,
+        'remaining_backlog': bus.get_stats()['queued'],
+        'lanes': lanes
+    }
+
+def main():
+    backlog = int(sys.argv[1]) if len(sys.argv) > 1 else BACKLOG
+    print(json.dumps(asyncio.run(run(backlog)), indent=2))
+
+if __name__ == "__main__":
+    main()
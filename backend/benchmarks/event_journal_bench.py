@@ -0,0 +1,80 @@
+"""
+Measure EventJournal throughput: publish-side append, durable write and mmap replay.
+
+Run from the backend directory:
+    python -m benchmarks.event_journal_bench [events]
+"""
+
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from core.event_bus import EventBus, Event, EventPriority
+from core.event_journal import EventJournal
+
+EVENTS = 200_000
+
+def make_event(i: int) -> Event:
+    return Event("whale_transaction", {
+        'wallet_address': f"0x{i % 5000:040x}",
+        'amount': 125000.5 + i,
+        'tx_hash': f"0x{i:064x}",
+        'block_number': 1_000_000 + i // 100
+    }, EventPriority.HIGH, time.time())
+
+async def run(events: int = EVENTS):
+    directory = tempfile.mkdtemp(prefix="event_journal_bench_")
+    try:
+        batch = [make_event(i) for i in range(events)]
+
+        # Hot path: publish_nowait with and without a journal attached
+        bus = EventBus(max_queue_size=events)
+        start = time.perf_counter()
+        for event in batch:
+            bus.publish_nowait(event)
+        publish_seconds = time.perf_counter() - start
+
+        journal = EventJournal(directory, segment_bytes=16 * 1024 * 1024, retention_segments=None)
+        journal.start()
+        bus = EventBus(max_queue_size=events, journal=journal)
+        start = time.perf_counter()
+        for event in batch:
+            bus.publish_nowait(event)
+        journaled_publish_seconds = time.perf_counter() - start
+        journal.close()
+        durable_seconds = time.perf_counter() - start
+
+        received = 0
+        def handler(event: Event):
+            nonlocal received
+            received += 1
+
+        start = time.perf_counter()
+        await journal.replay_into(handler)
+        replay_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tail = sum(1 for _ in journal.replay(from_offset=events - events // 10))
+        tail_seconds = time.perf_counter() - start
+
+        return {
+            'events': events,
+            'publish_events_per_sec': round(events / publish_seconds),
+            'journaled_publish_events_per_sec': round(events / journaled_publish_seconds),
+            'durable_write_events_per_sec': round(events / durable_seconds),
+            'replay_events_per_sec': round(received / replay_seconds),
+            'tail_replay_events': tail,
+            'tail_replay_ms': round(tail_seconds * 1000, 1),
+            'journal': journal.get_stats()
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    print(json.dumps(asyncio.run(run(events)), indent=2))
+
+if __name__ == "__main__":
+    main()
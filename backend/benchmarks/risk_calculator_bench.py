@@ -0,0 +1,60 @@
+"""
+Compare per-event RiskCalculator.calculate_priority with calculate_priority_batch.
+
+Run from the backend directory:
+    python -m benchmarks.risk_calculator_bench [events]
+"""
+
+import json
+import sys
+import time
+import numpy as np
+from core.event_bus import EventPriority
+from core.risk_calculator import RiskCalculator
+
+EVENTS = 100_000
+EVENT_TYPES = np.array(['large_transaction', 'high_volume', 'balance_change'], dtype=object)
+
+def make_columns(events: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    return {
+        'transaction_size': rng.lognormal(11, 2, events),
+        'wallet_volume': rng.lognormal(12, 2, events),
+        'balance_change': rng.normal(0, 200_000, events),
+        'balance_percentage': rng.normal(0, 0.3, events),
+        'concurrent_events': rng.integers(0, 6, events),
+        'combined_risk_score': rng.uniform(0, 10, events),
+        'event_type': EVENT_TYPES[rng.integers(0, len(EVENT_TYPES), events)]
+    }
+
+def run(events: int = EVENTS):
+    calculator = RiskCalculator()
+    columns = make_columns(events)
+    names = list(columns)
+    rows = [dict(zip(names, values)) for values in zip(*(columns[name].tolist() for name in names))]
+
+    start = time.perf_counter()
+    per_event = [calculator.calculate_priority(row).value for row in rows]
+    per_event_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculator.calculate_priority_batch(**columns)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        'events': events,
+        'per_event_ms': round(per_event_seconds * 1000, 2),
+        'batch_ms': round(batch_seconds * 1000, 2),
+        'per_event_events_per_sec': round(events / per_event_seconds),
+        'batch_events_per_sec': round(events / batch_seconds),
+        'speedup': round(per_event_seconds / batch_seconds, 1),
+        'results_match': per_event == batch.tolist(),
+        'priority_counts': {priority.name: int((batch == priority.value).sum()) for priority in EventPriority}
+    }
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    print(json.dumps(run(events), indent=2))
+
+if __name__ == "__main__":
+    main()
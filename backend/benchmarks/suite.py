@@ -0,0 +1,316 @@
+"""
+Microbenchmark suite for the watcher hot paths, with fixed synthetic inputs.
+
+Run from the backend directory:
+    python -m benchmarks.suite [--quick] [--output results.json] [--compare baseline.json]
+
+Prints one JSON document: environment metadata plus, per benchmark, the
+operation count, best-of-repeats seconds, ns/op and ops/sec. With --compare,
+benchmarks whose ns/op grew by more than --tolerance over the baseline file
+are listed under "regressions" and the exit status is 1.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from config.settings import STABLECOIN_ADDRESSES, TRANSFER_EVENT_TOPIC
+from core.event_bus import EventBus, Event, EventPriority
+from core.risk_calculator import RiskCalculator
+from watcher.transaction_analyzer import TransactionAnalyzer
+from watcher.whale_tracker import WhaleTracker
+from benchmarks.whale_tracker_bench import make_wallets, populate
+
+SEED = 1329
+REPEATS = 5
+USDC_ADDRESS = STABLECOIN_ADDRESSES["USDC"]
+OTHER_CONTRACT = "0x" + "ab" * 20
+APPROVAL_TOPIC = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+
+def _topic(address: str) -> str:
+    return "0x" + address[2:].zfill(64)
+
+def best_of(repeats: int, body) -> float:
+    """Best wall time in seconds over repeats calls of body()"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def result(ops: int, seconds: float, **extra):
+    return {
+        'ops': ops,
+        'seconds': round(seconds, 6),
+        'ns_per_op': round(seconds / ops * 1e9, 1),
+        'ops_per_sec': round(ops / seconds),
+        **extra
+    }
+
+def make_receipt_logs(transactions: int, rng: random.Random):
+    """Per-transaction log lists: mostly USDC transfers, some foreign contract logs"""
+    wallets = make_wallets(5_000)
+    receipts = []
+    for index in range(transactions):
+        logs = []
+        for log_index in range(rng.choice((1, 1, 2, 3))):
+            contract = USDC_ADDRESS if rng.random() < 0.7 else OTHER_CONTRACT
+            topic0 = TRANSFER_EVENT_TOPIC if rng.random() < 0.9 else APPROVAL_TOPIC
+            logs.append({
+                "address": contract,
+                "topics": [topic0, _topic(rng.choice(wallets)), _topic(rng.choice(wallets))],
+                "data": "0x%064x" % rng.randrange(1, 10**12),
+                "blockNumber": hex(1_000_000 + index // 100),
+                "transactionHash": "0x%064x" % index,
+                "logIndex": hex(log_index)
+            })
+        receipts.append(("0x%064x" % index, logs))
+    return receipts
+
+def bench_transaction_analyzer(transactions: int, repeats: int):
+    analyzer = TransactionAnalyzer()
+    receipts = make_receipt_logs(transactions, random.Random(SEED))
+    logs = sum(len(receipt_logs) for _, receipt_logs in receipts)
+
+    def body():
+        for tx_hash, receipt_logs in receipts:
+            analyzer.analyze_transaction_logs(receipt_logs, tx_hash)
+
+    # The analyzer prints every transfer; keep that cost but not the output
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        seconds = best_of(repeats, body)
+    return result(logs, seconds, unit='log', transactions=transactions)
+
+def bench_decode_transfers(transactions: int, repeats: int):
+    analyzer = TransactionAnalyzer()
+    receipts = make_receipt_logs(transactions, random.Random(SEED))
+    logs = sum(len(receipt_logs) for _, receipt_logs in receipts)
+
+    def body():
+        batch = analyzer.new_batch()
+        for tx_hash, receipt_logs in receipts:
+            analyzer.decode_transfers(receipt_logs, batch, tx_hash, 1_000_000, 1_700_000_000.0)
+
+    return result(logs, best_of(repeats, body), unit='log', transactions=transactions)
+
+def bench_whale_tracker(cardinality: int, transfers: int, repeats: int):
+    wallets = make_wallets(cardinality)
+    rng = random.Random(SEED + cardinality)
+    samples = [
+        {
+            'value': rng.uniform(1, 50),
+            'tx_hash': "0x%064x" % i,
+            'from_address': wallets[rng.randrange(cardinality)],
+            'to_address': wallets[rng.randrange(cardinality)]
+        }
+        for i in range(transfers)
+    ]
+
+    best = float("inf")
+    for _ in range(repeats):
+        tracker = WhaleTracker()
+        tracker.event_bus = None
+        populate(tracker, wallets)
+        start = time.perf_counter()
+        for transfer in samples:
+            tracker.analyze_transfer(transfer)
+        best = min(best, time.perf_counter() - start)
+    return result(transfers, best, unit='transfer', wallets=cardinality)
+
+def bench_risk_calculator(events: int, repeats: int):
+    calculator = RiskCalculator()
+    rng = random.Random(SEED)
+    event_types = ['large_transaction', 'high_volume', 'balance_change']
+    indicators = [
+        {
+            'transaction_size': rng.lognormvariate(11, 2),
+            'wallet_volume': rng.lognormvariate(12, 2),
+            'balance_change': rng.gauss(0, 200_000),
+            'balance_percentage': rng.gauss(0, 0.3),
+            'concurrent_events': rng.randrange(6),
+            'event_type': rng.choice(event_types)
+        }
+        for _ in range(events)
+    ]
+
+    def body():
+        for row in indicators:
+            calculator.calculate_priority(row)
+
+    return result(events, best_of(repeats, body), unit='event')
+
+async def _event_bus_throughput(events: int) -> float:
+    bus = EventBus(max_queue_size=events)
+    done = asyncio.Event()
+    handled = 0
+
+    async def handler(event: Event):
+        nonlocal handled
+        handled += 1
+        if handled == events:
+            done.set()
+
+    bus.subscribe("bench", handler)
+    await bus.start_processing()
+    priorities = list(EventPriority)
+    start = time.perf_counter()
+    for i in range(events):
+        bus.publish_nowait(Event("bench", {'n': i}, priorities[i % len(priorities)], time.time()))
+    await done.wait()
+    seconds = time.perf_counter() - start
+    await bus.stop_processing()
+    return seconds
+
+async def _event_bus_latency(events: int):
+    """Publish one event at a time and time it until its handler runs"""
+    bus = EventBus()
+    latencies = []
+    delivered = None
+
+    async def handler(event: Event):
+        latencies.append(time.perf_counter() - event.data['sent'])
+        delivered.set()
+
+    bus.subscribe("bench", handler)
+    await bus.start_processing()
+    for i in range(events):
+        delivered = asyncio.Event()
+        bus.publish_nowait(Event("bench", {'sent': time.perf_counter()}, EventPriority.HIGH, time.time()))
+        await delivered.wait()
+    await bus.stop_processing()
+    latencies.sort()
+    return latencies
+
+def bench_event_bus(events: int, repeats: int):
+    seconds = min(asyncio.run(_event_bus_throughput(events)) for _ in range(repeats))
+    latencies = asyncio.run(_event_bus_latency(min(events, 2_000)))
+    return result(events, seconds, unit='event', latency_us={
+        'p50': round(latencies[len(latencies) // 2] * 1e6, 1),
+        'p99': round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        'max': round(latencies[-1] * 1e6, 1)
+    })
+
+def make_block_payloads(transactions: int, rng: random.Random):
+    """JSON-RPC response bodies for a full block and its receipts"""
+    wallets = make_wallets(5_000)
+    block_transactions, receipts = [], []
+    for index, (tx_hash, logs) in enumerate(make_receipt_logs(transactions, rng)):
+        block_transactions.append({
+            "hash": tx_hash, "from": rng.choice(wallets), "to": USDC_ADDRESS,
+            "blockNumber": "0xf4240", "transactionIndex": hex(index), "nonce": hex(rng.randrange(10**6)),
+            "gas": "0x186a0", "gasPrice": "0x3b9aca00", "value": "0x0",
+            "input": "0xa9059cbb" + "00" * 64
+        })
+        receipts.append({
+            "transactionHash": tx_hash, "blockNumber": "0xf4240", "status": "0x1",
+            "gasUsed": "0xcb20", "logsBloom": "0x" + "00" * 256, "logs": logs
+        })
+    block = {"jsonrpc": "2.0", "id": 1, "result": {
+        "number": "0xf4240", "hash": "0x" + "11" * 32, "timestamp": "0x65000000",
+        "logsBloom": "0x" + "00" * 256, "transactions": block_transactions
+    }}
+    receipts_batch = [{"jsonrpc": "2.0", "id": i, "result": receipt} for i, receipt in enumerate(receipts)]
+    return json.dumps(block).encode(), json.dumps(receipts_batch).encode()
+
+def bench_json_decode(transactions: int, repeats: int):
+    block_payload, receipts_payload = make_block_payloads(transactions, random.Random(SEED))
+    results = {}
+    for name, payload in (('block', block_payload), ('receipts', receipts_payload)):
+        seconds = best_of(repeats, lambda: json.loads(payload))
+        results[name] = result(1, seconds, unit='payload', transactions=transactions,
+                               payload_bytes=len(payload), mb_per_sec=round(len(payload) / seconds / 2**20, 1))
+    return results
+
+def environment():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'git_revision': revision,
+        'seed': SEED
+    }
+
+def run(quick: bool = False):
+    scale = 10 if quick else 1
+    repeats = 3 if quick else REPEATS
+    cardinalities = [1_000, 10_000, 100_000] if quick else [1_000, 10_000, 100_000, 1_000_000]
+    benchmarks = {
+        'transaction_analyzer.analyze_transaction_logs': bench_transaction_analyzer(20_000 // scale, repeats),
+        'transaction_analyzer.decode_transfers': bench_decode_transfers(20_000 // scale, repeats),
+        'risk_calculator.calculate_priority': bench_risk_calculator(100_000 // scale, repeats),
+        'event_bus.publish_to_handler': bench_event_bus(50_000 // scale, repeats)
+    }
+    for cardinality in cardinalities:
+        benchmarks[f'whale_tracker.analyze_transfer[{cardinality}]'] = bench_whale_tracker(
+            cardinality, 50_000 // scale, 1 if cardinality >= 100_000 else repeats
+        )
+    for name, decoded in bench_json_decode(2_000, repeats).items():
+        benchmarks[f'json.loads[{name}]'] = decoded
+    return {'environment': environment(), 'quick': quick, 'benchmarks': benchmarks}
+
+def compare(current, baseline, tolerance: float):
+    """Benchmarks whose ns/op grew by more than tolerance (a fraction) over the baseline.
+
+    Both runs must use the same input sizes, so a --quick run is only
+    comparable with a --quick baseline.
+    """
+    if baseline.get('quick', False) != current['quick']:
+        raise ValueError(f"baseline quick={baseline.get('quick', False)} but current run quick={current['quick']}; "
+                         "input sizes differ")
+    regressions = {}
+    for name, entry in current['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous:
+            continue
+        ratio = entry['ns_per_op'] / previous['ns_per_op']
+        if ratio > 1 + tolerance:
+            regressions[name] = {
+                'baseline_ns_per_op': previous['ns_per_op'],
+                'ns_per_op': entry['ns_per_op'],
+                'ratio': round(ratio, 2)
+            }
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the watcher microbenchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs and fewer repeats")
+    parser.add_argument("--output", help="Also write the results to this file")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed ns/op growth over the baseline")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Refuse before spending time on a run that cannot be compared
+        if baseline.get('quick', False) != args.quick:
+            parser.error(f"{args.compare} was run with{'' if baseline.get('quick') else 'out'} --quick; "
+                         f"rerun with{'' if baseline.get('quick') else 'out'} --quick to compare")
+
+    results = run(args.quick)
+    if baseline is not None:
+        results['regressions'] = compare(results, baseline, args.tolerance)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    print(document)
+    if results.get('regressions'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark WhaleTracker.analyze_transfer cost as wallet cardinality grows.
+
+Run from the backend directory:
+    python -m benchmarks.whale_tracker_bench [max_wallets]
+"""
+
+import random
+import sys
+import time
+from watcher.whale_tracker import WhaleTracker
+
+CARDINALITIES = [1_000, 10_000, 100_000, 1_000_000]
+MEASURED_TRANSFERS = 50_000
+
+def make_wallets(count: int):
+    return ["0x%040x" % i for i in range(count)]
+
+def populate(tracker: WhaleTracker, wallets):
+    """Give every wallet some in-window activity"""
+    for i in range(0, len(wallets) - 1, 2):
+        tracker.analyze_transfer({
+            'value': 1.0,
+            'tx_hash': "0x%064x" % i,
+            'from_address': wallets[i],
+            'to_address': wallets[i + 1]
+        })
+
+def bench_cardinality(wallet_count: int, transfers: int = MEASURED_TRANSFERS) -> float:
+    """Return mean microseconds per analyze_transfer with wallet_count tracked wallets"""
+    tracker = WhaleTracker()
+    tracker.event_bus = None
+    wallets = make_wallets(wallet_count)
+    populate(tracker, wallets)
+
+    rng = random.Random(wallet_count)
+    samples = [
+        {
+            'value': rng.uniform(1, 50),
+            'tx_hash': "0x%064x" % i,
+            'from_address': wallets[rng.randrange(wallet_count)],
+            'to_address': wallets[rng.randrange(wallet_count)]
+        }
+        for i in range(transfers)
+    ]
+
+    start = time.perf_counter()
+    for transfer in samples:
+        tracker.analyze_transfer(transfer)
+    elapsed = time.perf_counter() - start
+    return elapsed / transfers * 1e6
+
+def main():
+    max_wallets = int(sys.argv[1]) if len(sys.argv) > 1 else CARDINALITIES[-1]
+    print(f"{'wallets':>10} {'us/transfer':>12}")
+    for wallet_count in CARDINALITIES:
+        if wallet_count > max_wallets:
+            break
+        print(f"{wallet_count:>10,} {bench_cardinality(wallet_count):>12.2f}")
+
+if __name__ == "__main__":
+    main()
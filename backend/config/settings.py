@@ -1,27 +1,99 @@
 STABLECOIN_ADDRESSES = {
     "USDC": "0x3894085ef7ff0f0aedf52e2a2704928d1ec074f1",
 }
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_EVENT_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
 
 # RPC Configuration
 SEI_RPC_URL = "https://evm-rpc.sei-apis.com"
+SEI_FALLBACK_RPC_URLS = []  # Extra endpoints for the RPC pool, routed by health score
+RPC_REQUEST_TIMEOUT = 10
+RPC_MAX_RETRIES = 3
+RPC_HEDGING_ENABLED = False  # Race slow reads against a second endpoint after the primary's p95
+RPC_RECORD_PATH = None  # e.g. "data/session.jsonl.gz"; record all RPC traffic for python -m simulator.replay_server
+RPC_CACHE_ENABLED = True  # Cache final blocks and receipts (in memory, plus on disk if RPC_CACHE_DISK_PATH is set)
+RPC_CACHE_MEMORY_BYTES = 256 * 1024 * 1024
+RPC_CACHE_DISK_PATH = None  # e.g. "data/rpc_cache.sqlite3"
+RPC_CACHE_FINALITY_DEPTH = 1  # Blocks below the observed head before data is treated as final
+SEI_WS_URL = "wss://evm-ws.sei-apis.com"
 POLL_INTERVAL = 5
 USDC_DECIMALS = 6
 NETWORK = "sei"
+RPC_BATCH_MAX_SIZE = 100
+
+# Ingestion Settings
+INGESTION_MODE = "blocks"  # "blocks" (full blocks + receipts) or "logs" (eth_getLogs)
+LOGS_RANGE_INITIAL_CHUNK = 100
+LOGS_RANGE_MIN_CHUNK = 1
+LOGS_RANGE_MAX_CHUNK = 2000
+PIPELINE_WINDOW = 8  # Blocks fetched/decoded ahead of the in-order commit stage
+LOGS_BLOOM_PREFILTER_ENABLED = True  # Skip receipts of blocks whose logsBloom rules out a USDC Transfer (needs eth-hash with a backend)
+CHECKPOINT_ENABLED = True  # Persist the last committed block and resume from it on restart
+CHECKPOINT_PATH = "data/ingestion_checkpoint.json"
+CATCHUP_THRESHOLD_BLOCKS = 100  # Larger restart gaps are backfilled in the background while live blocks continue
+CATCHUP_CHUNK_BLOCKS = 2000  # Blocks per catch-up eth_getLogs range
+CATCHUP_CONCURRENCY = 4  # Catch-up ranges fetched ahead of the in-order commit
+CATCHUP_RETRY_DELAY = 5
+REPLAY_CHUNK_BLOCKS = 2000  # Blocks per eth_getLogs range in python replay.py
+REPLAY_CONCURRENCY = 4  # Replay ranges fetched ahead of the in-order commit
+BACKFILL_WORKERS = None  # Processes fetching and decoding backfill shards (None = one per CPU core)
+BACKFILL_SHARD_BLOCKS = 20000  # Blocks per backfill shard; each worker fetches its shard in REPLAY_CHUNK_BLOCKS ranges
+
+# Head Tracking Settings
+HEAD_SUBSCRIPTION_ENABLED = True  # eth_subscribe("newHeads") over SEI_WS_URL, polling as fallback
+HEAD_SUBSCRIBE_LOGS = False  # Also subscribe to USDC Transfer logs (used by the "logs" ingestion mode)
+HEAD_RECONNECT_MIN_DELAY = 1
+HEAD_RECONNECT_MAX_DELAY = 60
+HEAD_LOG_BUFFER_BLOCKS = 1000
 
 WHALE_SINGLE_TX_THRESHOLD = 100.0
 WHALE_VOLUME_THRESHOLD = 500000.0
 WHALE_TIME_WINDOW_MINUTES = 60
+WHALE_WINDOW_BUCKET_SECONDS = 1  # Expiry resolution of the volume window
+ADDRESS_REGISTRY_SWEEP_SECONDS = 300  # Free unheld address ids this often; deferred while decoded batches await their commit
 
 BALANCE_CHECK_THRESHOLD = 100.0
 BALANCE_MONITORING_ENABLED = True
 BALANCE_CHECK_INTERVAL_BLOCKS = 5
+BALANCE_LEDGER_ENABLED = True  # Seed balances once, then apply decoded transfers in memory
+BALANCE_RECONCILE_INTERVAL_BLOCKS = 50  # Ledger mode: blocks between sampled balanceOf reconciliations
+BALANCE_RECONCILE_SAMPLE_SIZE = 50
+BALANCE_MAX_MONITORED_WALLETS = 50000  # LRU cap on monitored wallets
+BALANCE_DEMOTE_AFTER_POLLS = 10  # Quiet polls at a priority before demoting one level
+BALANCE_WALLET_TTL_SECONDS = 6 * 60 * 60  # Quiet LOW-priority wallets are evicted after this
+BALANCE_POLL_BUDGET_PER_SECOND = 50  # balanceOf reads per second across all wallets
+BALANCE_POLL_BURST_SECONDS = 10  # Unused budget carried over, in seconds
+MULTICALL_ENABLED = True  # Snapshot balances through Multicall3 when it is deployed
+MULTICALL_BATCH_SIZE = 500  # balanceOf calls per aggregate3 call
 
 # Event Bus Settings
 EVENT_BUS_ENABLED = True
 EVENT_BUS_AUTO_START = True
 AI_ANALYSIS_ENABLED = False  # For Phase 1, will be enabled in Phase 2
 EVENT_QUEUE_MAX_SIZE = 1000
-EVENT_PROCESSING_TIMEOUT = 30
+EVENT_PROCESSING_TIMEOUT = 30  # Per-handler timeout in seconds
+EVENT_QUEUE_OVERFLOW_POLICY = "drop_lowest"  # "block", "drop_lowest" or "coalesce"
+EVENT_BUS_WORKERS = 4
+EVENT_TYPE_CONCURRENCY = {}  # e.g. {"balance_change": 1}; unlisted types use any free worker
+# Per-priority lane queue-wait deadlines; lanes past their deadline share dispatch by weight
+EVENT_LANE_DEADLINES_MS = {"CRITICAL": 5, "HIGH": 100, "MEDIUM": 1000, "LOW": 5000}
+# Dispatch share of overdue lanes below CRITICAL (CRITICAL always preempts)
+EVENT_LANE_WEIGHTS = {"HIGH": 8, "MEDIUM": 3, "LOW": 1}
+CORRELATION_ENABLED = True  # Correlate whale and balance events into multi_factor_risk events
+CORRELATION_WINDOW_SECONDS = 300
+CORRELATION_WALLET_MIN_SIGNALS = 3  # Signals for one wallet in the window (2 suffice if they differ in kind)
+CORRELATION_GLOBAL_MIN_WALLETS = 5  # Distinct active wallets in the window for a market-wide event
+CORRELATION_COOLDOWN_SECONDS = 60  # Re-emit for the same wallet or market only after this, unless the score rises
+CORRELATION_MAX_SIGNALS = 100_000  # Oldest signals are dropped beyond this
+CORRELATION_MAX_WALLETS = 20_000  # Least recently active wallets are evicted beyond this
+CORRELATION_MAX_SIGNALS_PER_WALLET = 64
+EVENT_JOURNAL_ENABLED = False  # Append every published event to an on-disk journal
+EVENT_JOURNAL_DIR = "data/event_journal"
+EVENT_JOURNAL_SEGMENT_BYTES = 64 * 1024 * 1024  # Roll over to a new segment file at this size
+EVENT_JOURNAL_FSYNC_INTERVAL_MS = 100  # fsync at least this often while writing...
+EVENT_JOURNAL_FSYNC_BATCH = 1000  # ...or after this many records
+EVENT_JOURNAL_RETENTION_SEGMENTS = 32  # Segments kept, including the active one (None for no limit)
+EVENT_JOURNAL_RETENTION_HOURS = 24 * 7  # Sealed segments older than this are deleted (None for no limit)
 
 # SERVER_PARAMS = StdioServerParameters(
 #     command="npx",
@@ -0,0 +1,115 @@
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+class AddressRegistry:
+    """Process-wide table mapping each 20-byte address to a compact integer id.
+
+    Any spelling resolves to the same id: checksummed or lowercase hex, or a
+    32-byte indexed topic. Each spelling is remembered after its first lookup,
+    so repeats cost one dict hit with no slicing or lowercasing.
+    addresses[id] is the canonical lowercase 0x form.
+
+    Components that key long-lived state by id hold it with retain() and
+    give it up with release(). sweep() frees ids nobody holds that were not
+    looked up since the previous sweep, and clears the spelling cache; freed
+    ids are reused. Code holding decoded batches that are not yet committed
+    does so inside pinned(), and sweep() does nothing while anything is pinned.
+    """
+
+    def __init__(self):
+        self.addresses: List[Optional[str]] = []
+        self.ids: Dict[bytes, int] = {}
+        self.spellings: Dict[str, int] = {}
+        self.refs: List[int] = []
+        # Sweep generation in which each id was last looked up
+        self.last_seen: List[int] = []
+        self.free_ids: List[int] = []
+        self.generation = 0
+        self.pins = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def id_of(self, value: str) -> int:
+        """Id for an address or indexed topic, interning it on first sight"""
+        address_id = self.spellings.get(value)
+        if address_id is None:
+            raw = bytes.fromhex(value[-40:])
+            address_id = self.ids.get(raw)
+            if address_id is None:
+                address_id = self._assign(raw)
+            # Spellings are cleared on every sweep, so each id in use is stamped once per generation
+            self.last_seen[address_id] = self.generation
+            self.spellings[value] = address_id
+        return address_id
+
+    def _assign(self, raw: bytes) -> int:
+        address = "0x" + raw.hex()
+        if self.free_ids:
+            address_id = self.free_ids.pop()
+            self.addresses[address_id] = address
+        else:
+            address_id = len(self.addresses)
+            self.addresses.append(address)
+            self.refs.append(0)
+            self.last_seen.append(0)
+        self.ids[raw] = address_id
+        return address_id
+
+    def get(self, value: str) -> Optional[int]:
+        """Id for an address if it has been interned, without interning it"""
+        address_id = self.spellings.get(value)
+        if address_id is None:
+            try:
+                address_id = self.ids.get(bytes.fromhex(value[-40:]))
+            except ValueError:
+                return None
+        return address_id
+
+    def address(self, address_id: int) -> str:
+        return self.addresses[address_id]
+
+    def retain(self, address_id: int):
+        self.refs[address_id] += 1
+
+    def release(self, address_id: int):
+        self.refs[address_id] -= 1
+
+    @contextmanager
+    def pinned(self):
+        """Keep every id in place while decoded batches wait for their commit"""
+        self.pins += 1
+        try:
+            yield
+        finally:
+            self.pins -= 1
+
+    def sweep(self) -> int:
+        """Free ids that are unheld and were not looked up in this or the previous generation"""
+        if self.pins:
+            return 0
+        self.spellings.clear()
+        self.generation += 1
+        cutoff = self.generation - 2
+        addresses, refs, last_seen = self.addresses, self.refs, self.last_seen
+        freed = 0
+        for address_id, address in enumerate(addresses):
+            if address is not None and refs[address_id] == 0 and last_seen[address_id] <= cutoff:
+                del self.ids[bytes.fromhex(address[2:])]
+                addresses[address_id] = None
+                self.free_ids.append(address_id)
+                freed += 1
+        return freed
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'addresses': len(self.ids),
+            'slots': len(self.addresses),
+            'free': len(self.free_ids),
+            'spellings': len(self.spellings),
+            'generation': self.generation,
+            'pins': self.pins
+        }
+
+# Global address registry instance
+address_registry = AddressRegistry()
@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from eth_hash.auto import keccak
+    keccak(b"")  # eth-hash picks its backend lazily; fail here if there is none
+except ImportError:
+    keccak = None
+
+BLOOM_BITS = 2048
+
+def bloom_mask(item: bytes) -> int:
+    """The three logsBloom bits for one address or topic, as an int mask.
+
+    Each bit is the low 11 bits of a byte pair from keccak256(item); reading
+    the 256-byte bloom as a big-endian int puts bit i at 1 << i.
+    """
+    digest = keccak(item)
+    mask = 0
+    for offset in (0, 2, 4):
+        mask |= 1 << (((digest[offset] << 8) | digest[offset + 1]) & (BLOOM_BITS - 1))
+    return mask
+
+def _hex_bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+def logs_bloom(logs: Iterable[Dict]) -> str:
+    """logsBloom hex for a list of logs, as a node computes it"""
+    bloom = 0
+    for log in logs:
+        bloom |= bloom_mask(_hex_bytes(log["address"]))
+        for topic in log.get("topics", []):
+            bloom |= bloom_mask(_hex_bytes(topic))
+    return "0x%0512x" % bloom
+
+class LogsBloomFilter:
+    """Tests block and receipt logsBloom values for a Transfer from any watched contract.
+
+    A negative answer is definite: no log in the block (or receipt) can match.
+    A positive one may be a false positive. A missing or malformed bloom is
+    treated as positive. Without a keccak implementation (eth-hash) the
+    filter is disabled and everything tests positive.
+    """
+
+    def __init__(self, addresses: List[str], topic: str):
+        self.enabled = keccak is not None
+        self.address_masks: List[int] = []
+        self.topic_mask = 0
+        if self.enabled:
+            self.address_masks = [bloom_mask(_hex_bytes(address)) for address in addresses]
+            self.topic_mask = bloom_mask(_hex_bytes(topic))
+        self.stats = {
+            'blocks_checked': 0,
+            'blocks_skipped': 0,
+            'receipts_skipped': 0,
+            'receipts_checked': 0,
+            'receipt_decodes_skipped': 0
+        }
+
+    def might_match(self, bloom_hex: Optional[str]) -> bool:
+        if not self.enabled or not bloom_hex:
+            return True
+        try:
+            bloom = int(bloom_hex, 16)
+        except (TypeError, ValueError):
+            return True
+        if bloom & self.topic_mask != self.topic_mask:
+            return False
+        return any(bloom & mask == mask for mask in self.address_masks)
+
+    def check_block(self, block_data: Dict) -> bool:
+        """False if the block cannot hold a watched Transfer; counts its skipped receipts"""
+        self.stats['blocks_checked'] += 1
+        if self.might_match(block_data.get("logsBloom")):
+            return True
+        self.stats['blocks_skipped'] += 1
+        self.stats['receipts_skipped'] += len(block_data.get("transactions", []))
+        return False
+
+    def check_receipt(self, receipt: Dict) -> bool:
+        """False if the receipt's logs cannot hold a watched Transfer"""
+        self.stats['receipts_checked'] += 1
+        if self.might_match(receipt.get("logsBloom")):
+            return True
+        self.stats['receipt_decodes_skipped'] += 1
+        return False
+
+    def get_stats(self) -> Dict:
+        checked = self.stats['blocks_checked']
+        return {
+            **self.stats,
+            'enabled': self.enabled,
+            'block_skip_rate': self.stats['blocks_skipped'] / checked if checked else 0.0
+        }
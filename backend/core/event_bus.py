@@ -1,8 +1,14 @@
 import asyncio
-from typing import Dict, List, Callable, Any, Optional
+import time
+from collections import deque
+from typing import Dict, List, Callable, Any, Optional, Hashable
 from dataclasses import dataclass
 from enum import Enum
 import logging
+from config.settings import (
+    EVENT_QUEUE_MAX_SIZE, EVENT_PROCESSING_TIMEOUT, EVENT_BUS_WORKERS,
+    EVENT_QUEUE_OVERFLOW_POLICY, EVENT_TYPE_CONCURRENCY, EVENT_LANE_DEADLINES_MS, EVENT_LANE_WEIGHTS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +18,9 @@ class EventPriority(Enum):
     HIGH = 3
     CRITICAL = 4
 
+# Lanes below CRITICAL, highest first; overdue ones share dispatch by weight
+WEIGHTED_LANES = [EventPriority.HIGH, EventPriority.MEDIUM, EventPriority.LOW]
+
 @dataclass
 class Event:
     event_type: str
@@ -19,70 +28,444 @@ class Event:
     priority: EventPriority
     timestamp: float
 
+class OverflowPolicy:
+    BLOCK = "block"                # publish() waits for space
+    # Evict the oldest event of the lowest queued priority at or below the new event's (possibly
+    # one of equal priority); the new event is rejected only if every queued event outranks it
+    DROP_LOWEST = "drop_lowest"
+    COALESCE = "coalesce"          # replace a queued event with the same coalesce key, else drop lowest
+
+class _QueuedEvent:
+    __slots__ = ('event', 'key', 'alive', 'enqueued_at')
+
+    def __init__(self, event: Event, key: Optional[Hashable]):
+        self.event = event
+        self.key = key
+        self.alive = True
+        self.enqueued_at = time.monotonic()
+
+class LaneStats:
+    """Queue-wait metrics for one priority lane"""
+
+    def __init__(self, deadline: float, samples: int = 4096):
+        self.deadline = deadline
+        self.dispatched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.deadline_misses = 0
+        self.recent_waits = deque(maxlen=samples)
+
+    def record(self, wait: float):
+        self.dispatched += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if wait > self.deadline:
+            self.deadline_misses += 1
+        self.recent_waits.append(wait)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.recent_waits:
+            return 0.0
+        ordered = sorted(self.recent_waits)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'dispatched': self.dispatched,
+            'deadline_ms': self.deadline * 1000,
+            'mean_wait_ms': (self.total_wait / self.dispatched * 1000) if self.dispatched else 0.0,
+            'p50_wait_ms': self.percentile(0.50) * 1000,
+            'p99_wait_ms': self.percentile(0.99) * 1000,
+            'max_wait_ms': self.max_wait * 1000,
+            'deadline_misses': self.deadline_misses
+        }
+
+class BatchSubscription:
+    """Buffer of events waiting to be delivered to a batch handler"""
+
+    def __init__(self, event_type: str, handler: Callable, max_batch: int, max_wait: float):
+        self.event_type = event_type
+        self.handler = handler
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.buffer: List[Event] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        self.delivery_lock = asyncio.Lock()
+
+def default_coalesce_key(event: Event) -> Optional[Hashable]:
+    """Events about the same wallet and type supersede each other"""
+    wallet_address = event.data.get('wallet_address')
+    if wallet_address is None:
+        return None
+    return (event.event_type, wallet_address)
+
 class EventBus:
-    def __init__(self):
+    def __init__(self, max_queue_size: int = EVENT_QUEUE_MAX_SIZE,
+                 overflow_policy: str = EVENT_QUEUE_OVERFLOW_POLICY,
+                 workers: int = EVENT_BUS_WORKERS,
+                 handler_timeout: Optional[float] = EVENT_PROCESSING_TIMEOUT,
+                 coalesce_key: Callable[[Event], Optional[Hashable]] = default_coalesce_key,
+                 journal=None):
         self.subscribers: Dict[str, List[Callable]] = {}
-        self.event_queue = asyncio.PriorityQueue()
+        self.batch_subscribers: Dict[str, List[BatchSubscription]] = {}
+        self.max_queue_size = max(1, max_queue_size)
+        self.overflow_policy = overflow_policy
+        self.worker_count = max(1, workers)
+        self.handler_timeout = handler_timeout
+        self.coalesce_key = coalesce_key
+        self.journal = journal  # Optional EventJournal; every published event is appended
+        # One FIFO lane per priority, see _dequeue for the dispatch order
+        self.queues: Dict[EventPriority, deque] = {priority: deque() for priority in EventPriority}
+        self.lane_deadlines = {
+            priority: EVENT_LANE_DEADLINES_MS[priority.name] / 1000 for priority in EventPriority
+        }
+        self.lane_weights = {
+            priority: EVENT_LANE_WEIGHTS[priority.name] for priority in WEIGHTED_LANES
+        }
+        self.lane_credits = {priority: 0 for priority in WEIGHTED_LANES}
+        self.lane_stats = {priority: LaneStats(self.lane_deadlines[priority]) for priority in EventPriority}
+        self.queued_by_key: Dict[Hashable, _QueuedEvent] = {}
+        self.queue_size = 0
+        self.type_concurrency: Dict[str, int] = dict(EVENT_TYPE_CONCURRENCY)
+        self.type_in_flight: Dict[str, int] = {}
+        # Events of types at their concurrency limit, set aside per type and priority until a slot frees
+        self.held: Dict[str, Dict[EventPriority, deque]] = {}
+        self.not_empty: Optional[asyncio.Event] = None
+        self.not_full: Optional[asyncio.Event] = None
         self.running = False
-        self.processor_task: Optional[asyncio.Task] = None
+        self.worker_tasks: List[asyncio.Task] = []
         self.event_counter = 0
-    
+        self.stats = {
+            'published': 0,
+            'dropped': 0,
+            'coalesced': 0,
+            'handled': 0,
+            'batches_delivered': 0,
+            'handler_errors': 0,
+            'handler_timeouts': 0
+        }
+
     def subscribe(self, event_type: str, handler: Callable[[Event], None]):
         """Subscribe a handler to specific event type"""
         if event_type not in self.subscribers:
             self.subscribers[event_type] = []
         self.subscribers[event_type].append(handler)
         logger.info(f"Handler subscribed to {event_type}")
-    
+
+    def subscribe_batch(self, event_type: str, handler: Callable[[List[Event]], None],
+                        max_batch: int = 100, max_wait_ms: float = 50):
+        """Subscribe a handler that receives events as lists.
+
+        A batch is delivered when it reaches max_batch events or max_wait_ms
+        after its first event, whichever comes first.
+        """
+        subscription = BatchSubscription(event_type, handler, max_batch, max_wait_ms / 1000)
+        self.batch_subscribers.setdefault(event_type, []).append(subscription)
+        logger.info(f"Batch handler subscribed to {event_type} (max_batch={max_batch}, max_wait_ms={max_wait_ms})")
+        return subscription
+
+    def set_concurrency(self, event_type: str, limit: int):
+        """Cap how many events of a type are handled at once"""
+        self.type_concurrency[event_type] = max(1, limit)
+        if self.not_empty is not None:
+            self._release_held(event_type)
+
+    def attach_journal(self, journal):
+        """Record every published event, including ones later dropped, in a journal"""
+        self.journal = journal
+
     async def publish(self, event: Event):
-        """Publish an event to the bus"""
+        """Publish an event to the bus, waiting for space under the block policy"""
+        self._ensure_signals()
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            if self.journal:
+                self.journal.append(event)
+            while self.queue_size >= self.max_queue_size:
+                self.not_full.clear()
+                await self.not_full.wait()
+            self._enqueue(event)
+            return True
+        return self.publish_nowait(event)
+
+    def publish_nowait(self, event: Event) -> bool:
+        """Publish without awaiting; safe from sync code running on the event loop.
+
+        When the queue is full the block policy degrades to drop_lowest.
+        Returns False if the event was dropped.
+        """
+        self._ensure_signals()
+        if self.journal:
+            self.journal.append(event)
+        key = self.coalesce_key(event) if self.overflow_policy == OverflowPolicy.COALESCE else None
+
+        if key is not None and key in self.queued_by_key:
+            queued = self.queued_by_key[key]
+            if event.priority.value <= queued.event.priority.value:
+                queued.event = event
+                self.stats['coalesced'] += 1
+                self.stats['published'] += 1
+                return True
+            # Escalated priority: move it to the higher lane
+            self._forget(queued)
+            self.stats['coalesced'] += 1
+
+        if self.queue_size >= self.max_queue_size and not self._drop_lowest(event.priority):
+            self.stats['dropped'] += 1
+            logger.warning(f"Event queue full, dropped {event.event_type} event with {event.priority.name} priority")
+            return False
+
+        self._enqueue(event, key)
+        return True
+
+    def _enqueue(self, event: Event, key: Optional[Hashable] = None):
+        queued = _QueuedEvent(event, key)
+        self.queues[event.priority].append(queued)
+        if key is not None:
+            self.queued_by_key[key] = queued
+        self.queue_size += 1
         self.event_counter += 1
-        await self.event_queue.put((event.priority.value, self.event_counter, event))
+        self.stats['published'] += 1
+        self.not_empty.set()
         logger.debug(f"Published {event.event_type} event with {event.priority.name} priority")
-    
+
+    def _drop_lowest(self, incoming: EventPriority) -> bool:
+        """Evict the oldest event of the lowest queued priority below or equal to the incoming one"""
+        for priority in EventPriority:
+            if priority.value > incoming.value:
+                return False
+            queues = [self.queues[priority]] + [
+                held[priority] for held in self.held.values() if priority in held
+            ]
+            for queue in queues:
+                while queue:
+                    queued = queue.popleft()
+                    if queued.alive:
+                        self._forget(queued)
+                        self.stats['dropped'] += 1
+                        return True
+        return False
+
+    def _forget(self, queued: _QueuedEvent):
+        """Mark a queued event dead; it is skipped when its lane reaches it"""
+        queued.alive = False
+        if queued.key is not None and self.queued_by_key.get(queued.key) is queued:
+            del self.queued_by_key[queued.key]
+        self.queue_size -= 1
+        self.not_full.set()
+
+    def _lane_head(self, priority: EventPriority) -> Optional[_QueuedEvent]:
+        """First live event of the lane whose type has a free slot; others are moved to held"""
+        queue = self.queues[priority]
+        while queue:
+            queued = queue[0]
+            if not queued.alive:
+                queue.popleft()
+                continue
+            event_type = queued.event.event_type
+            limit = self.type_concurrency.get(event_type)
+            if limit is not None and self.type_in_flight.get(event_type, 0) >= limit:
+                held = self.held.setdefault(event_type, {})
+                held.setdefault(priority, deque()).append(queue.popleft())
+                continue
+            return queued
+        return None
+
+    def _release_held(self, event_type: str):
+        """Return held events of a type to the front of their lanes while it has free slots"""
+        held = self.held.get(event_type)
+        if not held:
+            return
+        limit = self.type_concurrency.get(event_type)
+        free = self.queue_size if limit is None else limit - self.type_in_flight.get(event_type, 0)
+        for priority in sorted(held, key=lambda priority: priority.value, reverse=True):
+            queue = held[priority]
+            released = []
+            while queue and free > 0:
+                queued = queue.popleft()
+                if queued.alive:
+                    released.append(queued)
+                    free -= 1
+            # Held events are older than anything queued behind them in their lane
+            self.queues[priority].extendleft(reversed(released))
+        for priority in [priority for priority, queue in held.items() if not queue]:
+            del held[priority]
+        if not held:
+            del self.held[event_type]
+        self.not_empty.set()
+
+    def _finish(self, event: Event):
+        """Free the event's type slot taken in _take"""
+        event_type = event.event_type
+        if event_type in self.type_in_flight:
+            self.type_in_flight[event_type] -= 1
+            if not self.type_in_flight[event_type]:
+                del self.type_in_flight[event_type]
+            self._release_held(event_type)
+
+    def _dequeue(self) -> Optional[Event]:
+        """Pick the next event across lanes.
+
+        CRITICAL always preempts. Lanes whose head has outlived its deadline
+        share dispatch by weight with the highest non-empty lane, so a backlog
+        in one lane cannot starve the others and a fresh higher-priority event
+        never waits behind an overdue lower lane; with nothing overdue, the
+        highest non-empty lane goes first. Events whose type is at its
+        concurrency limit are held back, so workers only take events they can
+        handle right away; the caller passes each taken event to _finish.
+        """
+        now = time.monotonic()
+        if self._lane_head(EventPriority.CRITICAL):
+            return self._take(EventPriority.CRITICAL, now)
+
+        ready = [priority for priority in WEIGHTED_LANES if self._lane_head(priority)]
+        if not ready:
+            return None
+
+        overdue = [
+            priority for priority in ready
+            if now - self.queues[priority][0].enqueued_at > self.lane_deadlines[priority]
+        ]
+        if not overdue:
+            return self._take(ready[0], now)
+        if overdue[0] is not ready[0]:
+            overdue.insert(0, ready[0])
+
+        # Smooth weighted round robin over the overdue lanes and the highest ready one
+        total = 0
+        for priority in overdue:
+            self.lane_credits[priority] += self.lane_weights[priority]
+            total += self.lane_weights[priority]
+        chosen = max(overdue, key=lambda priority: self.lane_credits[priority])
+        self.lane_credits[chosen] -= total
+        return self._take(chosen, now)
+
+    def _take(self, priority: EventPriority, now: float) -> Event:
+        queued = self.queues[priority].popleft()
+        self._forget(queued)
+        self.lane_stats[priority].record(now - queued.enqueued_at)
+        event_type = queued.event.event_type
+        if event_type in self.type_concurrency:
+            self.type_in_flight[event_type] = self.type_in_flight.get(event_type, 0) + 1
+        return queued.event
+
+    def _ensure_signals(self):
+        if self.not_empty is None:
+            self.not_empty = asyncio.Event()
+            self.not_full = asyncio.Event()
+            self.not_full.set()
+
     async def start_processing(self):
-        """Start the event processing loop"""
+        """Start the event processing workers"""
         if self.running:
             return
-        
+
+        self._ensure_signals()
         self.running = True
-        self.processor_task = asyncio.create_task(self._process_events())
-        logger.info("Event bus started processing")
-    
+        self.worker_tasks = [
+            asyncio.create_task(self._process_events()) for _ in range(self.worker_count)
+        ]
+        logger.info(f"Event bus started processing with {self.worker_count} workers")
+
     async def stop_processing(self):
-        """Stop the event processing loop"""
+        """Stop the event processing workers"""
         self.running = False
-        if self.processor_task:
-            self.processor_task.cancel()
+        for task in self.worker_tasks:
+            task.cancel()
+        for task in self.worker_tasks:
             try:
-                await self.processor_task
+                await task
             except asyncio.CancelledError:
                 pass
+        self.worker_tasks = []
+        await self.flush_batches()
         logger.info("Event bus stopped processing")
-    
+
     async def _process_events(self):
-        """Internal event processing loop"""
+        """Worker loop: take the highest-priority queued event and dispatch it"""
         while self.running:
+            event = self._dequeue()
+            if event is None:
+                self.not_empty.clear()
+                await self.not_empty.wait()
+                continue
             try:
-                _, _, event = await asyncio.wait_for(self.event_queue.get(), timeout=1.0)
                 await self._handle_event(event)
-            except asyncio.TimeoutError:
-                continue
             except Exception as e:
                 logger.error(f"Error processing event: {e}")
-    
+            finally:
+                self._finish(event)
+
     async def _handle_event(self, event: Event):
-        """Handle a single event by calling all subscribers"""
+        """Handle a single event by calling all subscribers concurrently"""
         handlers = self.subscribers.get(event.event_type, [])
-        
-        for handler in handlers:
-            try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(event)
-                else:
-                    handler(event)
-            except Exception as e:
-                logger.error(f"Error in event handler: {e}")
+        batch_subscriptions = self.batch_subscribers.get(event.event_type, [])
+        if not handlers and not batch_subscriptions:
+            return
+
+        await self._dispatch(event, handlers, batch_subscriptions)
+        self.stats['handled'] += 1
+
+    async def _dispatch(self, event: Event, handlers: List[Callable], batch_subscriptions: List["BatchSubscription"]):
+        calls = [self._call_handler(handler, event, event.event_type) for handler in handlers]
+        for subscription in batch_subscriptions:
+            subscription.buffer.append(event)
+            if len(subscription.buffer) >= subscription.max_batch:
+                # The worker that fills a batch delivers it, which applies backpressure
+                calls.append(self._flush_batch(subscription))
+            elif subscription.flush_task is None:
+                subscription.flush_task = asyncio.create_task(self._flush_after(subscription))
+        await asyncio.gather(*calls)
+
+    async def _flush_after(self, subscription: "BatchSubscription"):
+        await asyncio.sleep(subscription.max_wait)
+        subscription.flush_task = None
+        await self._flush_batch(subscription)
+
+    async def _flush_batch(self, subscription: "BatchSubscription"):
+        if subscription.flush_task is not None and subscription.flush_task is not asyncio.current_task():
+            subscription.flush_task.cancel()
+        subscription.flush_task = None
+
+        batch, subscription.buffer = subscription.buffer, []
+        if not batch:
+            return
+        # Lock is FIFO, so batches reach the handler in the order they were cut
+        async with subscription.delivery_lock:
+            await self._call_handler(subscription.handler, batch, subscription.event_type)
+        self.stats['batches_delivered'] += 1
+
+    async def flush_batches(self):
+        """Deliver every partially filled batch now"""
+        for subscriptions in self.batch_subscribers.values():
+            for subscription in subscriptions:
+                await self._flush_batch(subscription)
+
+    async def _call_handler(self, handler: Callable, payload: Any, event_type: str):
+        try:
+            if asyncio.iscoroutinefunction(handler):
+                await asyncio.wait_for(handler(payload), timeout=self.handler_timeout)
+            else:
+                handler(payload)
+        except asyncio.TimeoutError:
+            self.stats['handler_timeouts'] += 1
+            logger.error(f"Event handler {getattr(handler, '__name__', handler)} timed out on {event_type}")
+        except Exception as e:
+            self.stats['handler_errors'] += 1
+            logger.error(f"Error in event handler: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, queued=self.queue_size)
+
+    def get_lane_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-lane queue-wait metrics, keyed by priority name"""
+        return {
+            priority.name: dict(self.lane_stats[priority].to_dict(), queued=sum(
+                1 for queued in self.queues[priority] if queued.alive
+            ) + sum(
+                1 for held in self.held.values() for queued in held.get(priority, ()) if queued.alive
+            ))
+            for priority in EventPriority
+        }
 
 # Global event bus instance
-event_bus = EventBus()
\ No newline at end of file
+event_bus = EventBus()
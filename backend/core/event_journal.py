@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Iterator, List, Optional, Tuple
+from core.event_bus import Event, EventPriority
+from config.settings import (
+    EVENT_JOURNAL_SEGMENT_BYTES, EVENT_JOURNAL_FSYNC_INTERVAL_MS, EVENT_JOURNAL_FSYNC_BATCH,
+    EVENT_JOURNAL_RETENTION_SEGMENTS, EVENT_JOURNAL_RETENTION_HOURS
+)
+
+logger = logging.getLogger(__name__)
+
+# length, crc32 of the payload, offset, event timestamp
+RECORD_HEADER = struct.Struct(">IIQd")
+SEGMENT_SUFFIX = ".log"
+
+def encode_event(event: Event) -> bytes:
+    return json.dumps(
+        [event.event_type, event.priority.value, event.data],
+        separators=(",", ":"), default=str
+    ).encode()
+
+def decode_event(payload: bytes, timestamp: float) -> Event:
+    event_type, priority, data = json.loads(payload)
+    return Event(event_type, data, EventPriority(priority), timestamp)
+
+def _segment_name(base_offset: int) -> str:
+    return f"{base_offset:020d}{SEGMENT_SUFFIX}"
+
+def _list_segments(directory: str) -> List[Tuple[int, str]]:
+    """(base_offset, path) of every segment, oldest first"""
+    segments = []
+    for name in os.listdir(directory):
+        if name.endswith(SEGMENT_SUFFIX):
+            segments.append((int(name[:-len(SEGMENT_SUFFIX)]), os.path.join(directory, name)))
+    return sorted(segments)
+
+def _scan_records(buffer, start: int = 0) -> Iterator[Tuple[int, int, float, int, int]]:
+    """Yield (position, offset, timestamp, payload_start, payload_end) for every intact record"""
+    position = start
+    size = len(buffer)
+    while position + RECORD_HEADER.size <= size:
+        length, crc, offset, timestamp = RECORD_HEADER.unpack_from(buffer, position)
+        payload_start = position + RECORD_HEADER.size
+        payload_end = payload_start + length
+        if length == 0 or payload_end > size or zlib.crc32(buffer[payload_start:payload_end]) != crc:
+            return  # torn tail from a crash mid-write
+        yield position, offset, timestamp, payload_start, payload_end
+        position = payload_end
+
+class EventJournal:
+    """Append-only, segmented on-disk log of published events.
+
+    append() only hands the event to a deque; a writer thread encodes the
+    records as length + crc32 + offset + timestamp + JSON payload, writes
+    them to the active segment and fsyncs every fsync_batch records or
+    fsync_interval_ms, whichever comes first. Segments roll over at
+    segment_bytes and are named by the offset of their first record; the
+    oldest are deleted past the retention limits. replay() reads sealed and
+    active segments through mmap.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = EVENT_JOURNAL_SEGMENT_BYTES,
+                 fsync_interval_ms: float = EVENT_JOURNAL_FSYNC_INTERVAL_MS,
+                 fsync_batch: int = EVENT_JOURNAL_FSYNC_BATCH,
+                 retention_segments: Optional[int] = EVENT_JOURNAL_RETENTION_SEGMENTS,
+                 retention_hours: Optional[float] = EVENT_JOURNAL_RETENTION_HOURS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.fsync_batch = max(1, fsync_batch)
+        self.retention_segments = retention_segments
+        self.retention_seconds = retention_hours * 3600 if retention_hours else None
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.writer_thread: Optional[threading.Thread] = None
+        self.closing = False
+        self.segment_file = None
+        self.segment_base = 0
+        self.segment_size = 0
+        self.next_offset = 0
+        self.last_written = -1
+        self.durable_offset = -1  # last offset known to be fsynced
+        self.stats = {'appended': 0, 'written': 0, 'fsyncs': 0, 'segments_rolled': 0, 'segments_deleted': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        """Find the next offset and cut any torn record off the last segment"""
+        segments = _list_segments(self.directory)
+        if not segments:
+            self._open_segment(0)
+            return
+
+        base_offset, path = segments[-1]
+        valid_end, next_offset = 0, base_offset
+        with open(path, "rb") as segment:
+            data = segment.read()
+        for _, offset, _, _, payload_end in _scan_records(data):
+            valid_end, next_offset = payload_end, offset + 1
+        if valid_end < len(data):
+            logger.warning(f"Truncating {len(data) - valid_end} bytes of torn records from {path}")
+            with open(path, "r+b") as segment:
+                segment.truncate(valid_end)
+
+        self.next_offset = next_offset
+        self.last_written = self.durable_offset = next_offset - 1
+        self.segment_base = base_offset
+        self.segment_file = open(path, "ab")
+        self.segment_size = valid_end
+
+    def _open_segment(self, base_offset: int):
+        self.segment_base = base_offset
+        self.segment_file = open(os.path.join(self.directory, _segment_name(base_offset)), "ab")
+        self.segment_size = 0
+
+    def start(self):
+        if self.writer_thread is None:
+            self.closing = False
+            self.writer_thread = threading.Thread(target=self._write_loop, name="event-journal", daemon=True)
+            self.writer_thread.start()
+
+    def close(self):
+        """Drain pending records, fsync and stop the writer"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        if self.writer_thread:
+            self.writer_thread.join()
+            self.writer_thread = None
+        else:
+            self._drain()
+        self._fsync()
+        self.segment_file.close()
+
+    def append(self, event: Event) -> int:
+        """Queue an event for the writer thread and return its offset"""
+        offset = self.next_offset
+        self.next_offset += 1
+        self.pending.append((offset, event))
+        self.stats['appended'] += 1
+        if len(self.pending) >= self.fsync_batch:
+            with self.condition:
+                self.condition.notify()
+        return offset
+
+    def _write_loop(self):
+        last_fsync = time.monotonic()
+        unsynced = 0
+        while True:
+            with self.condition:
+                if not self.pending and not self.closing:
+                    self.condition.wait(self.fsync_interval)
+                closing = self.closing
+            unsynced += self._drain()
+            now = time.monotonic()
+            if unsynced and (unsynced >= self.fsync_batch or now - last_fsync >= self.fsync_interval):
+                self._fsync()
+                last_fsync, unsynced = now, 0
+            if closing and not self.pending:
+                return
+
+    def _drain(self) -> int:
+        written = 0
+        chunks = []
+        # Bounded so a sustained publish rate cannot postpone the fsync check
+        for _ in range(min(len(self.pending), self.fsync_batch)):
+            offset, event = self.pending.popleft()
+            payload = encode_event(event)
+            record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload), offset, event.timestamp) + payload
+            if self.segment_size and self.segment_size + len(record) > self.segment_bytes:
+                self._flush(chunks)
+                chunks = []
+                self._roll(offset)
+            chunks.append(record)
+            self.segment_size += len(record)
+            self.last_written = offset
+            written += 1
+        self._flush(chunks)
+        self.stats['written'] += written
+        return written
+
+    def _flush(self, chunks: List[bytes]):
+        if chunks:
+            self.segment_file.write(b"".join(chunks))
+            self.segment_file.flush()
+
+    def _fsync(self):
+        if self.segment_file.closed:
+            return
+        self.segment_file.flush()
+        os.fsync(self.segment_file.fileno())
+        self.durable_offset = self.last_written
+        self.stats['fsyncs'] += 1
+
+    def _roll(self, base_offset: int):
+        self._fsync()
+        self.segment_file.close()
+        self._open_segment(base_offset)
+        self.stats['segments_rolled'] += 1
+        self._apply_retention()
+
+    def _apply_retention(self):
+        sealed = _list_segments(self.directory)[:-1]
+        expired = []
+        if self.retention_segments is not None and len(sealed) + 1 > self.retention_segments:
+            expired = sealed[:len(sealed) + 1 - self.retention_segments]
+        if self.retention_seconds is not None:
+            cutoff = time.time() - self.retention_seconds
+            expired += [segment for segment in sealed[len(expired):] if os.path.getmtime(segment[1]) < cutoff]
+        for _, path in expired:
+            os.remove(path)
+            self.stats['segments_deleted'] += 1
+
+    def replay(self, from_offset: Optional[int] = None,
+               from_timestamp: Optional[float] = None) -> Iterator[Tuple[int, Event]]:
+        """Yield (offset, event) for written records at or after the offset and/or timestamp"""
+        return replay_journal(self.directory, from_offset, from_timestamp)
+
+    async def replay_into(self, handler: Callable, from_offset: Optional[int] = None,
+                          from_timestamp: Optional[float] = None, event_type: Optional[str] = None) -> int:
+        return await replay_into(handler, self.directory, from_offset, from_timestamp, event_type)
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'pending': len(self.pending),
+            'next_offset': self.next_offset,
+            'durable_offset': self.durable_offset,
+            'segment_base': self.segment_base
+        }
+
+def replay_journal(directory: str, from_offset: Optional[int] = None,
+                   from_timestamp: Optional[float] = None) -> Iterator[Tuple[int, Event]]:
+    """Read a journal directory through mmap, segment by segment.
+
+    Segments are skipped by their first offset or timestamp, which assumes
+    events are published in roughly timestamp order.
+    """
+    segments = _list_segments(directory)
+    for index, (base_offset, path) in enumerate(segments):
+        if from_offset is not None and index + 1 < len(segments) and segments[index + 1][0] <= from_offset:
+            continue  # every record in this segment is older than from_offset
+        if from_timestamp is not None and index + 1 < len(segments):
+            next_first = _first_timestamp(segments[index + 1][1])
+            if next_first is not None and next_first <= from_timestamp:
+                continue
+
+        with open(path, "rb") as segment:
+            if os.fstat(segment.fileno()).st_size == 0:
+                continue
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for _, offset, timestamp, payload_start, payload_end in _scan_records(buffer):
+                    if from_offset is not None and offset < from_offset:
+                        continue
+                    if from_timestamp is not None and timestamp < from_timestamp:
+                        continue
+                    yield offset, decode_event(buffer[payload_start:payload_end], timestamp)
+
+def _first_timestamp(path: str) -> Optional[float]:
+    with open(path, "rb") as segment:
+        header = segment.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    return RECORD_HEADER.unpack(header)[3]
+
+async def replay_into(handler: Callable, directory: str, from_offset: Optional[int] = None,
+                      from_timestamp: Optional[float] = None, event_type: Optional[str] = None) -> int:
+    """Feed journaled events straight to a subscriber, bypassing the bus queue. Returns the count"""
+    is_async = asyncio.iscoroutinefunction(handler)
+    replayed = 0
+    for _, event in replay_journal(directory, from_offset, from_timestamp):
+        if event_type is not None and event.event_type != event_type:
+            continue
+        if is_async:
+            await handler(event)
+        else:
+            handler(event)
+        replayed += 1
+    return replayed
@@ -81,6 +81,7 @@ class MultiFactorEventData:
 
 class EventTypes:
     WHALE_ACTIVITY = "whale_activity"
+    HISTORICAL_WHALE_ACTIVITY = "historical_whale_activity"  # Found while catching up on missed blocks
     LARGE_TRANSACTION = "large_transaction"
     BALANCE_CHANGE = "balance_change"
     MULTI_FACTOR_RISK = "multi_factor_risk"
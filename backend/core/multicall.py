@@ -0,0 +1,60 @@
+from typing import List, Tuple
+
+# Multicall3 is deployed at the same address on most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = "82ad56cb"  # aggregate3((address,bool,bytes)[])
+BALANCE_OF_SELECTOR = "70a08231"  # balanceOf(address)
+
+def _word(value: int) -> str:
+    return format(value, "064x")
+
+def _pad_right(data_hex: str) -> str:
+    remainder = len(data_hex) % 64
+    return data_hex + "0" * ((64 - remainder) % 64)
+
+def encode_balance_of(wallet_address: str) -> str:
+    """Calldata for balanceOf(wallet) without the 0x prefix"""
+    return BALANCE_OF_SELECTOR + wallet_address[2:].lower().zfill(64)
+
+def encode_aggregate3(calls: List[Tuple[str, bool, str]]) -> str:
+    """ABI-encode aggregate3 calldata for (target, allow_failure, calldata_hex) tuples"""
+    encoded_calls = []
+    for target, allow_failure, call_data in calls:
+        call_data = call_data[2:] if call_data.startswith("0x") else call_data
+        encoded_calls.append(
+            target[2:].lower().zfill(64)
+            + _word(1 if allow_failure else 0)
+            + _word(0x60)  # offset of the bytes field within the tuple
+            + _word(len(call_data) // 2)
+            + _pad_right(call_data)
+        )
+
+    # Offsets are relative to the start of the element-offset area
+    offsets = []
+    position = 32 * len(calls)
+    for encoded in encoded_calls:
+        offsets.append(_word(position))
+        position += len(encoded) // 2
+
+    return ("0x" + AGGREGATE3_SELECTOR + _word(0x20) + _word(len(calls))
+            + "".join(offsets) + "".join(encoded_calls))
+
+def decode_aggregate3_result(result_hex: str) -> List[Tuple[bool, bytes]]:
+    """Decode the (bool success, bytes returnData)[] returned by aggregate3"""
+    data = bytes.fromhex(result_hex[2:] if result_hex.startswith("0x") else result_hex)
+
+    def read_word(offset: int) -> int:
+        return int.from_bytes(data[offset:offset + 32], "big")
+
+    array_start = read_word(0)
+    count = read_word(array_start)
+    elements_start = array_start + 32
+
+    results = []
+    for index in range(count):
+        tuple_start = elements_start + read_word(elements_start + 32 * index)
+        success = read_word(tuple_start) != 0
+        bytes_start = tuple_start + read_word(tuple_start + 32)
+        length = read_word(bytes_start)
+        results.append((success, data[bytes_start + 32:bytes_start + 32 + length]))
+    return results
@@ -1,96 +1,104 @@
-from typing import Dict, Any, Optional
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, Optional, Sequence
 from core.event_bus import EventPriority
 from core.events import RiskIndicators
 import logging
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 logger = logging.getLogger(__name__)
 
+# Score at or above each bound maps to MEDIUM, HIGH, CRITICAL
+PRIORITY_SCORE_BOUNDS = (2, 4, 6)
+SCORED_PRIORITIES = (EventPriority.LOW, EventPriority.MEDIUM, EventPriority.HIGH, EventPriority.CRITICAL)
+EVENT_TYPE_POINTS = {'large_transaction': 1, 'high_volume': 2}
+
 class RiskCalculator:
     def __init__(self):
         self.large_tx_threshold = 100_000
         self.whale_threshold = 1_000_000
         self.significant_balance_change_threshold = 50_000
         self.high_percentage_change_threshold = 0.20  # 20%
+        # (indicator, ascending thresholds, points per bracket, score the magnitude): the one
+        # scoring table behind both _calculate_risk_score and calculate_risk_score_batch. A value
+        # above the i-th threshold (and not above the next) earns points[i + 1].
+        self.factor_tables = (
+            ('transaction_size', (50_000, self.large_tx_threshold, self.whale_threshold), (0, 1, 2, 3), False),
+            ('wallet_volume', (500_000, 1_000_000, 5_000_000), (0, 1, 2, 3), False),
+            ('balance_change', (10_000, self.significant_balance_change_threshold, 1_000_000), (0, 1, 2, 3), True),
+            ('balance_percentage', (0.10, self.high_percentage_change_threshold, 0.50), (0, 1, 2, 3), True),
+            ('concurrent_events', (1, 3), (0, 1, 3), False),
+            ('combined_risk_score', (3, 5, 7), (0, 1, 2, 3), False)
+        )
     
     def calculate_priority(self, risk_indicators: Dict[str, Any]) -> EventPriority:
         """Calculate event priority based on risk indicators"""
         score = self._calculate_risk_score(risk_indicators)
-        
-        if score >= 6:
-            return EventPriority.CRITICAL
-        elif score >= 4:
-            return EventPriority.HIGH
-        elif score >= 2:
-            return EventPriority.MEDIUM
-        else:
-            return EventPriority.LOW
+        return SCORED_PRIORITIES[bisect_right(PRIORITY_SCORE_BOUNDS, score)]
     
     def _calculate_risk_score(self, indicators: Dict[str, Any]) -> int:
         """Calculate numerical risk score based on multiple factors"""
         score = 0
+        for name, thresholds, points, magnitude in self.factor_tables:
+            value = indicators.get(name, 0)
+            if magnitude:
+                value = abs(value)
+            # bisect_left counts thresholds strictly below the value, i.e. "value > threshold"
+            score += points[bisect_left(thresholds, value)]
+        score += EVENT_TYPE_POINTS.get(indicators.get('event_type', ''), 0)
         
-        # Transaction size factor
-        transaction_size = indicators.get('transaction_size', 0)
-        if transaction_size > self.whale_threshold:
-            score += 3
-        elif transaction_size > self.large_tx_threshold:
-            score += 2
-        elif transaction_size > 50_000:
-            score += 1
-        
-        # Wallet volume factor
-        wallet_volume = indicators.get('wallet_volume', 0)
-        if wallet_volume > 5_000_000:
-            score += 3
-        elif wallet_volume > 1_000_000:
-            score += 2
-        elif wallet_volume > 500_000:
-            score += 1
-        
-        # Balance change factor
-        balance_change = abs(indicators.get('balance_change', 0))
-        if balance_change > 1_000_000:
-            score += 3
-        elif balance_change > self.significant_balance_change_threshold:
-            score += 2
-        elif balance_change > 10_000:
-            score += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Calculated risk score: {score} from indicators: {indicators}")
+        return score
+    
+    def calculate_risk_score_batch(self, event_type: Optional[Sequence[str]] = None, **columns) -> "np.ndarray":
+        """Score many events at once from columnar inputs.
         
-        # Percentage change factor
-        balance_percentage = abs(indicators.get('balance_percentage', 0))
-        if balance_percentage > 0.50:  # 50%
-            score += 3
-        elif balance_percentage > self.high_percentage_change_threshold:
-            score += 2
-        elif balance_percentage > 0.10:  # 10%
-            score += 1
+        Keyword columns are equal-length arrays named like the risk indicators
+        (transaction_size, wallet_volume, balance_change, balance_percentage,
+        concurrent_events, combined_risk_score); missing columns count as 0.
+        Matches _calculate_risk_score element-wise.
+        """
+        if np is None:
+            raise ImportError("calculate_risk_score_batch requires numpy")
         
-        # Event type factor
-        event_type = indicators.get('event_type', '')
-        if event_type == 'large_transaction':
-            score += 1
-        elif event_type == 'high_volume':
-            score += 2
+        tables = {name: (thresholds, points, magnitude) for name, thresholds, points, magnitude in self.factor_tables}
+        unknown = set(columns) - set(tables)
+        if unknown:
+            raise ValueError(f"Unknown risk indicator columns: {sorted(unknown)}")
         
-        # Multiple concurrent events factor
-        concurrent_events = indicators.get('concurrent_events', 0)
-        if concurrent_events > 3:
-            score += 3
-        elif concurrent_events > 1:
-            score += 1
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        if event_type is not None:
+            event_type = np.asarray(event_type, dtype=object)
+        lengths = {len(values) for values in arrays.values()}
+        if event_type is not None:
+            lengths.add(len(event_type))
+        if len(lengths) > 1:
+            raise ValueError("Risk indicator columns must have equal lengths")
+        size = lengths.pop() if lengths else 0
         
-        # Combined risk score factor (for multi-factor events)
-        combined_risk = indicators.get('combined_risk_score', 0)
-        if combined_risk > 7:
-            score += 3
-        elif combined_risk > 5:
-            score += 2
-        elif combined_risk > 3:
-            score += 1
+        score = np.zeros(size, dtype=np.int64)
+        for name, values in arrays.items():
+            thresholds, points, magnitude = tables[name]
+            if magnitude:
+                values = np.abs(values)
+            # side='left' counts thresholds strictly below each value, i.e. "value > threshold"
+            brackets = np.searchsorted(np.asarray(thresholds, dtype=np.float64), values, side='left')
+            score += np.asarray(points, dtype=np.int64)[brackets]
         
-        logger.debug(f"Calculated risk score: {score} from indicators: {indicators}")
+        if event_type is not None:
+            for name, points in EVENT_TYPE_POINTS.items():
+                score += np.where(event_type == name, points, 0)
         return score
     
+    def calculate_priority_batch(self, event_type: Optional[Sequence[str]] = None, **columns) -> "np.ndarray":
+        """Vectorized calculate_priority; returns an array of EventPriority values (1-4)"""
+        score = self.calculate_risk_score_batch(event_type, **columns)
+        return np.digitize(score, PRIORITY_SCORE_BOUNDS) + EventPriority.LOW.value
+    
     def calculate_whale_priority(self, whale_data: Dict[str, Any]) -> EventPriority:
         """Calculate priority specifically for whale events"""
         indicators = RiskIndicators.from_whale_event(whale_data)
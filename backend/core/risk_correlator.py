@@ -0,0 +1,258 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from core.event_bus import Event
+from core.events import EventTypes, MultiFactorEventData
+from core.risk_calculator import risk_calculator
+from config.settings import (
+    CORRELATION_WINDOW_SECONDS, CORRELATION_WALLET_MIN_SIGNALS, CORRELATION_GLOBAL_MIN_WALLETS,
+    CORRELATION_COOLDOWN_SECONDS, CORRELATION_MAX_SIGNALS, CORRELATION_MAX_WALLETS,
+    CORRELATION_MAX_SIGNALS_PER_WALLET
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "*"
+
+class WalletWindow:
+    """Signals for one wallet inside the correlation window, as a min-heap on time"""
+    __slots__ = ('heap', 'weight_sum', 'kind_counts', 'max_amount')
+
+    def __init__(self):
+        self.heap = []
+        self.weight_sum = 0
+        self.kind_counts: Dict[str, int] = {}
+        self.max_amount = 0.0
+
+    def add(self, timestamp: float, seq: int, kind: str, weight: int, amount: float):
+        heapq.heappush(self.heap, (timestamp, seq, kind, weight, amount))
+        self.weight_sum += weight
+        self.kind_counts[kind] = self.kind_counts.get(kind, 0) + 1
+        self.max_amount = max(self.max_amount, amount)
+
+    def pop_oldest(self):
+        _, _, kind, weight, amount = heapq.heappop(self.heap)
+        self.weight_sum -= weight
+        self.kind_counts[kind] -= 1
+        if not self.kind_counts[kind]:
+            del self.kind_counts[kind]
+        # Rescan only when the expired signal held the max; the heap is capped per wallet
+        if amount >= self.max_amount:
+            self.max_amount = max((entry[4] for entry in self.heap), default=0.0)
+
+    def trim(self, keep: int):
+        while len(self.heap) > keep:
+            self.pop_oldest()
+
+class RiskCorrelator:
+    """Correlates whale and balance events into MULTI_FACTOR_RISK events.
+
+    Signals are indexed by time per wallet and globally (heaps, so insert and
+    expiry are O(log n)). A wallet clusters when it has enough signals in the
+    window, or signals of more than one kind; the market clusters when enough
+    distinct wallets are active. Each cluster emits at most once per cooldown
+    unless its score rises by a point. Signal and wallet counts are capped, and events
+    arrive through batch subscriptions so whale bursts are scored per batch.
+    """
+
+    def __init__(self, window_seconds: float = CORRELATION_WINDOW_SECONDS,
+                 wallet_min_signals: int = CORRELATION_WALLET_MIN_SIGNALS,
+                 global_min_wallets: int = CORRELATION_GLOBAL_MIN_WALLETS,
+                 cooldown_seconds: float = CORRELATION_COOLDOWN_SECONDS,
+                 max_signals: int = CORRELATION_MAX_SIGNALS,
+                 max_wallets: int = CORRELATION_MAX_WALLETS,
+                 max_signals_per_wallet: int = CORRELATION_MAX_SIGNALS_PER_WALLET,
+                 clock: Callable[[], float] = time.time):
+        self.window_seconds = window_seconds
+        self.wallet_min_signals = wallet_min_signals
+        self.global_min_wallets = global_min_wallets
+        self.cooldown_seconds = cooldown_seconds
+        self.max_signals = max_signals
+        self.max_wallets = max_wallets
+        self.max_signals_per_wallet = max_signals_per_wallet
+        self.clock = clock
+        # LRU order doubles as the eviction order when max_wallets is reached
+        self.wallets: "OrderedDict[str, WalletWindow]" = OrderedDict()
+        self.global_heap = []
+        self.global_weight_sum = 0
+        self.sequence = itertools.count()
+        # key -> (emitted_at, combined_score); pruned with the wallet windows
+        self.last_emitted: Dict[str, tuple] = {}
+        self.event_bus = None
+        self.stats = {'signals': 0, 'emitted': 0, 'evicted_wallets': 0, 'dropped_signals': 0}
+
+    def attach(self, event_bus, max_batch: int = 256, max_wait_ms: float = 20):
+        """Subscribe to whale and balance events and publish correlations back to the bus"""
+        self.event_bus = event_bus
+        event_bus.subscribe_batch(EventTypes.WHALE_ACTIVITY, self.handle_events, max_batch, max_wait_ms)
+        event_bus.subscribe_batch(EventTypes.BALANCE_CHANGE, self.handle_events, max_batch, max_wait_ms)
+
+    async def handle_events(self, events: List[Event]):
+        for correlated in self.process(events):
+            if self.event_bus:
+                self.event_bus.publish_nowait(correlated)
+
+    def process(self, events: List[Event]) -> List[Event]:
+        """Ingest a batch of events and return the MULTI_FACTOR_RISK events it triggers"""
+        touched = set()
+        for event in events:
+            wallet_address = event.data.get('wallet_address')
+            if wallet_address:
+                self._add_signal(wallet_address, event)
+                touched.add(wallet_address)
+
+        now = self.clock()
+        self._expire(now - self.window_seconds)
+
+        correlated = []
+        for wallet_address in touched:
+            window = self.wallets.get(wallet_address)
+            if window is not None:
+                event = self._check_wallet(wallet_address, window, now)
+                if event:
+                    correlated.append(event)
+        if touched:
+            event = self._check_global(now)
+            if event:
+                correlated.append(event)
+        return correlated
+
+    def _add_signal(self, wallet_address: str, event: Event):
+        kind = event.event_type
+        if kind == EventTypes.WHALE_ACTIVITY:
+            amount = event.data.get('amount', 0)
+        else:
+            amount = abs(event.data.get('change_amount', 0))
+        weight = event.priority.value
+        seq = next(self.sequence)
+
+        window = self.wallets.get(wallet_address)
+        if window is None:
+            window = self.wallets[wallet_address] = WalletWindow()
+            if len(self.wallets) > self.max_wallets:
+                self._evict_wallet(next(iter(self.wallets)))
+        else:
+            self.wallets.move_to_end(wallet_address)
+        window.add(event.timestamp, seq, kind, weight, amount)
+        window.trim(self.max_signals_per_wallet)
+
+        heapq.heappush(self.global_heap, (event.timestamp, seq, wallet_address, weight))
+        self.global_weight_sum += weight
+        self.stats['signals'] += 1
+        while len(self.global_heap) > self.max_signals:
+            self._pop_global()
+            self.stats['dropped_signals'] += 1
+
+    def _expire(self, cutoff: float):
+        while self.global_heap and self.global_heap[0][0] < cutoff:
+            self._pop_global()
+
+    def _pop_global(self):
+        """Remove the oldest global signal and its copy in the wallet window.
+
+        Both heaps order by (timestamp, seq), so if the wallet still holds the
+        signal it is that wallet's oldest; trimmed or evicted signals are gone already.
+        """
+        timestamp, seq, wallet_address, weight = heapq.heappop(self.global_heap)
+        self.global_weight_sum -= weight
+        window = self.wallets.get(wallet_address)
+        if window is None:
+            return
+        if window.heap and window.heap[0][:2] == (timestamp, seq):
+            window.pop_oldest()
+        if not window.heap:
+            del self.wallets[wallet_address]
+            self.last_emitted.pop(wallet_address, None)
+
+    def _evict_wallet(self, wallet_address: str):
+        # Its entries in the global heap stay until they expire, keeping the global count accurate
+        del self.wallets[wallet_address]
+        self.last_emitted.pop(wallet_address, None)
+        self.stats['evicted_wallets'] += 1
+
+    def _check_wallet(self, wallet_address: str, window: WalletWindow, now: float) -> Optional[Event]:
+        signal_count = len(window.heap)
+        kinds = len(window.kind_counts)
+        if signal_count < self.wallet_min_signals and not (kinds > 1 and signal_count > 1):
+            return None
+
+        combined_score = min(10.0, window.weight_sum / 2 + 2 * (kinds - 1))
+        if not self._should_emit(wallet_address, combined_score, now):
+            return None
+
+        risk_factors = {
+            'scope': 'wallet',
+            'wallet_address': wallet_address,
+            'signals': dict(window.kind_counts),
+            'max_amount': window.max_amount,
+            'window_seconds': self.window_seconds
+        }
+        indicators = {
+            'transaction_size': window.max_amount,
+            'concurrent_events': signal_count,
+            'combined_risk_score': combined_score
+        }
+        return self._build_event(risk_factors, combined_score, signal_count, indicators, now)
+
+    def _check_global(self, now: float) -> Optional[Event]:
+        active_wallets = len(self.wallets)
+        if active_wallets < self.global_min_wallets:
+            return None
+
+        signal_count = len(self.global_heap)
+        average_weight = self.global_weight_sum / signal_count if signal_count else 0
+        combined_score = min(10.0, 2 * active_wallets / self.global_min_wallets + average_weight)
+        if not self._should_emit(GLOBAL_KEY, combined_score, now):
+            return None
+
+        risk_factors = {
+            'scope': 'market',
+            'active_wallets': active_wallets,
+            'window_seconds': self.window_seconds
+        }
+        market_indicators = {
+            'signals_in_window': signal_count,
+            'average_signal_priority': average_weight
+        }
+        indicators = {'concurrent_events': active_wallets, 'combined_risk_score': combined_score}
+        return self._build_event(risk_factors, combined_score, signal_count, indicators, now, market_indicators)
+
+    def _should_emit(self, key: str, combined_score: float, now: float) -> bool:
+        previous = self.last_emitted.get(key)
+        if previous is not None:
+            emitted_at, previous_score = previous
+            # Within the cooldown, only a rise of a full point is worth another event
+            if now - emitted_at < self.cooldown_seconds and combined_score < previous_score + 1:
+                return False
+        self.last_emitted[key] = (now, combined_score)
+        return True
+
+    def _build_event(self, risk_factors: Dict, combined_score: float, concurrent_events: int,
+                     indicators: Dict, now: float, market_indicators: Optional[Dict] = None) -> Event:
+        event_data = MultiFactorEventData(
+            risk_factors=risk_factors,
+            combined_risk_score=round(combined_score, 2),
+            concurrent_events=concurrent_events,
+            market_indicators=market_indicators,
+            timestamp=datetime.fromtimestamp(now)
+        )
+        priority = risk_calculator.calculate_priority(indicators)
+        self.stats['emitted'] += 1
+        logger.debug(f"Multi-factor risk {risk_factors.get('scope')} score={combined_score:.2f} priority={priority.name}")
+        return Event(
+            event_type=EventTypes.MULTI_FACTOR_RISK,
+            data=event_data.to_dict(),
+            priority=priority,
+            timestamp=now
+        )
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'active_wallets': len(self.wallets),
+            'signals_in_window': len(self.global_heap)
+        }
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config.settings import RPC_CACHE_MEMORY_BYTES, RPC_CACHE_DISK_PATH
+
+def cache_key(method: str, params: list) -> str:
+    """Content address of a request: sha256 of the method and canonical params"""
+    canonical = json.dumps([method, params], separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class RPCResponseCache:
+    """Two-tier cache for immutable RPC responses.
+
+    Responses are stored as JSON bytes in an in-memory LRU bounded by total
+    size, backed by an optional SQLite file that survives restarts. Callers
+    decide what is immutable; see RPCClient for the finality rules. get()
+    returns a fresh object each time, so callers may mutate it.
+    """
+
+    def __init__(self, max_memory_bytes: int = RPC_CACHE_MEMORY_BYTES,
+                 disk_path: Optional[str] = RPC_CACHE_DISK_PATH, disk_commit_every: int = 100):
+        self.max_memory_bytes = max_memory_bytes
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_path = disk_path
+        self.disk_commit_every = max(1, disk_commit_every)
+        self.pending_disk_writes = 0
+        self.db: Optional[sqlite3.Connection] = None
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0
+        }
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        self.db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return json.loads(value)
+
+        if self.db is not None:
+            row = self.db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.stats['disk_hits'] += 1
+                self._remember(key, row[0])
+                return json.loads(row[0])
+
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key: str, response: Any):
+        value = json.dumps(response, separators=(",", ":")).encode()
+        self._remember(key, value)
+        self.stats['stores'] += 1
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO responses (key, value) VALUES (?, ?)", (key, value))
+            self.pending_disk_writes += 1
+            if self.pending_disk_writes >= self.disk_commit_every:
+                self.flush()
+
+    def _remember(self, key: str, value: bytes):
+        previous = self.memory.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        if len(value) > self.max_memory_bytes:
+            return
+        self.memory[key] = value
+        self.memory_bytes += len(value)
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    def flush(self):
+        if self.db is not None and self.pending_disk_writes:
+            self.db.commit()
+            self.pending_disk_writes = 0
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        return {
+            **self.stats,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory_bytes,
+            'disk_enabled': self.db is not None
+        }
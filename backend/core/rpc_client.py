@@ -1,12 +1,59 @@
 import asyncio
 import aiohttp
 import json
-from typing import Dict, Any, Optional
+import logging
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from config.settings import (
+    RPC_BATCH_MAX_SIZE, SEI_FALLBACK_RPC_URLS, RPC_REQUEST_TIMEOUT, RPC_MAX_RETRIES, RPC_HEDGING_ENABLED,
+    MULTICALL_ENABLED, MULTICALL_BATCH_SIZE, RPC_CACHE_ENABLED, RPC_CACHE_FINALITY_DEPTH
+)
+from core.rpc_cache import RPCResponseCache, cache_key
+from core.rpc_pool import RPCEndpointPool, RPCEndpoint
+from core.multicall import MULTICALL3_ADDRESS, encode_aggregate3, decode_aggregate3_result, encode_balance_of
+
+logger = logging.getLogger(__name__)
+
+class RPCError(Exception):
+    """JSON-RPC error object returned by the node"""
+    def __init__(self, method: str, error: Any):
+        self.method = method
+        self.error = error
+        self.code = error.get("code") if isinstance(error, dict) else None
+        super().__init__(f"RPC Error for {method}: {error}")
+
+class RPCTransportError(Exception):
+    """Network, timeout or HTTP-level failure talking to an endpoint (retryable)"""
+
+class RPCBatchUnsupported(Exception):
+    """Endpoint rejected a JSON-RPC batch array (error object or HTTP 4xx instead of a reply array)"""
 
 class RPCClient:
-    def __init__(self, rpc_url: str = "https://evm-rpc.sei-apis.com"):
+    def __init__(self, rpc_url: str = "https://evm-rpc.sei-apis.com", max_batch_size: int = RPC_BATCH_MAX_SIZE,
+                 fallback_urls: Optional[List[str]] = None, hedging: bool = RPC_HEDGING_ENABLED,
+                 max_retries: int = RPC_MAX_RETRIES, request_timeout: float = RPC_REQUEST_TIMEOUT,
+                 cache: Optional[RPCResponseCache] = None):
         self.rpc_url = rpc_url
+        self.max_batch_size = max(1, max_batch_size)
+        if fallback_urls is None:
+            fallback_urls = SEI_FALLBACK_RPC_URLS
+        self.pool = RPCEndpointPool([rpc_url] + list(fallback_urls))
+        self.hedging = hedging
+        self.max_retries = max(0, max_retries)
+        self.request_timeout = aiohttp.ClientTimeout(total=request_timeout)
+        self.hedged_requests = 0
+        # None until probed with eth_getCode
+        self.multicall_available: Optional[bool] = None if MULTICALL_ENABLED else False
         self.session = None
+        self.request_id = 0
+        # Blocks and receipts at or below latest_block_seen - finality depth never change
+        if cache is None and RPC_CACHE_ENABLED:
+            cache = RPCResponseCache()
+        self.cache = cache
+        self.finality_depth = RPC_CACHE_FINALITY_DEPTH
+        self.latest_block_seen: Optional[int] = None
+        # Optional RPCRecorder capturing every request and response
+        self.recorder = None
 
     async def __aenter__(self):
         self.session = aiohttp.ClientSession()
@@ -15,6 +62,8 @@ class RPCClient:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
+        if self.cache:
+            self.cache.flush()
 
     async def rpc_call(self, method: str, params: list = []):
         """Make a JSON-RPC call to Sei network"""
@@ -25,24 +74,201 @@ class RPCClient:
             "jsonrpc": "2.0",
             "method": method,
             "params": params or [],
-            "id": 1
+            "id": self._next_id()
         }
         
+        result = await self._post(payload, method)
+        if not isinstance(result, dict):
+            raise RPCTransportError(f"RPC call failed for {method}: unexpected response {result!r}")
+        if "error" in result:
+            raise RPCError(method, result["error"])
+        
+        return result.get("result")
+
+    async def _post(self, payload: Any, label: str) -> Any:
+        """POST a payload to the healthiest endpoint, retrying transport failures with jittered backoff"""
+        tried: List[RPCEndpoint] = []
+        last_error: Optional[Exception] = None
+        # Batch arrays only go to endpoints not known to reject them
+        unusable = [endpoint for endpoint in self.pool.endpoints if not endpoint.batch_supported] \
+            if isinstance(payload, list) else []
+        
+        for attempt in range(self.max_retries + 1):
+            endpoint = self.pool.choose(exclude=tried + unusable) or self.pool.choose(exclude=unusable)
+            if endpoint is None:
+                raise RPCBatchUnsupported(f"no endpoint accepts batches for {label}")
+            start = time.monotonic()
+            try:
+                if self.hedging and len(self.pool.endpoints) > 1:
+                    result = await self._post_hedged(endpoint, payload)
+                else:
+                    result = await self._post_to(endpoint, payload)
+                if self.recorder:
+                    self.recorder.record(payload, result, time.monotonic() - start)
+                return result
+            except RPCTransportError as e:
+                last_error = e
+                tried.append(endpoint)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.pool.backoff_delay(attempt))
+        
+        raise RPCTransportError(f"RPC call failed for {label} after {self.max_retries + 1} attempts: {last_error}")
+
+    async def _post_to(self, endpoint: RPCEndpoint, payload: Any) -> Any:
+        """POST to a single endpoint and record its latency or failure"""
+        start = time.monotonic()
         try:
             async with self.session.post(
-                self.rpc_url,
+                endpoint.url,
                 json=payload,
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=self.request_timeout
             ) as response:
-                result = await response.json()
-                
-                if "error" in result:
-                    raise Exception(f"RPC Error: {result['error']}")
-                
-                return result.get("result")
-                
-        except Exception as e:
-            raise Exception(f"RPC call failed for {method}: {e}")
+                if response.status == 429 or response.status >= 500:
+                    raise RPCTransportError(f"HTTP {response.status} from {endpoint.url}")
+                if response.status >= 400 and isinstance(payload, list):
+                    endpoint.batch_supported = False
+                    raise RPCBatchUnsupported(f"HTTP {response.status} from {endpoint.url}")
+                result = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            # A losing hedge is still at least this slow; keep the p95 from being biased low
+            endpoint.recent_latencies.append(time.monotonic() - start)
+            raise
+        except RPCTransportError:
+            self.pool.record_failure(endpoint)
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.pool.record_failure(endpoint)
+            raise RPCTransportError(f"{endpoint.url}: {e!r}") from e
+        
+        self.pool.record_success(endpoint, time.monotonic() - start)
+        # Nodes that reject batching reply with a single error object
+        if isinstance(payload, list) and isinstance(result, dict):
+            endpoint.batch_supported = False
+            raise RPCBatchUnsupported(f"{endpoint.url}: {result.get('error', result)}")
+        return result
+
+    async def _post_hedged(self, primary: RPCEndpoint, payload: Any) -> Any:
+        """Send to the primary; if it is slower than its p95, race a copy on the next-best endpoint"""
+        pending = {asyncio.create_task(self._post_to(primary, payload))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.pool.hedge_delay(primary))
+            if done:
+                return done.pop().result()
+            
+            secondary = self.pool.choose(exclude=[primary])
+            pending.add(asyncio.create_task(self._post_to(secondary, payload)))
+            self.hedged_requests += 1
+            
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_endpoint_stats(self) -> List[Dict]:
+        return self.pool.get_stats()
+
+    def _next_id(self) -> int:
+        self.request_id += 1
+        return self.request_id
+
+    async def rpc_batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Make JSON-RPC batch calls, chunked by max_batch_size.
+
+        Returns one entry per call in the original order: the call's result,
+        or an RPCError instance if that individual call failed.
+        """
+        if not self.session:
+            raise RuntimeError("Session not initialized")
+
+        results: List[Any] = []
+        for start in range(0, len(calls), self.max_batch_size):
+            chunk = calls[start:start + self.max_batch_size]
+            results.extend(await self._send_batch(chunk))
+        return results
+
+    async def _send_batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Send a single batch array and correlate responses by id.
+
+        If the endpoint rejects batch arrays it is remembered as unable to
+        batch and the calls are sent individually instead.
+        """
+        if not calls:
+            return []
+        if not any(endpoint.batch_supported for endpoint in self.pool.endpoints):
+            return await self._send_individually(calls)
+
+        payload = []
+        methods_by_id = {}
+        for method, params in calls:
+            request_id = self._next_id()
+            methods_by_id[request_id] = method
+            payload.append({
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params or [],
+                "id": request_id
+            })
+
+        try:
+            result = await self._post(payload, f"batch of {len(calls)} calls")
+        except RPCBatchUnsupported as e:
+            logger.warning(f"RPC batch rejected ({e}); sending {len(calls)} calls individually")
+            return await self._send_individually(calls)
+
+        responses_by_id = {item.get("id"): item for item in result if isinstance(item, dict)}
+
+        ordered = []
+        for request_id, method in methods_by_id.items():
+            item = responses_by_id.get(request_id)
+            if item is None:
+                ordered.append(RPCError(method, {"message": "missing response in batch"}))
+            elif "error" in item:
+                ordered.append(RPCError(method, item["error"]))
+            else:
+                ordered.append(item.get("result"))
+        return ordered
+
+    async def _send_individually(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Concurrent single calls, with the same per-call results as _send_batch"""
+        async def call(method: str, params: list):
+            try:
+                return await self.rpc_call(method, params)
+            except RPCError as e:
+                return e
+        
+        return list(await asyncio.gather(*(call(method, params) for method, params in calls)))
+
+    async def get_block_number(self) -> int:
+        """Get latest block number without downloading the block"""
+        block_number_hex = await self.rpc_call("eth_blockNumber")
+        block_number = int(block_number_hex, 16)
+        self.observe_head(block_number)
+        return block_number
+
+    def observe_head(self, block_number: int):
+        """Record a chain head learned elsewhere, e.g. from a head subscription"""
+        if self.latest_block_seen is None or block_number > self.latest_block_seen:
+            self.latest_block_seen = block_number
+
+    def _is_final(self, block_number: int) -> bool:
+        """Only data this far below a head we have seen is cached; unknown head means nothing is"""
+        return self.latest_block_seen is not None and block_number <= self.latest_block_seen - self.finality_depth
+
+    def _cache_receipt(self, tx_hash: str, receipt: Dict):
+        block_number = receipt.get("blockNumber")
+        if self.cache and block_number and self._is_final(int(block_number, 16)):
+            self.cache.put(cache_key("eth_getTransactionReceipt", [tx_hash]), receipt)
+
+    def get_cache_stats(self) -> Dict:
+        return self.cache.get_stats() if self.cache else {}
 
     async def get_latest_block(self):
         """Get latest block data - returns full block info to match MCP interface"""
@@ -56,13 +282,24 @@ class RPCClient:
         block_data["number"] = block_number
         return block_data
 
-    async def get_block_by_number(self, block_number: int):
+    async def get_block_by_number(self, block_number: int, full_transactions: bool = True):
         """Get block by number"""
         hex_block = hex(block_number)
-        block_data = await self.rpc_call("eth_getBlockByNumber", [hex_block, True])
+        params = [hex_block, full_transactions]
+        cacheable = self.cache is not None and self._is_final(block_number)
+        if cacheable:
+            block_data = self.cache.get(cache_key("eth_getBlockByNumber", params))
+            if block_data is not None:
+                block_data["number"] = block_number
+                return block_data
+        
+        block_data = await self.rpc_call("eth_getBlockByNumber", params)
         
         if not block_data:
             raise Exception(f"Block {block_number} not found")
+        
+        if cacheable:
+            self.cache.put(cache_key("eth_getBlockByNumber", params), block_data)
             
         # Add decoded number for consistency
         block_data["number"] = block_number
@@ -70,13 +307,59 @@ class RPCClient:
 
     async def get_transaction_receipt(self, tx_hash: str):
         """Get transaction receipt"""
+        if self.cache:
+            receipt = self.cache.get(cache_key("eth_getTransactionReceipt", [tx_hash]))
+            if receipt is not None:
+                return receipt
+        
         receipt = await self.rpc_call("eth_getTransactionReceipt", [tx_hash])
         
         if not receipt:
             raise Exception(f"Receipt for transaction {tx_hash} not found")
-            
+        
+        self._cache_receipt(tx_hash, receipt)
         return receipt
 
+    async def get_transaction_receipts(self, tx_hashes: List[str]) -> List[Dict]:
+        """Get receipts for many transactions using JSON-RPC batches.
+
+        Cached receipts are served without a request. Items that fail inside
+        a batch are retried individually, so one bad entry does not fail the
+        whole block.
+        """
+        receipts: List[Optional[Dict]] = [None] * len(tx_hashes)
+        missing = []
+        for index, tx_hash in enumerate(tx_hashes):
+            if self.cache:
+                receipts[index] = self.cache.get(cache_key("eth_getTransactionReceipt", [tx_hash]))
+            if receipts[index] is None:
+                missing.append(index)
+        if not missing:
+            return receipts
+
+        results = await self.rpc_batch([("eth_getTransactionReceipt", [tx_hashes[index]]) for index in missing])
+        for index, receipt in zip(missing, results):
+            tx_hash = tx_hashes[index]
+            if isinstance(receipt, RPCError) or not receipt:
+                receipt = await self.get_transaction_receipt(tx_hash)
+            else:
+                self._cache_receipt(tx_hash, receipt)
+            receipts[index] = receipt
+        return receipts
+
+    async def get_logs(self, from_block: int, to_block: int, addresses: List[str], topics: Optional[list] = None) -> List[Dict]:
+        """Get logs emitted by the given contracts over an inclusive block range"""
+        log_filter = {
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "address": addresses
+        }
+        if topics:
+            log_filter["topics"] = topics
+        
+        logs = await self.rpc_call("eth_getLogs", [log_filter])
+        return logs or []
+
     async def get_balance(self, address: str, block_tag: str = "latest"):
         """Get ETH balance for address"""
         balance_hex = await self.rpc_call("eth_getBalance", [address, block_tag])
@@ -123,4 +406,58 @@ class RPCClient:
                 "raw": "0",
                 "formatted": "0",
                 "decimals": 6
-            }
\ No newline at end of file
+            }
+
+    async def get_token_balances(self, wallet_addresses: List[str], token_address: str,
+                                 block_number: Optional[int] = None) -> Tuple[int, Dict[str, Optional[int]]]:
+        """Snapshot raw ERC-20 balances for many wallets, all read at the same block.
+
+        Uses Multicall3 aggregate3 when deployed, otherwise batched eth_calls.
+        Returns (block_number, {wallet: raw balance or None if the read failed}).
+        """
+        if block_number is None:
+            block_number = await self.get_block_number()
+        block_tag = hex(block_number)
+        
+        if self.multicall_available is None:
+            code = await self.rpc_call("eth_getCode", [MULTICALL3_ADDRESS, block_tag])
+            self.multicall_available = bool(code) and code != "0x"
+        
+        if self.multicall_available:
+            balances = await self._balances_via_multicall(wallet_addresses, token_address, block_tag)
+        else:
+            balances = await self._balances_via_eth_call(wallet_addresses, token_address, block_tag)
+        return block_number, balances
+
+    async def _balances_via_multicall(self, wallet_addresses: List[str], token_address: str,
+                                      block_tag: str) -> Dict[str, Optional[int]]:
+        chunks = [wallet_addresses[i:i + MULTICALL_BATCH_SIZE]
+                  for i in range(0, len(wallet_addresses), MULTICALL_BATCH_SIZE)]
+        calls = []
+        for chunk in chunks:
+            data = encode_aggregate3([(token_address, True, encode_balance_of(wallet)) for wallet in chunk])
+            calls.append(("eth_call", [{"to": MULTICALL3_ADDRESS, "data": data}, block_tag]))
+        
+        balances: Dict[str, Optional[int]] = {}
+        for chunk, result in zip(chunks, await self.rpc_batch(calls)):
+            if isinstance(result, RPCError) or not result or result == "0x":
+                # e.g. gas cap exceeded for a large aggregate; read this chunk directly
+                balances.update(await self._balances_via_eth_call(chunk, token_address, block_tag))
+                continue
+            for wallet, (success, return_data) in zip(chunk, decode_aggregate3_result(result)):
+                balances[wallet] = int.from_bytes(return_data[:32], "big") if success and len(return_data) >= 32 else None
+        return balances
+
+    async def _balances_via_eth_call(self, wallet_addresses: List[str], token_address: str,
+                                     block_tag: str) -> Dict[str, Optional[int]]:
+        calls = [
+            ("eth_call", [{"to": token_address, "data": "0x" + encode_balance_of(wallet)}, block_tag])
+            for wallet in wallet_addresses
+        ]
+        balances: Dict[str, Optional[int]] = {}
+        for wallet, result in zip(wallet_addresses, await self.rpc_batch(calls)):
+            if isinstance(result, RPCError):
+                balances[wallet] = None
+            else:
+                balances[wallet] = int(result, 16) if result and result != "0x" else 0
+        return balances
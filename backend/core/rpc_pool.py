@@ -0,0 +1,120 @@
+import random
+import time
+from collections import deque
+from typing import List, Optional, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RPCEndpoint:
+    """Health statistics for a single RPC endpoint"""
+
+    def __init__(self, url: str, latency_alpha: float, latency_samples: int):
+        self.url = url
+        self.latency_alpha = latency_alpha
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.recent_latencies = deque(maxlen=latency_samples)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        # Cleared once the endpoint rejects a JSON-RPC batch array
+        self.batch_supported = True
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.recent_latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.latency_alpha * (latency - self.ewma_latency)
+        self.error_rate *= (1 - self.latency_alpha)
+
+    def record_failure(self, cooldown_after: int, cooldown_seconds: float):
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.error_rate += self.latency_alpha * (1 - self.error_rate)
+        if self.consecutive_failures >= cooldown_after:
+            self.cooldown_until = time.monotonic() + cooldown_seconds
+
+    def in_cooldown(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def score(self) -> float:
+        """Lower is healthier; unmeasured endpoints score 0 so they get probed"""
+        latency = self.ewma_latency or 0.0
+        return latency * (1 + 10 * self.error_rate) + self.error_rate
+
+    def p95_latency(self) -> Optional[float]:
+        if not self.recent_latencies:
+            return None
+        ordered = sorted(self.recent_latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'ewma_latency': self.ewma_latency,
+            'p95_latency': self.p95_latency(),
+            'error_rate': self.error_rate,
+            'requests': self.requests,
+            'failures': self.failures,
+            'batch_supported': self.batch_supported,
+            'in_cooldown': self.in_cooldown(time.monotonic())
+        }
+
+class RPCEndpointPool:
+    """Routes calls to the healthiest endpoint based on EWMA latency and error rate"""
+
+    def __init__(self, urls: Iterable[str], latency_alpha: float = 0.2, latency_samples: int = 200,
+                 cooldown_after: int = 3, cooldown_seconds: float = 10.0,
+                 hedge_default_delay: float = 0.5, hedge_min_delay: float = 0.05,
+                 backoff_base: float = 0.2, backoff_cap: float = 5.0):
+        self.endpoints: List[RPCEndpoint] = []
+        for url in urls:
+            if url and url not in [endpoint.url for endpoint in self.endpoints]:
+                self.endpoints.append(RPCEndpoint(url, latency_alpha, latency_samples))
+        if not self.endpoints:
+            raise ValueError("RPC endpoint pool requires at least one URL")
+        self.cooldown_after = cooldown_after
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def choose(self, exclude: Iterable[RPCEndpoint] = ()) -> Optional[RPCEndpoint]:
+        """Pick the healthiest endpoint, preferring ones not in cooldown"""
+        excluded = set(id(endpoint) for endpoint in exclude)
+        candidates = [endpoint for endpoint in self.endpoints if id(endpoint) not in excluded]
+        if not candidates:
+            return None
+
+        now = time.monotonic()
+        healthy = [endpoint for endpoint in candidates if not endpoint.in_cooldown(now)]
+        return min(healthy or candidates, key=lambda endpoint: endpoint.score())
+
+    def record_success(self, endpoint: RPCEndpoint, latency: float):
+        endpoint.record_success(latency)
+
+    def record_failure(self, endpoint: RPCEndpoint):
+        endpoint.record_failure(self.cooldown_after, self.cooldown_seconds)
+        if endpoint.in_cooldown(time.monotonic()):
+            logger.warning(f"RPC endpoint {endpoint.url} in cooldown after {endpoint.consecutive_failures} failures")
+
+    def hedge_delay(self, endpoint: RPCEndpoint) -> float:
+        """Delay before hedging a read to a second endpoint, based on the primary's p95"""
+        p95 = endpoint.p95_latency()
+        if p95 is None or len(endpoint.recent_latencies) < 20:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def get_stats(self):
+        return [endpoint.to_dict() for endpoint in self.endpoints]
@@ -0,0 +1,61 @@
+import gzip
+import json
+import time
+from typing import Any, Dict, Iterator, List
+
+class RPCRecorder:
+    """Capture an RPCClient session's JSON-RPC traffic to a gzipped JSON Lines file.
+
+    One line per request item, batches split: {"t": seconds since the
+    recording started, "ms": round-trip latency, "m": method, "p": params,
+    "r": result} or "e" in place of "r" for an error. Subscription traffic
+    from HeadTracker is recorded too, as {"t", "n": "subscribed", "r":
+    {"logs": bool}} when a subscription is established and {"t", "n":
+    "newHeads" | "logs", "r": notification result} for each notification, so
+    heads that arrived over WebSocket are part of the timeline. Attach with
+    rpc_client.recorder = RPCRecorder(path).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.started = time.monotonic()
+        self.recorded = 0
+
+    def record(self, payload: Any, response: Any, elapsed: float):
+        offset = round(time.monotonic() - self.started - elapsed, 6)
+        latency_ms = round(elapsed * 1000, 3)
+        requests = payload if isinstance(payload, list) else [payload]
+        if isinstance(response, list):
+            responses_by_id = {item.get("id"): item for item in response if isinstance(item, dict)}
+        else:
+            responses_by_id = {payload.get("id") if isinstance(payload, dict) else None: response}
+
+        for request in requests:
+            reply = responses_by_id.get(request.get("id"))
+            if not isinstance(reply, dict):
+                continue
+            entry = {"t": offset, "ms": latency_ms, "m": request["method"], "p": request.get("params", [])}
+            if "error" in reply:
+                entry["e"] = reply["error"]
+            else:
+                entry["r"] = reply.get("result")
+            self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.recorded += 1
+
+    def record_notification(self, kind: str, result: Any):
+        entry = {"t": round(time.monotonic() - self.started, 6), "n": kind, "r": result}
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self.recorded += 1
+
+    def close(self):
+        self.file.close()
+
+def read_recording(path: str) -> Iterator[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def request_key(method: str, params: List) -> str:
+    return json.dumps([method, params], separators=(",", ":"), sort_keys=True)
@@ -0,0 +1,2 @@
+# Simulator Module
+# Local stand-ins for the Sei RPC endpoints, used for offline development and load testing
\ No newline at end of file
@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import bisect
+import hashlib
+import itertools
+import math
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from aiohttp import web
+from config.settings import STABLECOIN_ADDRESSES, TRANSFER_EVENT_TOPIC, USDC_DECIMALS
+from core.bloom import keccak, logs_bloom
+from core.multicall import BALANCE_OF_SELECTOR
+
+USDC_ADDRESS = STABLECOIN_ADDRESSES["USDC"]
+INITIAL_BALANCE = 10_000_000 * 10**USDC_DECIMALS
+
+def _topic(address: str) -> str:
+    return "0x" + address[2:].zfill(64)
+
+class SyntheticChain:
+    """Generates Sei-like blocks full of USDC transfers.
+
+    Each block holds a Poisson-ish number of transactions around tps *
+    block_time; transfer_ratio of them move USDC. Senders and receivers are
+    drawn from a Zipf-distributed wallet population (a few wallets do most of
+    the volume), and amounts are Pareto-distributed with a heavy tail. Only
+    the last history_blocks blocks are kept, along with each wallet's balance
+    as of every retained block, so balance reads can be pinned to a block.
+    """
+
+    def __init__(self, tps: float = 20.0, block_time: float = 0.4, wallets: int = 100_000,
+                 zipf_exponent: float = 1.1, pareto_alpha: float = 1.16, min_amount: float = 1.0,
+                 transfer_ratio: float = 0.6, history_blocks: int = 20_000, start_block: int = 1,
+                 seed: int = 0):
+        self.tps = tps
+        self.block_time = block_time
+        self.pareto_alpha = pareto_alpha
+        self.min_amount = min_amount
+        self.transfer_ratio = transfer_ratio
+        self.history_blocks = history_blocks
+        self.random = random.Random(seed)
+        self.wallet_addresses = [
+            "0x" + hashlib.sha256(f"wallet-{index}-{seed}".encode()).hexdigest()[:40] for index in range(wallets)
+        ]
+        # Cumulative Zipf weights for O(log n) sampling with bisect
+        self.zipf_cumulative = list(itertools.accumulate(1 / (rank ** zipf_exponent) for rank in range(1, wallets + 1)))
+        self.head = start_block - 1
+        self.blocks: "OrderedDict[int, Dict]" = OrderedDict()
+        self.receipts: Dict[str, Dict] = {}
+        self.logs_by_block: Dict[int, List[Dict]] = {}
+        self.balances: Dict[str, int] = {}
+        # Per wallet: [(block_number, balance after that block)] in block order, trimmed with the history
+        self.balance_history: Dict[str, List[Tuple[int, int]]] = {}
+        self.changed_by_block: Dict[int, List[str]] = {}
+        self.produced_at: Dict[int, float] = {}
+        self.tx_counter = 0
+        self.transfers_generated = 0
+        self.produce_block()
+
+    def _wallet(self) -> str:
+        point = self.random.random() * self.zipf_cumulative[-1]
+        return self.wallet_addresses[bisect.bisect_left(self.zipf_cumulative, point)]
+
+    def _amount(self) -> int:
+        amount = min(self.min_amount * self.random.paretovariate(self.pareto_alpha), 1e9)
+        return int(amount * 10**USDC_DECIMALS)
+
+    def _transaction_count(self) -> int:
+        mean = self.tps * self.block_time
+        return max(0, round(self.random.gauss(mean, math.sqrt(mean)))) if mean > 0 else 0
+
+    def produce_block(self) -> int:
+        self.head += 1
+        block_number = self.head
+        block_hash = "0x%064x" % (block_number * 0x9E3779B1)
+        timestamp = time.time()
+        transactions, block_logs = [], []
+        changed = set()
+
+        for index in range(self._transaction_count()):
+            self.tx_counter += 1
+            tx_hash = "0x%064x" % self.tx_counter
+            sender, receiver = self._wallet(), self._wallet()
+            logs = []
+            if self.random.random() < self.transfer_ratio:
+                value = self._amount()
+                self.balances[sender] = self.balances.get(sender, INITIAL_BALANCE) - value
+                self.balances[receiver] = self.balances.get(receiver, INITIAL_BALANCE) + value
+                changed.add(sender)
+                changed.add(receiver)
+                logs.append({
+                    "address": USDC_ADDRESS,
+                    "topics": [TRANSFER_EVENT_TOPIC, _topic(sender), _topic(receiver)],
+                    "data": "0x%064x" % value,
+                    "blockNumber": hex(block_number),
+                    "blockHash": block_hash,
+                    "transactionHash": tx_hash,
+                    "transactionIndex": hex(index),
+                    "logIndex": hex(len(block_logs)),
+                    "removed": False
+                })
+                block_logs.extend(logs)
+                self.transfers_generated += 1
+            transactions.append({
+                "hash": tx_hash, "from": sender, "to": USDC_ADDRESS if logs else receiver,
+                "blockNumber": hex(block_number), "transactionIndex": hex(index), "input": "0x"
+            })
+            self.receipts[tx_hash] = {
+                "transactionHash": tx_hash, "blockNumber": hex(block_number), "blockHash": block_hash,
+                "status": "0x1", "logs": logs
+            }
+            if keccak is not None:
+                self.receipts[tx_hash]["logsBloom"] = logs_bloom(logs)
+
+        self.blocks[block_number] = {
+            "number": hex(block_number), "hash": block_hash,
+            "parentHash": "0x%064x" % ((block_number - 1) * 0x9E3779B1),
+            "timestamp": hex(int(timestamp)), "transactions": transactions
+        }
+        if keccak is not None:
+            self.blocks[block_number]["logsBloom"] = logs_bloom(block_logs)
+        self.logs_by_block[block_number] = block_logs
+        self.produced_at[block_number] = timestamp
+        for wallet in changed:
+            self.balance_history.setdefault(wallet, []).append((block_number, self.balances[wallet]))
+        self.changed_by_block[block_number] = list(changed)
+        self._prune()
+        return block_number
+
+    def _prune(self):
+        while len(self.blocks) > self.history_blocks:
+            block_number, block = self.blocks.popitem(last=False)
+            for tx in block["transactions"]:
+                self.receipts.pop(tx["hash"], None)
+            self.logs_by_block.pop(block_number, None)
+            self.produced_at.pop(block_number, None)
+            # Keep the last entry at or before the pruned block: it is the balance at the oldest retained one
+            for wallet in self.changed_by_block.pop(block_number, ()):
+                history = self.balance_history[wallet]
+                keep_from = bisect.bisect_right(history, (block_number, float("inf"))) - 1
+                if keep_from > 0:
+                    del history[:keep_from]
+
+    def get_block(self, block_number: int, full_transactions: bool) -> Optional[Dict]:
+        block = self.blocks.get(block_number)
+        if block is None or full_transactions:
+            return block
+        return dict(block, transactions=[tx["hash"] for tx in block["transactions"]])
+
+    def get_logs(self, log_filter: Dict) -> List[Dict]:
+        from_block = self._block_tag(log_filter.get("fromBlock", "latest"))
+        to_block = self._block_tag(log_filter.get("toBlock", "latest"))
+        addresses = log_filter.get("address") or []
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {address.lower() for address in addresses}
+        topics = log_filter.get("topics") or []
+        topic0 = topics[0] if topics else None
+
+        logs = []
+        for block_number in range(max(from_block, self.head - self.history_blocks), min(to_block, self.head) + 1):
+            for log in self.logs_by_block.get(block_number, []):
+                if addresses and log["address"].lower() not in addresses:
+                    continue
+                if topic0 and log["topics"][0] != topic0:
+                    continue
+                logs.append(log)
+        return logs
+
+    def balance_of(self, wallet_address: str, block_number: Optional[int] = None) -> Optional[int]:
+        """Balance after block_number (default: the head); None if that block's state is pruned"""
+        wallet_address = wallet_address.lower()
+        if block_number is None or block_number >= self.head:
+            return self.balances.get(wallet_address, INITIAL_BALANCE)
+        if block_number < self.head - len(self.blocks):
+            return None
+        history = self.balance_history.get(wallet_address, ())
+        index = bisect.bisect_right(history, (block_number, float("inf"))) - 1
+        return history[index][1] if index >= 0 else INITIAL_BALANCE
+
+    def _block_tag(self, tag) -> int:
+        if tag in ("latest", "pending", "safe", "finalized", None):
+            return self.head
+        if tag == "earliest":
+            return 0
+        return int(tag, 16)
+
+class SyntheticChainServer:
+    """JSON-RPC front end for a SyntheticChain, producing a block every block_time.
+
+    Serves eth_blockNumber, eth_getBlockByNumber, eth_getTransactionReceipt,
+    eth_getLogs, eth_call balanceOf (at the requested block tag, within the
+    retained history) and eth_getCode (empty, so clients skip Multicall3). A non-zero
+    max_logs_range rejects wider eth_getLogs ranges the way capped nodes do.
+    batch_rejection mimics nodes without batch support: "error" answers a
+    batch array with one error object, an HTTP status answers it with that status.
+    """
+
+    def __init__(self, chain: SyntheticChain, host: str = "127.0.0.1", port: int = 8548):
+        self.chain = chain
+        self.host = host
+        self.port = port
+        self.runner: Optional[web.AppRunner] = None
+        self.producer_task: Optional[asyncio.Task] = None
+        self.max_logs_range = 0
+        self.batch_rejection = None
+        self.stats = {'requests': 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def start(self, produce: bool = True):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/", self._handle_http)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        if produce:
+            self.producer_task = asyncio.create_task(self._produce())
+
+    async def stop(self):
+        if self.producer_task:
+            self.producer_task.cancel()
+            try:
+                await self.producer_task
+            except asyncio.CancelledError:
+                pass
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def _produce(self):
+        # Schedule against absolute times so slow blocks do not stretch the block time
+        loop = asyncio.get_running_loop()
+        next_block_at = loop.time()
+        while True:
+            next_block_at += self.chain.block_time
+            await asyncio.sleep(max(0.0, next_block_at - loop.time()))
+            self.chain.produce_block()
+
+    def _dispatch(self, request: Dict) -> Dict:
+        method = request.get("method")
+        params = request.get("params", [])
+        self.stats['requests'] += 1
+        chain = self.chain
+
+        if method == "eth_blockNumber":
+            result = hex(chain.head)
+        elif method == "eth_getBlockByNumber":
+            result = chain.get_block(chain._block_tag(params[0]), bool(params[1]) if len(params) > 1 else False)
+        elif method == "eth_getTransactionReceipt":
+            result = chain.receipts.get(params[0])
+        elif method == "eth_getLogs":
+            log_filter = params[0]
+            span = (chain._block_tag(log_filter.get("toBlock", "latest"))
+                    - chain._block_tag(log_filter.get("fromBlock", "latest")) + 1)
+            if self.max_logs_range and span > self.max_logs_range:
+                return {"jsonrpc": "2.0", "id": request.get("id"),
+                        "error": {"code": -32005, "message": f"block range exceeds {self.max_logs_range}"}}
+            result = chain.get_logs(log_filter)
+        elif method == "eth_call":
+            call = params[0]
+            data = call.get("data") or call.get("input") or ""
+            if call.get("to", "").lower() != USDC_ADDRESS.lower() or not data[2:].startswith(BALANCE_OF_SELECTOR):
+                return {"jsonrpc": "2.0", "id": request.get("id"),
+                        "error": {"code": -32000, "message": "execution reverted"}}
+            block_tag = params[1] if len(params) > 1 else "latest"
+            balance = chain.balance_of("0x" + data[-40:], chain._block_tag(block_tag))
+            if balance is None:
+                return {"jsonrpc": "2.0", "id": request.get("id"),
+                        "error": {"code": -32000, "message": "missing trie node (state pruned)"}}
+            result = "0x%064x" % max(0, balance)
+        elif method == "eth_getCode":
+            result = "0x"
+        elif method == "eth_chainId":
+            result = hex(1329)
+        else:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": f"method {method} not supported"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    async def _handle_http(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            self.stats['batches'] = self.stats.get('batches', 0) + 1
+            if self.batch_rejection == "error":
+                return web.json_response({"jsonrpc": "2.0", "id": None,
+                                          "error": {"code": -32600, "message": "batch requests are not supported"}})
+            if self.batch_rejection:
+                return web.json_response({"error": "batch requests are not supported"}, status=self.batch_rejection)
+            return web.json_response([self._dispatch(item) for item in body])
+        return web.json_response(self._dispatch(body))
+
+async def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Sei chain full of USDC transfers")
+    parser.add_argument("--tps", type=float, default=20.0)
+    parser.add_argument("--block-time", type=float, default=0.4)
+    parser.add_argument("--wallets", type=int, default=100_000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--port", type=int, default=8548)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chain = SyntheticChain(tps=args.tps, block_time=args.block_time, wallets=args.wallets,
+                           zipf_exponent=args.zipf, seed=args.seed)
+    server = SyntheticChainServer(chain, port=args.port)
+    await server.start()
+    print(f"Synthetic chain on {server.url}: {args.tps} tps, {args.block_time}s blocks, {args.wallets} wallets")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
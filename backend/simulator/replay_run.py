@@ -0,0 +1,81 @@
+"""
+Run BlockProcessor end to end against a recorded session, offline.
+
+Run from the backend directory:
+    python -m simulator.replay_run recording.jsonl.gz [--speed 10] [--latency-ms 5 --jitter-ms 2]
+
+Prints a JSON summary (blocks/sec, wall time, unmatched requests) that can be
+compared between versions.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from config.settings import POLL_INTERVAL
+from core.rpc_client import RPCClient
+from simulator.replay_server import RPCReplayServer
+from watcher.block_processor import BlockProcessor
+
+async def replay(recording_path: str, speed: float = 1.0, latency_ms=None, jitter_ms: float = 0.0,
+                 port: int = 8547, ingestion_mode: str = "blocks"):
+    server = RPCReplayServer(recording_path, port=port, speed=speed, latency_ms=latency_ms, jitter_ms=jitter_ms)
+    await server.start()
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            block_processor = BlockProcessor(rpc_client, ingestion_mode=ingestion_mode)
+            await block_processor.start_event_processing()
+            first_block = None
+            processing_seconds = 0.0
+            transfers = whale_events = 0
+            started = time.perf_counter()
+            try:
+                while True:
+                    head = await rpc_client.get_block_number()
+                    if block_processor.last_block_number is None or head > block_processor.last_block_number:
+                        if first_block is None:
+                            first_block = head
+                        batch_start = time.perf_counter()
+                        block_transfers, block_whale_events = await block_processor.process_new_blocks(head)
+                        transfers += len(block_transfers)
+                        whale_events += len(block_whale_events)
+                        processing_seconds += time.perf_counter() - batch_start
+                    elif server.timeline_finished:
+                        break
+                    else:
+                        await asyncio.sleep(POLL_INTERVAL / speed)
+            finally:
+                await block_processor.stop_event_processing()
+            wall_seconds = time.perf_counter() - started
+
+            blocks = 0 if first_block is None else block_processor.last_block_number - first_block + 1
+            return {
+                'recording': recording_path,
+                'speed': speed,
+                'blocks_processed': blocks,
+                'wall_seconds': round(wall_seconds, 3),
+                'processing_seconds': round(processing_seconds, 3),
+                'blocks_per_processing_second': round(blocks / processing_seconds, 2) if processing_seconds else None,
+                'requests': server.stats['requests'],
+                'unmatched_requests': server.stats['unmatched'],
+                'logs_from_recorded_ranges': server.stats['logs_from_recorded_ranges'],
+                'transfers': transfers,
+                'whale_events': whale_events
+            }
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through BlockProcessor")
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--latency-ms", type=float, default=None)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8547)
+    parser.add_argument("--mode", choices=["blocks", "logs"], default="blocks")
+    args = parser.parse_args()
+    result = asyncio.run(replay(args.recording, args.speed, args.latency_ms, args.jitter_ms, args.port, args.mode))
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
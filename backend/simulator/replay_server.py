@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import bisect
+import random
+from collections import defaultdict, deque
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from aiohttp import web
+from core.rpc_recording import read_recording, request_key
+
+# (fromBlock, toBlock, addresses, per-position topics) of an eth_getLogs filter; None matches anything
+LogFilter = Tuple[int, int, Optional[FrozenSet[str]], Tuple[Optional[FrozenSet[str]], ...]]
+
+def _lowered(values) -> Optional[FrozenSet[str]]:
+    if isinstance(values, str):
+        values = [values]
+    return frozenset(value.lower() for value in values) if values else None
+
+def _parse_log_filter(params: List) -> Optional[LogFilter]:
+    """The filter of an eth_getLogs request, or None if its range is not given as block numbers"""
+    log_filter = params[0] if params else {}
+    try:
+        from_block = int(log_filter["fromBlock"], 16)
+        to_block = int(log_filter["toBlock"], 16)
+    except (KeyError, TypeError, ValueError):
+        return None
+    topics = tuple(_lowered(topic) for topic in log_filter.get("topics") or ())
+    return from_block, to_block, _lowered(log_filter.get("address")), topics
+
+def _log_matches(log: Dict, log_filter: LogFilter) -> bool:
+    _, _, addresses, topics = log_filter
+    if addresses is not None and log["address"].lower() not in addresses:
+        return False
+    log_topics = log.get("topics") or ()
+    for position, allowed in enumerate(topics):
+        if allowed is not None and (position >= len(log_topics) or log_topics[position].lower() not in allowed):
+            return False
+    return True
+
+def _filter_includes(broad: LogFilter, narrow: LogFilter) -> bool:
+    """True if every log matching narrow's addresses and topics also matches broad's"""
+    _, _, addresses, topics = broad
+    _, _, narrow_addresses, narrow_topics = narrow
+    if addresses is not None and (narrow_addresses is None or not narrow_addresses <= addresses):
+        return False
+    for position, allowed in enumerate(topics):
+        narrow_allowed = narrow_topics[position] if position < len(narrow_topics) else None
+        if allowed is not None and (narrow_allowed is None or not narrow_allowed <= allowed):
+            return False
+    return True
+
+class RPCReplayServer:
+    """Local JSON-RPC server answering from an RPCRecorder file.
+
+    eth_blockNumber follows the recorded timeline, scaled by speed, so the
+    head advances as it did in the session (speed=10 replays ten times
+    faster). The timeline merges polled heads with newHeads notifications
+    recorded from HeadTracker's subscription, so sessions that ran on
+    WebSocket heads replay too. Every other request is matched on method and
+    params; repeated requests get the recorded responses in order, then the
+    last one again. An eth_getLogs filter that was never requested as such
+    is answered block by block from the logs recorded eth_getLogs calls
+    returned, when calls with filters at least as broad cover its range, or
+    else from a recorded logs subscription that covered it.
+    Responses are delayed by the recorded latency divided by speed, or by a
+    fixed latency_ms plus uniform jitter_ms if given. Jitter uses a seeded RNG
+    so runs are repeatable.
+    """
+
+    def __init__(self, recording_path: str, host: str = "127.0.0.1", port: int = 8547,
+                 speed: float = 1.0, latency_ms: Optional[float] = None, jitter_ms: float = 0.0,
+                 seed: int = 0):
+        self.host = host
+        self.port = port
+        self.speed = max(speed, 1e-9)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.responses: Dict[str, deque] = defaultdict(deque)
+        self.last_responses: Dict[str, Dict] = {}
+        self.head_times: List[float] = []
+        self.head_values: List[str] = []
+        # Logs subscription notifications by block, and the [first, last] blocks each session covered
+        self.notified_logs: Dict[int, List[Dict]] = defaultdict(list)
+        self.log_coverage: List[List[Optional[int]]] = []
+        # Logs returned by recorded eth_getLogs calls, by block and log index, and the filters of those calls
+        self.fetched_logs: Dict[int, Dict[int, Dict]] = defaultdict(dict)
+        self.fetched_filters: List[LogFilter] = []
+        self.started_at: Optional[float] = None
+        self.runner: Optional[web.AppRunner] = None
+        self.stats = {'requests': 0, 'unmatched': 0, 'logs_from_recorded_ranges': 0, 'logs_from_notifications': 0}
+        self._load(recording_path)
+
+    def _load(self, path: str):
+        heads = []
+        session = None
+        for entry in read_recording(path):
+            kind = entry.get("n")
+            if kind == "subscribed":
+                session = [None, None] if entry["r"].get("logs") else None
+                if session:
+                    self.log_coverage.append(session)
+            elif kind == "newHeads":
+                head = int(entry["r"]["number"], 16)
+                heads.append((entry["t"], head))
+                # Same rule as HeadTracker: the first head's logs may predate the subscription,
+                # and block N is complete once head N+1 arrives
+                if session is not None:
+                    if session[0] is None:
+                        session[0] = head + 1
+                    else:
+                        session[1] = head - 1
+            elif kind == "logs":
+                self._add_notified_log(entry["r"])
+            elif entry["m"] == "eth_blockNumber" and "r" in entry:
+                heads.append((entry["t"], int(entry["r"], 16)))
+            else:
+                self.responses[request_key(entry["m"], entry["p"])].append(entry)
+                if entry["m"] == "eth_getLogs" and isinstance(entry.get("r"), list):
+                    self._add_fetched_logs(entry["p"], entry["r"])
+
+        # Polled and subscribed heads interleave and may disagree briefly; the replayed head never goes back
+        highest = None
+        for offset, head in sorted(heads):
+            highest = head if highest is None else max(highest, head)
+            self.head_times.append(offset)
+            self.head_values.append(hex(highest))
+
+    def _add_notified_log(self, log: Dict):
+        block_logs = self.notified_logs[int(log["blockNumber"], 16)]
+        if log.get("removed"):
+            block_logs[:] = [
+                notified for notified in block_logs
+                if (notified["blockHash"], notified["logIndex"]) != (log["blockHash"], log["logIndex"])
+            ]
+        else:
+            block_logs.append(log)
+
+    def _add_fetched_logs(self, params: List, logs: List[Dict]):
+        log_filter = _parse_log_filter(params)
+        if log_filter is None:
+            return
+        self.fetched_filters.append(log_filter)
+        for log in logs:
+            if not log.get("removed"):
+                self.fetched_logs[int(log["blockNumber"], 16)][int(log["logIndex"], 16)] = log
+
+    def _logs_from_recorded_ranges(self, params: List) -> Optional[List[Dict]]:
+        """Answer an eth_getLogs filter from recorded eth_getLogs results, if their ranges cover its range"""
+        log_filter = _parse_log_filter(params)
+        if log_filter is None:
+            return None
+        from_block, to_block = log_filter[0], log_filter[1]
+        # Calls with other chunk boundaries cover the range together, as long as each filter includes the request's
+        ranges = sorted(
+            (recorded[0], recorded[1]) for recorded in self.fetched_filters
+            if recorded[1] >= from_block and recorded[0] <= to_block and _filter_includes(recorded, log_filter)
+        )
+        covered_through = from_block - 1
+        for first, last in ranges:
+            if first > covered_through + 1:
+                break
+            covered_through = max(covered_through, last)
+        if covered_through < to_block:
+            return None
+
+        logs = []
+        for block_number in range(from_block, to_block + 1):
+            block_logs = self.fetched_logs.get(block_number)
+            if block_logs:
+                logs.extend(log for _, log in sorted(block_logs.items()) if _log_matches(log, log_filter))
+        return logs
+
+    def _logs_from_notifications(self, params: List) -> Optional[List[Dict]]:
+        """Answer an eth_getLogs filter from subscription notifications, if a session covered its range"""
+        log_filter = _parse_log_filter(params)
+        if log_filter is None:
+            return None
+        from_block, to_block = log_filter[0], log_filter[1]
+        if not any(first is not None and last is not None and first <= from_block and to_block <= last
+                   for first, last in self.log_coverage):
+            return None
+
+        logs = []
+        for block_number in range(from_block, to_block + 1):
+            for log in sorted(self.notified_logs.get(block_number, ()), key=lambda log: int(log["logIndex"], 16)):
+                if _log_matches(log, log_filter):
+                    logs.append(log)
+        return logs
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def timeline_finished(self) -> bool:
+        """True once replay time has passed the last recorded head"""
+        return not self.head_times or self._replay_time() >= self.head_times[-1]
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/", self._handle_http)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.started_at = asyncio.get_running_loop().time()
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    def _replay_time(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (asyncio.get_running_loop().time() - self.started_at) * self.speed
+
+    def _answer(self, request: Dict):
+        """(response, recorded latency in ms) for one request item"""
+        method = request.get("method")
+        params = request.get("params", [])
+        self.stats['requests'] += 1
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+
+        if method == "eth_blockNumber" and self.head_values:
+            index = max(0, bisect.bisect_right(self.head_times, self._replay_time()) - 1)
+            reply["result"] = self.head_values[index]
+            return reply, 0.0
+
+        key = request_key(method, params)
+        queue = self.responses.get(key)
+        if queue:
+            entry = queue.popleft()
+            self.last_responses[key] = entry
+        else:
+            entry = self.last_responses.get(key)
+        if entry is None and method == "eth_getLogs":
+            logs = self._logs_from_recorded_ranges(params)
+            if logs is not None:
+                self.stats['logs_from_recorded_ranges'] += 1
+                reply["result"] = logs
+                return reply, 0.0
+            logs = self._logs_from_notifications(params)
+            if logs is not None:
+                self.stats['logs_from_notifications'] += 1
+                reply["result"] = logs
+                return reply, 0.0
+        if entry is None:
+            self.stats['unmatched'] += 1
+            reply["error"] = {"code": -32000, "message": f"{method} with these params is not in the recording"}
+            return reply, 0.0
+
+        if "e" in entry:
+            reply["error"] = entry["e"]
+        else:
+            reply["result"] = entry["r"]
+        return reply, entry["ms"]
+
+    def _delay(self, recorded_ms: float) -> float:
+        if self.latency_ms is not None:
+            delay_ms = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+        else:
+            delay_ms = recorded_ms / self.speed
+        return delay_ms / 1000
+
+    async def _handle_http(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        items = body if isinstance(body, list) else [body]
+        answers = [self._answer(item) for item in items]
+        # A batch takes as long as its slowest recorded item
+        delay = self._delay(max(latency for _, latency in answers))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        replies = [reply for reply, _ in answers]
+        return web.json_response(replies if isinstance(body, list) else replies[0])
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded JSON-RPC session")
+    parser.add_argument("recording", help="File written by RPCRecorder (RPC_RECORD_PATH)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8547)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Fixed latency instead of the recorded one")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = RPCReplayServer(args.recording, args.host, args.port, args.speed,
+                             args.latency_ms, args.jitter_ms, args.seed)
+    await server.start()
+    print(f"Replaying {args.recording} on {server.url} at {args.speed}x")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
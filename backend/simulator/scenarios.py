@@ -0,0 +1,636 @@
+"""
+Scenario checks for the watcher's failure and scheduling paths, run against
+in-process components and local stand-in servers.
+
+Run from the backend directory:
+    python -m simulator.scenarios [name ...]
+
+Prints a JSON report with each scenario's observations and whether it
+passed; the exit status is 1 if any scenario failed. With no names, every
+scenario runs.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+from datetime import datetime
+from config.settings import LOGS_RANGE_INITIAL_CHUNK, STABLECOIN_ADDRESSES, TRANSFER_EVENT_TOPIC
+from core.address_registry import AddressRegistry
+from core.event_bus import EventBus, Event, EventPriority
+from core.events import EventTypes
+from core.risk_correlator import RiskCorrelator
+from core.rpc_client import RPCClient, RPCError
+from core.rpc_recording import RPCRecorder
+from simulator.chain_simulator import SyntheticChain, SyntheticChainServer
+from simulator.replay_server import RPCReplayServer
+from simulator.ws_standin import HeadStandInServer
+from watcher.balance_monitor import BalanceMonitor
+from watcher.block_processor import BlockProcessor
+from watcher.head_tracker import HeadTracker
+from watcher.replay_engine import ReplayEngine
+from watcher.transfer_batch import TransferBatch
+from watcher.whale_tracker import WhaleTracker
+
+SCENARIOS: Dict[str, Callable] = {}
+
+def scenario(function):
+    SCENARIOS[function.__name__] = function
+    return function
+
+def _transfer_log(index: int) -> Dict:
+    return {
+        "address": STABLECOIN_ADDRESSES["USDC"],
+        "topics": [TRANSFER_EVENT_TOPIC, "0x" + "%064x" % (2 * index + 1), "0x" + "%064x" % (2 * index + 2)],
+        "data": "0x%064x" % (10**6 * (index + 1)),
+        "transactionHash": "0x%064x" % index
+    }
+
+async def _collect_heads(head_tracker: HeadTracker, heads: list):
+    async for head in head_tracker.heads():
+        heads.append(head)
+
+async def _wait_for(condition, timeout: float = 5.0) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+def _event(priority: EventPriority, index: int = 0) -> Event:
+    return Event("scenario", {'n': index}, priority, time.time())
+
+@scenario
+async def event_bus_fresh_high_behind_overdue_low():
+    """A fresh HIGH event is dispatched ahead of an overdue LOW backlog"""
+    bus = EventBus()
+    bus.lane_deadlines[EventPriority.LOW] = 0.01
+    for index in range(50):
+        bus.publish_nowait(_event(EventPriority.LOW, index))
+    await asyncio.sleep(0.02)
+    bus.publish_nowait(_event(EventPriority.HIGH))
+    order = [bus._dequeue().priority.name for _ in range(5)]
+    return {'passed': order[0] == 'HIGH', 'dequeue_order': order}
+
+@scenario
+async def event_bus_overdue_low_keeps_weighted_share():
+    """An overdue LOW lane still gets its weighted share under a steady HIGH load"""
+    bus = EventBus()
+    bus.lane_deadlines[EventPriority.LOW] = 0.01
+    for index in range(20):
+        bus.publish_nowait(_event(EventPriority.LOW, index))
+    await asyncio.sleep(0.02)
+    for index in range(50):
+        bus.publish_nowait(_event(EventPriority.HIGH, index))
+    order = [bus._dequeue().priority.name for _ in range(18)]
+    low_share = order.count('LOW')
+    return {'passed': order[0] == 'HIGH' and low_share == 2, 'low_dispatched_of_18': low_share}
+
+@scenario
+async def event_bus_limited_type_leaves_workers_free():
+    """A burst of a concurrency-limited type does not tie up the workers a CRITICAL event needs"""
+    bus = EventBus(workers=4)
+    bus.set_concurrency(EventTypes.BALANCE_CHANGE, 1)
+    loop = asyncio.get_running_loop()
+    running = [0, 0]
+    whale_latency = []
+
+    async def slow_balance_handler(event: Event):
+        running[0] += 1
+        running[1] = max(running[1], running[0])
+        await asyncio.sleep(0.1)
+        running[0] -= 1
+
+    async def whale_handler(event: Event):
+        whale_latency.append(loop.time() - event.timestamp)
+
+    bus.subscribe(EventTypes.BALANCE_CHANGE, slow_balance_handler)
+    bus.subscribe(EventTypes.WHALE_ACTIVITY, whale_handler)
+    await bus.start_processing()
+    try:
+        for index in range(6):
+            bus.publish_nowait(Event(EventTypes.BALANCE_CHANGE, {'n': index}, EventPriority.MEDIUM, loop.time()))
+        await asyncio.sleep(0.02)
+        bus.publish_nowait(Event(EventTypes.WHALE_ACTIVITY, {}, EventPriority.CRITICAL, loop.time()))
+        handled = await _wait_for(lambda: bus.stats['handled'] == 7, timeout=3)
+    finally:
+        await bus.stop_processing()
+    return {
+        'passed': handled and whale_latency and whale_latency[0] < 0.05 and running[1] == 1,
+        'critical_wait_ms': round(whale_latency[0] * 1000, 1) if whale_latency else None,
+        'max_concurrent_balance_handlers': running[1],
+        'all_handled': handled
+    }
+
+@scenario
+async def address_registry_frees_idle_wallets():
+    """Ids of wallets that left the whale window are freed and reused rather than kept forever"""
+    registry = AddressRegistry()
+    tracker = WhaleTracker(registry=registry)
+    tracker.event_bus = None
+    start = 1_700_000_000
+    transfers = 200_000
+    for index in range(transfers):
+        # Every transfer is between two never-seen wallets, one second apart
+        timestamp = datetime.fromtimestamp(start + index)
+        from_id = registry.id_of("0x%040x" % (2 * index))
+        to_id = registry.id_of("0x%040x" % (2 * index + 1))
+        tracker.analyze(1.0, "0x%064x" % index, from_id, to_id, timestamp)
+        if index % 600 == 0:
+            registry.sweep()
+    registry.sweep()
+    registry.sweep()
+    tracked = len(tracker.wallet_activity)
+    stats = registry.get_stats()
+    return {
+        'passed': stats['addresses'] == tracked and stats['slots'] < 4 * tracked,
+        'wallets_seen': 2 * transfers,
+        'tracked_wallets': tracked,
+        'registry': stats
+    }
+
+@scenario
+async def registry_sweep_spares_uncommitted_range():
+    """Sweeps between a replayed range's block commits leave the range's not-yet-committed ids in place"""
+    chain = SyntheticChain(wallets=100)
+    for _ in range(10):
+        chain.produce_block()
+    server = SyntheticChainServer(chain, port=8581)
+    await server.start(produce=False)
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            engine = ReplayEngine(rpc_client)
+            block_processor = engine.block_processor
+            block_processor.registry_sweep_seconds = 0
+            registry = block_processor.transaction_analyzer.registry
+            start = 2
+            block_processor.last_block_number = start - 1
+
+            transfers = block_processor.transaction_analyzer.new_batch()
+            expected = {}
+            for index in range(12):
+                from_address, to_address = "0x%040x" % (0xa000 + 2 * index), "0x%040x" % (0xa001 + 2 * index)
+                tx_hash = "0x%064x" % (0xb000 + index)
+                expected[tx_hash] = (from_address, to_address)
+                transfers.append(tx_hash, registry.id_of(from_address), registry.id_of(to_address), 10**6,
+                                 start + index // 2, index % 2, 1_700_000_000.0 + index)
+
+            committed = []
+            analyze = block_processor.whale_tracker.analyze
+
+            def record_parties(amount, tx_hash, from_id, to_id, timestamp):
+                committed.append((tx_hash, (registry.addresses[from_id], registry.addresses[to_id])))
+                return analyze(amount, tx_hash, from_id, to_id, timestamp)
+
+            block_processor.whale_tracker.analyze = record_parties
+            await engine.commit_range(start, start + 5, transfers, 1_700_000_000.0, 1_700_000_012.0)
+    finally:
+        await server.stop()
+    misattributed = [tx_hash for tx_hash, parties in committed if parties != expected[tx_hash]]
+    return {
+        'passed': len(committed) == 12 and not misattributed,
+        'committed_transfers': len(committed),
+        'misattributed_transfers': len(misattributed),
+        'registry': registry.get_stats()
+    }
+
+@scenario
+async def recording_replays_subscription_heads():
+    """A session whose heads and logs arrived over WebSocket replays with an advancing head and its logs"""
+    standin = HeadStandInServer(port=8571)
+    await standin.start()
+    path = os.path.join(tempfile.mkdtemp(), "session.jsonl.gz")
+    try:
+        async with RPCClient(standin.url, fallback_urls=[]) as rpc_client:
+            rpc_client.recorder = RPCRecorder(path)
+            head_tracker = HeadTracker(rpc_client, ws_url=standin.ws_url, poll_interval=60, subscribe_logs=True)
+            heads = []
+            collector = asyncio.create_task(_collect_heads(head_tracker, heads))
+            await _wait_for(lambda: head_tracker.subscribed)
+            for index in range(10):
+                await standin.produce_block([_transfer_log(index)])
+            await _wait_for(lambda: heads and heads[-1] >= standin.head - 1)
+            collector.cancel()
+            await asyncio.gather(collector, return_exceptions=True)
+            rpc_client.recorder.close()
+    finally:
+        await standin.stop()
+
+    replay = RPCReplayServer(path)
+    last_head = int(replay.head_values[-1], 16) if replay.head_values else None
+    # Blocks 3..10 were complete under the subscription (block 2's head opened it, head 11 closes block 10)
+    logs = replay._logs_from_notifications([{
+        "fromBlock": hex(3), "toBlock": hex(10),
+        "address": [STABLECOIN_ADDRESSES["USDC"]], "topics": [TRANSFER_EVENT_TOPIC]
+    }])
+    return {
+        'passed': last_head == standin.head and len(replay.head_times) >= 10 and logs is not None and len(logs) == 8,
+        'live_heads': heads,
+        'recorded_heads': len(replay.head_times),
+        'replay_last_head': last_head,
+        'logs_served_for_3_to_10': None if logs is None else len(logs)
+    }
+
+@scenario
+async def replay_rechunks_recorded_log_ranges():
+    """eth_getLogs ranges cut differently from the recorded ones are answered from the recorded results"""
+    chain = SyntheticChain(tps=50, wallets=100)
+    for _ in range(30):
+        chain.produce_block()
+    server = SyntheticChainServer(chain, port=8584)
+    await server.start(produce=False)
+    path = os.path.join(tempfile.mkdtemp(), "session.jsonl.gz")
+    usdc = [STABLECOIN_ADDRESSES["USDC"]]
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            rpc_client.recorder = RPCRecorder(path)
+            for start in range(2, 22, 5):
+                await rpc_client.get_logs(start, start + 4, usdc, [TRANSFER_EVENT_TOPIC])
+            rpc_client.recorder.close()
+    finally:
+        await server.stop()
+
+    replay = RPCReplayServer(path)
+
+    def replayed(from_block: int, to_block: int, topics=(TRANSFER_EVENT_TOPIC,)):
+        log_filter = {"fromBlock": hex(from_block), "toBlock": hex(to_block), "address": usdc[0]}
+        if topics:
+            log_filter["topics"] = list(topics)
+        reply, _ = replay._answer({"jsonrpc": "2.0", "id": 1, "method": "eth_getLogs", "params": [log_filter]})
+        return reply.get("result")
+
+    expected = chain.get_logs({"fromBlock": hex(4), "toBlock": hex(17), "address": usdc})
+    rechunked = replayed(4, 17)
+    beyond_recording = replayed(15, 25)
+    broader_filter = replayed(4, 17, topics=())
+    return {
+        'passed': (rechunked == expected and bool(expected) and beyond_recording is None
+                   and broader_filter is None and replay.stats['logs_from_recorded_ranges'] == 1),
+        'logs_for_4_to_17': None if rechunked is None else len(rechunked),
+        'expected_logs': len(expected),
+        'range_beyond_recording_answered': beyond_recording is not None,
+        'broader_filter_answered': broader_filter is not None
+    }
+
+@scenario
+async def head_tracker_survives_close_while_subscribing():
+    """A socket closed during eth_subscribe falls back to polling and resubscribes later"""
+    standin = HeadStandInServer(port=8572)
+    standin.close_on_subscribe = True
+    await standin.start()
+    try:
+        async with RPCClient(standin.url, fallback_urls=[]) as rpc_client:
+            head_tracker = HeadTracker(rpc_client, ws_url=standin.ws_url, poll_interval=0.05)
+            heads = []
+            collector = asyncio.create_task(_collect_heads(head_tracker, heads))
+            await standin.produce_block()
+            polled = await _wait_for(lambda: heads and heads[-1] == standin.head, timeout=2)
+            standin.close_on_subscribe = False
+            resubscribed = await _wait_for(lambda: head_tracker.subscribed, timeout=10)
+            await standin.produce_block()
+            followed = await _wait_for(lambda: heads and heads[-1] == standin.head, timeout=2)
+            maintain_alive = not head_tracker.maintain_task.done()
+            collector.cancel()
+            await asyncio.gather(collector, return_exceptions=True)
+    finally:
+        await standin.stop()
+    return {
+        'passed': polled and resubscribed and followed and maintain_alive,
+        'polled_while_down': polled,
+        'resubscribed': resubscribed,
+        'head_followed_after_resubscribe': followed,
+        'reconnects': head_tracker.reconnects
+    }
+
+@scenario
+async def head_tracker_polls_through_dropped_subscription():
+    """Heads keep advancing by polling while the socket is down, and the subscription comes back"""
+    standin = HeadStandInServer(port=8576)
+    await standin.start()
+    try:
+        async with RPCClient(standin.url, fallback_urls=[]) as rpc_client:
+            head_tracker = HeadTracker(rpc_client, ws_url=standin.ws_url, poll_interval=0.05)
+            heads = []
+            collector = asyncio.create_task(_collect_heads(head_tracker, heads))
+            subscribed = await _wait_for(lambda: head_tracker.subscribed)
+            await standin.drop_connections()
+            dropped = await _wait_for(lambda: not head_tracker.subscribed, timeout=2)
+            for _ in range(3):
+                await standin.produce_block()
+            polled = await _wait_for(lambda: heads and heads[-1] == standin.head, timeout=2)
+            resubscribed = await _wait_for(lambda: head_tracker.subscribed, timeout=10)
+            await standin.produce_block()
+            followed = await _wait_for(lambda: heads and heads[-1] == standin.head, timeout=2)
+            collector.cancel()
+            await asyncio.gather(collector, return_exceptions=True)
+    finally:
+        await standin.stop()
+    return {
+        'passed': subscribed and dropped and polled and resubscribed and followed and head_tracker.reconnects >= 1,
+        'noticed_drop': dropped,
+        'polled_while_down': polled,
+        'resubscribed': resubscribed,
+        'head_followed_after_resubscribe': followed,
+        'reconnects': head_tracker.reconnects
+    }
+
+@scenario
+async def head_tracker_resubscribes_after_malformed_notifications():
+    """A head without a number, a log without a block number or a non-object result means a reconnect, not a crash"""
+    standin = HeadStandInServer(port=8582)
+    await standin.start()
+    bad_notifications = [("newHeads", {"hash": "0x01"}), ("logs", {"logIndex": "0x0"}), ("newHeads", "0x05")]
+    recovered = []
+    try:
+        async with RPCClient(standin.url, fallback_urls=[]) as rpc_client:
+            head_tracker = HeadTracker(rpc_client, ws_url=standin.ws_url, poll_interval=0.05, subscribe_logs=True)
+            heads = []
+            collector = asyncio.create_task(_collect_heads(head_tracker, heads))
+            for kind, result in bad_notifications:
+                await _wait_for(lambda: head_tracker.subscribed, timeout=10)
+                reconnects = head_tracker.reconnects
+                await standin.push(kind, result)
+                recovered.append(await _wait_for(lambda: head_tracker.reconnects > reconnects, timeout=10))
+            resubscribed = await _wait_for(lambda: head_tracker.subscribed, timeout=10)
+            for index in range(3):
+                await standin.produce_block([_transfer_log(index)])
+            followed = await _wait_for(lambda: heads and heads[-1] == standin.head - 1, timeout=2)
+            maintain_alive = not head_tracker.maintain_task.done()
+            collector.cancel()
+            await asyncio.gather(collector, return_exceptions=True)
+    finally:
+        await standin.stop()
+    return {
+        'passed': all(recovered) and resubscribed and followed and maintain_alive,
+        'reconnected_after_each': recovered,
+        'head_followed_after_resubscribe': followed,
+        'maintain_alive': maintain_alive
+    }
+
+@scenario
+async def rpc_pool_fails_over_and_cools_down():
+    """A fast primary that starts failing is retried on the backup until cooldown takes it out of rotation"""
+    primary = HeadStandInServer(port=8577)
+    # Slow enough that the primary's latency keeps it preferred despite its first failures
+    backup = HeadStandInServer(port=8578)
+    backup.http_delay = 0.5
+    await primary.start()
+    await backup.start()
+    try:
+        async with RPCClient(primary.url, fallback_urls=[backup.url], hedging=False) as rpc_client:
+            rpc_client.pool.backoff_base = 0.01
+            for _ in range(10):
+                await rpc_client.get_block_number()
+            primary.http_status = 503
+            requests_before_failing = primary.http_requests
+            heads = [await rpc_client.get_block_number() for _ in range(8)]
+            stats = {endpoint['url']: endpoint for endpoint in rpc_client.get_endpoint_stats()}
+    finally:
+        await primary.stop()
+        await backup.stop()
+    failed_requests = primary.http_requests - requests_before_failing
+    return {
+        'passed': heads == [backup.head] * 8 and failed_requests == rpc_client.pool.cooldown_after
+                  and stats[primary.url]['in_cooldown'],
+        'primary_requests_while_failing': failed_requests,
+        'primary_in_cooldown': stats[primary.url]['in_cooldown'],
+        'backup_requests': backup.http_requests
+    }
+
+@scenario
+async def rpc_pool_hedges_slow_primary():
+    """A read stuck on a slow primary is raced on the second endpoint and answered by it"""
+    slow = HeadStandInServer(port=8579)
+    slow.http_delay = 1.0
+    fast = HeadStandInServer(port=8580)
+    await slow.start()
+    await fast.start()
+    try:
+        async with RPCClient(slow.url, fallback_urls=[fast.url], hedging=True) as rpc_client:
+            rpc_client.pool.hedge_default_delay = 0.05
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            head = await rpc_client.get_block_number()
+            elapsed = loop.time() - started
+            hedged = rpc_client.hedged_requests
+    finally:
+        await slow.stop()
+        await fast.stop()
+    return {
+        'passed': head == fast.head and hedged == 1 and elapsed < slow.http_delay / 2,
+        'hedged_requests': hedged,
+        'elapsed_seconds': round(elapsed, 3),
+        'slow_endpoint_requests': slow.http_requests,
+        'fast_endpoint_requests': fast.http_requests
+    }
+
+@scenario
+async def reconcile_budget_skips_unseeded_wallets():
+    """Wallets awaiting their ledger seed neither use the reconcile budget nor lose their due time"""
+    chain = SyntheticChain(wallets=100)
+    server = SyntheticChainServer(chain, port=8573)
+    await server.start(produce=False)
+    now = [1_700_000_000.0]
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            registry = AddressRegistry()
+            monitor = BalanceMonitor(rpc_client, ledger_enabled=True, registry=registry, clock=lambda: now[0])
+            monitor.event_bus = None
+            wallet_ids = [registry.id_of("0x%040x" % (index + 1)) for index in range(10)]
+            for index, wallet_id in enumerate(wallet_ids):
+                monitor.monitor_wallet(wallet_id)
+                # Even wallets are seeded; odd ones stay pending, as after a failed seed
+                if index % 2 == 0:
+                    monitor.pending_seed.discard(wallet_id)
+                    monitor.ledger[wallet_id] = chain.balance_of(registry.addresses[wallet_id])
+            now[0] += 1
+            due_before = {wallet_id: monitor.scheduler.schedules[wallet_id].next_due for wallet_id in wallet_ids}
+            await monitor.reconcile_ledger(chain.head, sample_size=5)
+    finally:
+        await server.stop()
+
+    schedules = monitor.scheduler.schedules
+    reconciled = [wallet_id for wallet_id in wallet_ids if schedules[wallet_id].next_due != due_before[wallet_id]]
+    pending_kept_due = all(
+        schedules[wallet_id].next_due == due_before[wallet_id] for wallet_id in monitor.pending_seed
+    )
+    return {
+        'passed': sorted(reconciled) == sorted(monitor.ledger) and pending_kept_due,
+        'reconciled': len(reconciled),
+        'seeded': len(monitor.ledger),
+        'pending_kept_due': pending_kept_due
+    }
+
+@scenario
+async def reconcile_at_past_block_ignores_later_transfers():
+    """A ledger reconciled at an older block is compared with that block's balances, not the head's"""
+    chain = SyntheticChain(tps=100, wallets=20, history_blocks=50)
+    server = SyntheticChainServer(chain, port=8583)
+    for _ in range(10):
+        chain.produce_block()
+    pinned_block = chain.head
+    await server.start(produce=False)
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            registry = AddressRegistry()
+            now = [1_700_000_000.0]
+            monitor = BalanceMonitor(rpc_client, ledger_enabled=True, registry=registry, clock=lambda: now[0])
+            monitor.event_bus = None
+            for address in chain.wallet_addresses:
+                monitor.monitor_wallet(registry.id_of(address))
+            # Seeded at the pinned block, so the ledger holds exactly that block's balances
+            await monitor.apply_block(pinned_block, TransferBatch(registry.addresses), block_count=0)
+            now[0] += 1
+            for _ in range(10):
+                chain.produce_block()
+            moved = sum(chain.balance_of(address) != chain.balance_of(address, pinned_block)
+                        for address in chain.wallet_addresses)
+            drifted = await monitor.reconcile_ledger(pinned_block, sample_size=len(chain.wallet_addresses))
+            for _ in range(60):
+                chain.produce_block()
+            _, pruned = await rpc_client.get_token_balances(
+                chain.wallet_addresses[:1], STABLECOIN_ADDRESSES["USDC"], pinned_block
+            )
+    finally:
+        await server.stop()
+
+    return {
+        'passed': moved > 0 and not drifted and pruned[chain.wallet_addresses[0]] is None,
+        'moved_since_pinned_block': moved,
+        'drifted': len(drifted),
+        'pruned_block_answered': pruned[chain.wallet_addresses[0]] is not None
+    }
+
+@scenario
+async def catchup_log_chunks_leave_live_chunk_alone():
+    """Catch-up ranges shrinking against a capped node do not resize the live path's eth_getLogs chunk"""
+    chain = SyntheticChain(wallets=100)
+    for _ in range(400):
+        chain.produce_block()
+    server = SyntheticChainServer(chain, port=8574)
+    server.max_logs_range = 30
+    await server.start(produce=False)
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            processor = BlockProcessor(rpc_client, ingestion_mode="logs")
+            processor.catchup_logs_chunk = {'size': LOGS_RANGE_INITIAL_CHUNK}
+            catchup_ranges = [(start, start + 99) for start in range(1, 301, 100)]
+            fetches = [
+                processor.fetch_transfer_logs(start, end, processor.catchup_logs_chunk) for start, end in catchup_ranges
+            ]
+            # The live path keeps fetching one block at a time alongside the catch-up ranges
+            fetches += [processor.fetch_transfer_logs(block, block) for block in range(380, 390)]
+            results = await asyncio.gather(*fetches)
+    finally:
+        await server.stop()
+    catchup_logs = sum(len(logs) for logs in results[:len(catchup_ranges)])
+    expected_logs = len(chain.get_logs({"fromBlock": hex(1), "toBlock": hex(300)}))
+    return {
+        'passed': processor.logs_chunk['size'] == LOGS_RANGE_INITIAL_CHUNK
+                  and processor.catchup_logs_chunk['size'] < LOGS_RANGE_INITIAL_CHUNK
+                  and catchup_logs == expected_logs,
+        'live_chunk': processor.logs_chunk['size'],
+        'catchup_chunk': processor.catchup_logs_chunk['size'],
+        'catchup_logs': catchup_logs,
+        'expected_logs': expected_logs
+    }
+
+@scenario
+async def rpc_batch_falls_back_when_node_rejects_batches():
+    """Batches to a node that rejects arrays (error object or HTTP 4xx) are sent as single calls, once per endpoint"""
+    chain = SyntheticChain(wallets=100)
+    for _ in range(20):
+        chain.produce_block()
+    server = SyntheticChainServer(chain, port=8575)
+    await server.start(produce=False)
+    observations = {}
+    try:
+        for rejection in ("error", 400):
+            server.batch_rejection = rejection
+            server.stats = {'requests': 0}
+            async with RPCClient(server.url, fallback_urls=[], hedging=False) as rpc_client:
+                calls = [("eth_getBlockByNumber", [hex(number), False]) for number in range(1, 11)]
+                calls.append(("eth_unsupported", []))
+                first = await rpc_client.rpc_batch(calls)
+                second = await rpc_client.rpc_batch(calls)
+                observations[str(rejection)] = {
+                    'blocks_returned': sum(1 for result in first + second if isinstance(result, dict)),
+                    'per_call_errors': sum(1 for result in first + second if isinstance(result, RPCError)),
+                    'batch_arrays_sent': server.stats.get('batches', 0),
+                    'endpoint_batch_supported': rpc_client.get_endpoint_stats()[0]['batch_supported']
+                }
+    finally:
+        await server.stop()
+    return {
+        'passed': all(
+            observed['blocks_returned'] == 20 and observed['per_call_errors'] == 2
+            and observed['batch_arrays_sent'] == 1 and not observed['endpoint_batch_supported']
+            for observed in observations.values()
+        ),
+        **observations
+    }
+
+@scenario
+async def correlator_max_amount_follows_expiry():
+    """A wallet's max_amount drops to the largest live signal once the largest one expires or is trimmed"""
+    now = [1_700_000_000.0]
+    correlator = RiskCorrelator(window_seconds=60, wallet_min_signals=2, cooldown_seconds=0,
+                                max_signals_per_wallet=3, clock=lambda: now[0])
+    wallet = "0x" + "ab" * 20
+
+    def whale(amount: float) -> Event:
+        return Event(EventTypes.WHALE_ACTIVITY, {'wallet_address': wallet, 'amount': amount},
+                     EventPriority.HIGH, now[0])
+
+    correlator.process([whale(5_000_000)])
+    now[0] += 40
+    correlator.process([whale(200_000), whale(300_000)])
+    now[0] += 30
+    # The 5M signal is now older than the window
+    expired = correlator.process([whale(100_000)])
+    after_expiry = correlator.wallets[wallet].max_amount
+    now[0] += 1
+    # Three more small signals trim the 300k one off the per-wallet cap
+    correlator.process([whale(50_000), whale(60_000), whale(70_000)])
+    after_trim = correlator.wallets[wallet].max_amount
+    reported = [event.data['risk_factors']['max_amount'] for event in expired]
+    return {
+        'passed': after_expiry == 300_000 and after_trim == 70_000 and reported == [300_000],
+        'max_after_expiry': after_expiry,
+        'max_after_trim': after_trim,
+        'reported_max_amounts': reported
+    }
+
+async def run(names) -> Dict:
+    results = {}
+    for name in names:
+        try:
+            # The watcher components print as they go; keep the report clean
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results[name] = await SCENARIOS[name]()
+        except Exception as e:
+            results[name] = {'passed': False, 'error': f"{type(e).__name__}: {e}"}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run watcher scenario checks against local stand-ins")
+    parser.add_argument("names", nargs="*", help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args.names or list(SCENARIOS)))
+    print(json.dumps(results, indent=2))
+    if not all(result['passed'] for result in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
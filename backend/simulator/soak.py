@@ -0,0 +1,143 @@
+"""
+Soak/capacity test: run BlockProcessor, WhaleTracker and the EventBus against a synthetic chain.
+
+Run from the backend directory:
+    python -m simulator.soak --tps 200 --duration 120 [--mode logs]
+
+The chain server runs in the same process, so its block generation shares
+the CPU with the watcher. Watcher console output is suppressed unless
+--verbose. Prints a JSON report: sustained blocks/sec, ingestion lag, RSS
+growth and whale alert latency (block production to handler).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import time
+from typing import List
+from core.event_bus import event_bus, Event
+from core.events import EventTypes
+from core.rpc_client import RPCClient
+from simulator.chain_simulator import SyntheticChain, SyntheticChainServer
+from watcher.block_processor import BlockProcessor
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # Peak rather than current RSS; kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def soak(tps: float = 20.0, block_time: float = 0.4, duration: float = 60.0, wallets: int = 100_000,
+               zipf_exponent: float = 1.1, mode: str = "blocks", port: int = 8548, seed: int = 0):
+    chain = SyntheticChain(tps=tps, block_time=block_time, wallets=wallets, zipf_exponent=zipf_exponent, seed=seed)
+    server = SyntheticChainServer(chain, port=port)
+    await server.start()
+
+    alert_latencies = []
+
+    async def measure_alert(event: Event):
+        receipt = chain.receipts.get(event.data.get('tx_hash'))
+        if receipt:
+            produced_at = chain.produced_at.get(int(receipt["blockNumber"], 16))
+            if produced_at:
+                alert_latencies.append(time.time() - produced_at)
+
+    event_bus.subscribe(EventTypes.WHALE_ACTIVITY, measure_alert)
+
+    lag_samples = []
+    rss_samples = [rss_mb()]
+    transfers = 0
+    try:
+        async with RPCClient(server.url, fallback_urls=[]) as rpc_client:
+            block_processor = BlockProcessor(rpc_client, ingestion_mode=mode)
+            await block_processor.start_event_processing()
+            first_head = chain.head
+            started = time.perf_counter()
+            next_rss_sample = started + 1
+            try:
+                while time.perf_counter() - started < duration:
+                    head = await rpc_client.get_block_number()
+                    if block_processor.last_block_number is not None and head <= block_processor.last_block_number:
+                        await asyncio.sleep(block_time / 4)
+                        continue
+                    block_transfers, _ = await block_processor.process_new_blocks(head)
+                    transfers += len(block_transfers)
+                    lag_samples.append(chain.head - block_processor.last_block_number)
+                    if time.perf_counter() >= next_rss_sample:
+                        rss_samples.append(rss_mb())
+                        next_rss_sample += 1
+            finally:
+                await block_processor.stop_event_processing()
+            elapsed = time.perf_counter() - started
+            rss_samples.append(rss_mb())
+
+            blocks_processed = block_processor.last_block_number - first_head
+            return {
+                'config': {'tps': tps, 'block_time': block_time, 'duration': duration,
+                           'wallets': wallets, 'zipf_exponent': zipf_exponent, 'mode': mode},
+                'blocks_produced': chain.head - first_head,
+                'blocks_processed': blocks_processed,
+                'blocks_per_sec': round(blocks_processed / elapsed, 2),
+                'chain_blocks_per_sec': round(1 / block_time, 2),
+                'transfers_processed': transfers,
+                'transfers_per_sec': round(transfers / elapsed, 1),
+                'lag_blocks': {
+                    'mean': round(sum(lag_samples) / len(lag_samples), 2) if lag_samples else 0,
+                    'max': max(lag_samples, default=0),
+                    'final': chain.head - block_processor.last_block_number
+                },
+                'rss_mb': {
+                    'start': round(rss_samples[0], 1),
+                    'end': round(rss_samples[-1], 1),
+                    'growth': round(rss_samples[-1] - rss_samples[0], 1),
+                    'peak': round(max(rss_samples), 1)
+                },
+                'alert_latency_ms': {
+                    'count': len(alert_latencies),
+                    'p50': round(percentile(alert_latencies, 0.50) * 1000, 1),
+                    'p99': round(percentile(alert_latencies, 0.99) * 1000, 1),
+                    'max': round(max(alert_latencies, default=0) * 1000, 1)
+                },
+                'event_bus': event_bus.get_stats(),
+                'bloom_prefilter': block_processor.get_bloom_stats(),
+                'tracked_wallets': len(block_processor.whale_tracker.wallet_activity),
+                'monitored_wallets': len(block_processor.balance_monitor.scheduler),
+                'ledger_drift': block_processor.balance_monitor.ledger_drift_count
+            }
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the watcher against a synthetic chain")
+    parser.add_argument("--tps", type=float, default=20.0)
+    parser.add_argument("--block-time", type=float, default=0.4)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--wallets", type=int, default=100_000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--mode", choices=["blocks", "logs"], default="blocks")
+    parser.add_argument("--port", type=int, default=8548)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Keep the watcher's console output")
+    args = parser.parse_args()
+
+    run = soak(args.tps, args.block_time, args.duration, args.wallets, args.zipf, args.mode, args.port, args.seed)
+    if args.verbose:
+        report = asyncio.run(run)
+    else:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            report = asyncio.run(run)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
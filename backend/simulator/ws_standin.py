@@ -0,0 +1,163 @@
+import asyncio
+import json
+from typing import Dict, List, Optional
+from aiohttp import web
+
+class HeadStandInServer:
+    """Local stand-in for a Sei node's head endpoints.
+
+    Serves eth_blockNumber and eth_getLogs over HTTP POST and
+    eth_subscribe("newHeads" | "logs") over WebSocket at /ws. Blocks are
+    produced on demand with produce_block(), and drop_connections() closes
+    every socket so reconnect and polling fallback can be exercised. While
+    close_on_subscribe is set, an eth_subscribe request closes its socket
+    instead of being answered. http_delay slows every HTTP reply and a
+    non-zero http_status fails it, to exercise endpoint failover and hedging.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8546, start_block: int = 1):
+        self.host = host
+        self.port = port
+        self.head = start_block
+        self.logs_by_block: Dict[int, List[Dict]] = {}
+        self.sockets: Dict[web.WebSocketResponse, Dict[str, str]] = {}
+        self.subscription_counter = 0
+        self.close_on_subscribe = False
+        self.http_delay = 0.0
+        self.http_status = 0
+        self.http_requests = 0
+        self.runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self._handle_http)
+        app.router.add_get("/ws", self._handle_ws)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        await self.drop_connections()
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def produce_block(self, logs: Optional[List[Dict]] = None) -> int:
+        """Advance the head by one block and push notifications to subscribers"""
+        self.head += 1
+        block_hash = "0x%064x" % self.head
+        block_logs = []
+        for index, log in enumerate(logs or []):
+            block_logs.append(dict(log, blockNumber=hex(self.head), blockHash=block_hash, logIndex=hex(index)))
+        self.logs_by_block[self.head] = block_logs
+
+        header = {"number": hex(self.head), "hash": block_hash, "parentHash": "0x%064x" % (self.head - 1)}
+        for ws, subscriptions in list(self.sockets.items()):
+            for subscription_id, kind in subscriptions.items():
+                if kind == "newHeads":
+                    await self._notify(ws, subscription_id, header)
+            for subscription_id, kind in subscriptions.items():
+                if kind == "logs":
+                    for log in block_logs:
+                        await self._notify(ws, subscription_id, log)
+        return self.head
+
+    async def push(self, kind: str, result):
+        """Send a raw notification to every "newHeads" or "logs" subscriber, e.g. a malformed one"""
+        for ws, subscriptions in list(self.sockets.items()):
+            for subscription_id, subscribed_kind in subscriptions.items():
+                if subscribed_kind == kind:
+                    await self._notify(ws, subscription_id, result)
+
+    async def drop_connections(self):
+        for ws in list(self.sockets):
+            await ws.close()
+        self.sockets.clear()
+
+    async def _notify(self, ws: web.WebSocketResponse, subscription_id: str, result):
+        if ws.closed:
+            return
+        await ws.send_json({
+            "jsonrpc": "2.0",
+            "method": "eth_subscription",
+            "params": {"subscription": subscription_id, "result": result}
+        })
+
+    def _get_logs(self, log_filter: Dict) -> List[Dict]:
+        from_block = int(log_filter.get("fromBlock", hex(self.head)), 16)
+        to_block = int(log_filter.get("toBlock", hex(self.head)), 16)
+        logs = []
+        for block_number in range(from_block, min(to_block, self.head) + 1):
+            logs.extend(self.logs_by_block.get(block_number, []))
+        return logs
+
+    def _dispatch(self, request: Dict) -> Dict:
+        method = request.get("method")
+        params = request.get("params", [])
+        if method == "eth_blockNumber":
+            result = hex(self.head)
+        elif method == "eth_getLogs":
+            result = self._get_logs(params[0])
+        else:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": f"method {method} not supported"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    async def _handle_http(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.http_requests += 1
+        if self.http_delay:
+            await asyncio.sleep(self.http_delay)
+        if self.http_status:
+            return web.Response(status=self.http_status, text="stand-in failure")
+        if isinstance(body, list):
+            return web.json_response([self._dispatch(item) for item in body])
+        return web.json_response(self._dispatch(body))
+
+    async def _handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets[ws] = {}
+        try:
+            async for message in ws:
+                if message.type != web.WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                if payload.get("method") == "eth_subscribe" and self.close_on_subscribe:
+                    await ws.close()
+                    break
+                if payload.get("method") == "eth_subscribe":
+                    self.subscription_counter += 1
+                    subscription_id = hex(self.subscription_counter)
+                    self.sockets[ws][subscription_id] = payload["params"][0]
+                    await ws.send_json({"jsonrpc": "2.0", "id": payload.get("id"), "result": subscription_id})
+                elif payload.get("method") == "eth_unsubscribe":
+                    removed = self.sockets[ws].pop(payload["params"][0], None) is not None
+                    await ws.send_json({"jsonrpc": "2.0", "id": payload.get("id"), "result": removed})
+                else:
+                    await ws.send_json(self._dispatch(payload))
+        finally:
+            self.sockets.pop(ws, None)
+        return ws
+
+async def main():
+    """Run a stand-in node producing an empty block every 400ms"""
+    server = HeadStandInServer()
+    await server.start()
+    print(f"Stand-in node listening on {server.url} and {server.ws_url}")
+    try:
+        while True:
+            await asyncio.sleep(0.4)
+            await server.produce_block()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
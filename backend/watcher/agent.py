@@ -1,22 +1,54 @@
 import asyncio
-from config.settings import POLL_INTERVAL, SEI_RPC_URL
+from config.settings import (
+    POLL_INTERVAL, SEI_RPC_URL, SEI_WS_URL, HEAD_SUBSCRIPTION_ENABLED, HEAD_SUBSCRIBE_LOGS,
+    EVENT_JOURNAL_ENABLED, EVENT_JOURNAL_DIR, CHECKPOINT_ENABLED, CHECKPOINT_PATH, RPC_RECORD_PATH
+)
+from core.event_bus import event_bus
+from core.event_journal import EventJournal
 from core.rpc_client import RPCClient
+from core.rpc_recording import RPCRecorder
 from watcher.block_processor import BlockProcessor
+from watcher.checkpoint import IngestionCheckpoint
+from watcher.head_tracker import HeadTracker
 
 async def watcher_agent():
     async with RPCClient(SEI_RPC_URL) as rpc_client:
-        block_processor = BlockProcessor(rpc_client)
+        if RPC_RECORD_PATH:
+            rpc_client.recorder = RPCRecorder(RPC_RECORD_PATH)
+            print(f"Recording RPC traffic to {RPC_RECORD_PATH}")
+        checkpoint = IngestionCheckpoint(CHECKPOINT_PATH) if CHECKPOINT_ENABLED else None
+        block_processor = BlockProcessor(rpc_client, checkpoint=checkpoint)
+        head_tracker = HeadTracker(
+            rpc_client,
+            ws_url=SEI_WS_URL if HEAD_SUBSCRIPTION_ENABLED else None,
+            poll_interval=POLL_INTERVAL,
+            subscribe_logs=HEAD_SUBSCRIBE_LOGS and block_processor.ingestion_mode == "logs"
+        )
+        if head_tracker.subscribe_logs:
+            block_processor.log_feed = head_tracker
     
+        journal = None
+        if EVENT_JOURNAL_ENABLED:
+            journal = EventJournal(EVENT_JOURNAL_DIR)
+            journal.start()
+            event_bus.attach_journal(journal)
+            print(f"Event journal at {EVENT_JOURNAL_DIR}, next offset {journal.next_offset}")
+
         # Start event bus processing
         await block_processor.start_event_processing()
         
         try:
-            while True:
-                await block_processor.process_new_blocks()
-                await asyncio.sleep(POLL_INTERVAL)
+            async for head in head_tracker.heads():
+                await block_processor.process_new_blocks(head)
         finally:
+            await block_processor.stop_catchup()
             # Clean up event bus processing
             await block_processor.stop_event_processing()
+            if journal:
+                event_bus.attach_journal(None)
+                journal.close()
+            if rpc_client.recorder:
+                rpc_client.recorder.close()
 
 async def run():
     await watcher_agent()
@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+from core.address_registry import AddressRegistry
+from core.rpc_client import RPCClient
+from watcher.replay_engine import ReplayEngine
+from watcher.transaction_analyzer import TransactionAnalyzer
+from config.settings import BACKFILL_WORKERS, BACKFILL_SHARD_BLOCKS, REPLAY_CHUNK_BLOCKS, REPLAY_CONCURRENCY
+
+def _quiet_worker():
+    # Workers only fetch and decode; their per-range output would interleave with the merge stage's
+    sys.stdout = open(os.devnull, "w")
+
+def fetch_shard(rpc_url: str, start: int, end: int, chunk_blocks: int, concurrency: int,
+                exact_timestamps: bool) -> Dict:
+    """Worker entry point: fetch and decode one shard into a TransferBatch with its own address table"""
+    return asyncio.run(_fetch_shard(rpc_url, start, end, chunk_blocks, concurrency, exact_timestamps))
+
+async def _fetch_shard(rpc_url: str, start: int, end: int, chunk_blocks: int, concurrency: int,
+                       exact_timestamps: bool) -> Dict:
+    async with RPCClient(rpc_url, fallback_urls=[]) as rpc_client:
+        rpc_client.observe_head(await rpc_client.get_block_number())
+        engine = ReplayEngine(rpc_client, chunk_blocks, concurrency, exact_timestamps)
+        # A fresh registry per shard, so the batch ships only the addresses it uses
+        analyzer = TransactionAnalyzer(registry=AddressRegistry())
+        transfers = analyzer.new_batch()
+        start_time = end_time = None
+        in_flight = deque()
+        next_start = start
+        try:
+            while next_start <= end or in_flight:
+                while next_start <= end and len(in_flight) < engine.concurrency:
+                    chunk_end = min(next_start + engine.chunk_blocks - 1, end)
+                    task = asyncio.create_task(engine.fetch_range(next_start, chunk_end))
+                    in_flight.append((next_start, chunk_end, task))
+                    next_start = chunk_end + 1
+
+                chunk_start, chunk_end, task = in_flight.popleft()
+                logs, block_times = await task
+                transfers.extend(engine.decode_range(chunk_start, chunk_end, logs, block_times, analyzer))
+                if start_time is None:
+                    start_time = block_times[chunk_start]
+                end_time = block_times[chunk_end]
+        finally:
+            for _, _, task in in_flight:
+                task.cancel()
+
+    return {
+        'transfers': transfers,
+        'start_time': start_time,
+        'end_time': end_time,
+        'headers_fetched': engine.stats['headers_fetched']
+    }
+
+class BackfillEngine(ReplayEngine):
+    """ReplayEngine whose fetch and decode stage runs in a process pool.
+
+    The range is split into shards of shard_blocks. Each worker process
+    fetches its shard with its own RPC client (chunk_blocks per eth_getLogs
+    range, concurrency ranges in flight) and decodes it into a TransferBatch
+    against a shard-local address registry. This process is the single
+    stateful stage: it takes shards back in block order, remaps their address
+    ids onto the process-wide registry and commits them through
+    ReplayEngine.commit_range, so whale and balance state evolve exactly as in
+    a single-process replay. Up to two shards per worker are kept in flight,
+    bounding memory; the RPC load is about workers * concurrency requests.
+    """
+
+    def __init__(self, rpc_client: RPCClient, workers: Optional[int] = BACKFILL_WORKERS,
+                 shard_blocks: int = BACKFILL_SHARD_BLOCKS, chunk_blocks: int = REPLAY_CHUNK_BLOCKS,
+                 concurrency: int = REPLAY_CONCURRENCY, exact_timestamps: bool = True,
+                 alerts_path: Optional[str] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        super().__init__(rpc_client, chunk_blocks=shard_blocks, concurrency=2 * self.workers,
+                         exact_timestamps=exact_timestamps, alerts_path=alerts_path)
+        self.shard_chunk_blocks = max(1, chunk_blocks)
+        self.shard_concurrency = max(1, concurrency)
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, from_block: int, to_block: int) -> Dict:
+        # spawn: forking a process with a running event loop and open sessions is unsafe
+        self.executor = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_quiet_worker
+        )
+        try:
+            summary = await super().run(from_block, to_block)
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        return {**summary, 'workers': self.workers, 'shard_blocks': self.chunk_blocks}
+
+    async def fetch_range(self, start: int, end: int):
+        """Fetch and decode a shard in a worker process"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, fetch_shard, self.rpc_client.rpc_url, start, end,
+            self.shard_chunk_blocks, self.shard_concurrency, self.exact_timestamps
+        )
+
+    async def _commit_range(self, start: int, end: int, shard: Dict):
+        transfers = shard['transfers']
+        registry = self.block_processor.transaction_analyzer.registry
+        transfers.remap(registry.addresses, [registry.id_of(address) for address in transfers.addresses])
+        self.stats['headers_fetched'] += shard['headers_fetched']
+        await self.commit_range(start, end, transfers, shard['start_time'], shard['end_time'])
@@ -1,17 +1,37 @@
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 from core.rpc_client import RPCClient
-from config.settings import STABLECOIN_ADDRESSES, USDC_DECIMALS, EVENT_BUS_ENABLED
-import asyncio
+from core.event_bus import EventPriority
+from watcher.balance_scheduler import BalancePollScheduler
+from watcher.transfer_batch import TransferBatch
+from core.address_registry import AddressRegistry, address_registry
+from config.settings import (
+    STABLECOIN_ADDRESSES, USDC_DECIMALS, EVENT_BUS_ENABLED,
+    BALANCE_LEDGER_ENABLED, BALANCE_RECONCILE_INTERVAL_BLOCKS, BALANCE_RECONCILE_SAMPLE_SIZE
+)
 import time
 
 class BalanceMonitor:
-    def __init__(self, rpc_client: RPCClient):
+    def __init__(self, rpc_client: RPCClient, ledger_enabled: bool = BALANCE_LEDGER_ENABLED,
+                 registry: AddressRegistry = address_registry, clock: Optional[Callable[[], float]] = None):
         self.rpc_client = rpc_client
+        # Epoch seconds for balance timestamps; a replay injects chain time, which also drives the scheduler
+        self.clock = clock or time.time
+        # Wallet state is keyed by registry address id, held while the wallet is monitored or has a
+        # recorded balance; addresses are resolved at the RPC and event edges
+        self.registry = registry
         self.monitored_wallets = set()
         self.wallet_balances = {}
         self.previous_balances = {}
         self.balance_alerts = []
+        # Ledger mode: raw balances seeded once from the chain, then updated from decoded transfers
+        self.ledger_enabled = ledger_enabled
+        self.ledger: Dict[int, int] = {}
+        self.pending_seed = set()
+        self.blocks_since_reconcile = 0
+        self.ledger_drift_count = 0
+        # Decides which wallets are due for a balanceOf read, and evicts quiet ones
+        self.scheduler = BalancePollScheduler(clock=clock or time.monotonic, on_evict=self._forget_wallet)
         self.event_bus = None
         if EVENT_BUS_ENABLED:
             self._initialize_event_bus()
@@ -27,56 +47,194 @@ class BalanceMonitor:
             print("Warning: Event bus not available")
             self.event_bus = None
         
-    def add_wallet_to_monitor(self, wallet_address: str):
-        self.monitored_wallets.add(wallet_address.lower())
+    def add_wallet_to_monitor(self, wallet_address: str, priority: Optional[EventPriority] = None):
+        self.monitor_wallet(self.registry.id_of(wallet_address), priority)
+    
+    def monitor_wallet(self, wallet_id: int, priority: Optional[EventPriority] = None):
+        if wallet_id not in self.monitored_wallets and wallet_id not in self.wallet_balances:
+            self.registry.retain(wallet_id)
+        self.monitored_wallets.add(wallet_id)
+        if self.ledger_enabled and wallet_id not in self.ledger:
+            self.pending_seed.add(wallet_id)
+        self.scheduler.touch(wallet_id, priority)
     
     def remove_wallet_from_monitor(self, wallet_address: str):
-        self.monitored_wallets.discard(wallet_address.lower())
+        wallet_id = self.registry.get(wallet_address)
+        if wallet_id is None:
+            return
+        self.scheduler.remove(wallet_id)
+        self._forget_wallet(wallet_id)
+    
+    def _forget_wallet(self, wallet_id: int):
+        if wallet_id in self.monitored_wallets or wallet_id in self.wallet_balances:
+            self.registry.release(wallet_id)
+        self.monitored_wallets.discard(wallet_id)
+        self.pending_seed.discard(wallet_id)
+        self.ledger.pop(wallet_id, None)
+        self.wallet_balances.pop(wallet_id, None)
+        self.previous_balances.pop(wallet_id, None)
+    
+    async def apply_block(self, block_number: int, transfers: TransferBatch, block_count: int = 1):
+        """Ledger mode: apply a committed block's transfers and detect balance changes at block time.
+
+        Wallets added while processing this block are seeded at this block,
+        so their seed already includes its transfers. block_count is the
+        number of blocks covered when a whole range is applied at once.
+        """
+        touched = set()
+        ledger = self.ledger
+        for from_id, to_id, raw_value in zip(transfers.from_ids, transfers.to_ids, transfers.raw_amounts):
+            if from_id in ledger:
+                ledger[from_id] -= raw_value
+                touched.add(from_id)
+            if to_id in ledger:
+                ledger[to_id] += raw_value
+                touched.add(to_id)
+        
+        usdc_address = STABLECOIN_ADDRESSES["USDC"]
+        current_time = datetime.fromtimestamp(self.clock())
+        for wallet_id in touched:
+            self.scheduler.touch(wallet_id)
+            self._record_balance(
+                wallet_id, usdc_address, ledger[wallet_id] / 10**USDC_DECIMALS, current_time, block_number
+            )
+        
+        if self.pending_seed:
+            await self._seed_ledger(block_number)
+        
+        self.blocks_since_reconcile += block_count
+        if self.blocks_since_reconcile >= BALANCE_RECONCILE_INTERVAL_BLOCKS:
+            self.blocks_since_reconcile = 0
+            await self.reconcile_ledger(block_number)
+    
+    async def _seed_ledger(self, block_number: int):
+        usdc_address = STABLECOIN_ADDRESSES["USDC"]
+        wallets = list(self.pending_seed)
+        addresses = self.registry.addresses
+        try:
+            _, raw_balances = await self.rpc_client.get_token_balances(
+                [addresses[wallet_id] for wallet_id in wallets], usdc_address, block_number
+            )
+        except Exception as e:
+            print(f"Error seeding balance ledger: {e}")
+            return
+        
+        current_time = datetime.fromtimestamp(self.clock())
+        for wallet_id in wallets:
+            raw_balance = raw_balances.get(addresses[wallet_id])
+            if raw_balance is None:
+                continue
+            self.pending_seed.discard(wallet_id)
+            self.ledger[wallet_id] = raw_balance
+            self._record_balance(
+                wallet_id, usdc_address, raw_balance / 10**USDC_DECIMALS, current_time, block_number
+            )
+    
+    async def reconcile_ledger(self, block_number: int, sample_size: int = BALANCE_RECONCILE_SAMPLE_SIZE):
+        """Compare the wallets the scheduler marks due against balanceOf to catch drift"""
+        # Wallets still waiting for their seed are not in the ledger and keep their due time
+        sample = self.scheduler.due_wallets(sample_size, predicate=self.ledger.__contains__)
+        if not sample:
+            return []
+        
+        usdc_address = STABLECOIN_ADDRESSES["USDC"]
+        addresses = self.registry.addresses
+        try:
+            _, raw_balances = await self.rpc_client.get_token_balances(
+                [addresses[wallet_id] for wallet_id in sample], usdc_address, block_number
+            )
+        except Exception as e:
+            print(f"Error reconciling balance ledger: {e}")
+            return []
+        
+        drifted = []
+        current_time = datetime.fromtimestamp(self.clock())
+        for wallet_id in sample:
+            wallet_address = addresses[wallet_id]
+            chain_balance = raw_balances.get(wallet_address)
+            if chain_balance is None or wallet_id not in self.ledger:
+                continue
+            if chain_balance != self.ledger[wallet_id]:
+                drift = (chain_balance - self.ledger[wallet_id]) / 10**USDC_DECIMALS
+                print(f"Ledger drift for {wallet_address[:10]}...: {drift:+,.2f} USDC at block {block_number}")
+                self.ledger[wallet_id] = chain_balance
+                self.ledger_drift_count += 1
+                drifted.append(wallet_address)
+                self._record_balance(
+                    wallet_id, usdc_address, chain_balance / 10**USDC_DECIMALS, current_time, block_number
+                )
+        return drifted
     
     async def check_wallet_balance(self, wallet_address: str, token_address: str) -> Optional[Dict]:
         try:
             balance_data = await self.rpc_client.get_token_balance(wallet_address, token_address)
             balance = float(balance_data.get("formatted", 0))
-            
-            current_time = datetime.now()
-            balance_info = {
-                "wallet_address": wallet_address,
-                "token_address": token_address,
-                "balance": balance,
-                "timestamp": current_time
-            }
-            
-            # Check for significant balance changes
-            previous_balance = self.previous_balances.get(wallet_address)
-            if previous_balance is not None and self.event_bus:
-                self._check_and_publish_balance_change(wallet_address, balance, previous_balance, current_time)
-            
-            self.previous_balances[wallet_address] = balance
-            self.wallet_balances[wallet_address] = balance_info
-            return balance_info
+            return self._record_balance(self.registry.id_of(wallet_address), token_address, balance, datetime.fromtimestamp(self.clock()))
             
         except Exception as e:
             print(f"Error checking balance for {wallet_address}: {e}")
             return None
     
     async def check_all_monitored_wallets(self):
+        """Snapshot the wallets due for a poll at one block, then process the snapshot in one pass"""
         usdc_address = STABLECOIN_ADDRESSES["USDC"]
-        balance_updates = []
+        wallets = self.scheduler.due_wallets()
+        if not wallets:
+            return []
         
-        for wallet_address in self.monitored_wallets:
-            balance_info = await self.check_wallet_balance(wallet_address, usdc_address)
-            if balance_info:
-                balance_updates.append(balance_info)
+        addresses = self.registry.addresses
+        try:
+            block_number, raw_balances = await self.rpc_client.get_token_balances(
+                [addresses[wallet_id] for wallet_id in wallets], usdc_address
+            )
+        except Exception as e:
+            print(f"Error fetching balance snapshot: {e}")
+            return []
+        
+        current_time = datetime.fromtimestamp(self.clock())
+        balance_updates = []
+        for wallet_id in wallets:
+            raw_balance = raw_balances.get(addresses[wallet_id])
+            if raw_balance is None:
+                print(f"Error checking balance for {addresses[wallet_id]}: balanceOf failed at block {block_number}")
+                continue
+            balance = raw_balance / 10**USDC_DECIMALS
+            balance_updates.append(
+                self._record_balance(wallet_id, usdc_address, balance, current_time, block_number)
+            )
         
         return balance_updates
     
+    def _record_balance(self, wallet_id: int, token_address: str, balance: float,
+                        current_time: datetime, block_number: Optional[int] = None) -> Dict:
+        balance_info = {
+            "wallet_address": self.registry.addresses[wallet_id],
+            "token_address": token_address,
+            "balance": balance,
+            "block_number": block_number,
+            "timestamp": current_time
+        }
+        
+        # Check for significant balance changes
+        previous_balance = self.previous_balances.get(wallet_id)
+        if previous_balance is not None and self.event_bus:
+            self._check_and_publish_balance_change(wallet_id, balance, previous_balance, current_time)
+        
+        if wallet_id not in self.monitored_wallets and wallet_id not in self.wallet_balances:
+            self.registry.retain(wallet_id)
+        self.previous_balances[wallet_id] = balance
+        self.wallet_balances[wallet_id] = balance_info
+        return balance_info
+    
     def get_wallet_balance(self, wallet_address: str) -> Optional[Dict]:
-        return self.wallet_balances.get(wallet_address.lower())
+        wallet_id = self.registry.get(wallet_address)
+        return None if wallet_id is None else self.wallet_balances.get(wallet_id)
     
     def get_all_balances(self) -> Dict:
-        return self.wallet_balances.copy()
+        """Latest balance info keyed by wallet address"""
+        return {info["wallet_address"]: info for info in self.wallet_balances.values()}
     
-    def _check_and_publish_balance_change(self, wallet_address: str, current_balance: float, previous_balance: float, timestamp: datetime):
+    def _check_and_publish_balance_change(self, wallet_id: int, current_balance: float, previous_balance: float, timestamp: datetime):
         """Check for significant balance changes and publish events"""
         try:
             change_amount = current_balance - previous_balance
@@ -89,7 +247,7 @@ class BalanceMonitor:
                 
                 # Create balance change event data
                 event_data = BalanceChangeEventData(
-                    wallet_address=wallet_address,
+                    wallet_address=self.registry.addresses[wallet_id],
                     current_balance=current_balance,
                     previous_balance=previous_balance,
                     change_amount=change_amount,
@@ -104,17 +262,18 @@ class BalanceMonitor:
                     'current_balance': current_balance
                 }
                 priority = self.risk_calculator.calculate_balance_priority(balance_data)
+                self.scheduler.touch(wallet_id, priority)
                 
                 # Create and publish event
                 event = Event(
                     event_type=EventTypes.BALANCE_CHANGE,
                     data=event_data.to_dict(),
                     priority=priority,
-                    timestamp=time.time()
+                    timestamp=self.clock()
                 )
                 if self.event_bus:
-                    # Schedule async publish
-                    asyncio.create_task(self.event_bus.publish(event))
+                    # Enqueue without awaiting; the bus applies its overflow policy
+                    self.event_bus.publish_nowait(event)
                 
         except Exception as e:
             print(f"Error publishing balance change event: {e}")
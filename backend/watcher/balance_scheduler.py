@@ -0,0 +1,154 @@
+import heapq
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from core.event_bus import EventPriority
+from core.risk_calculator import risk_calculator
+from config.settings import (
+    BALANCE_MAX_MONITORED_WALLETS, BALANCE_DEMOTE_AFTER_POLLS, BALANCE_WALLET_TTL_SECONDS,
+    BALANCE_POLL_BUDGET_PER_SECOND, BALANCE_POLL_BURST_SECONDS
+)
+
+PRIORITY_ORDER = [EventPriority.LOW, EventPriority.MEDIUM, EventPriority.HIGH, EventPriority.CRITICAL]
+
+class WalletSchedule:
+    __slots__ = ('priority', 'last_activity', 'last_change', 'next_due')
+
+    def __init__(self, priority: EventPriority, now: float):
+        self.priority = priority
+        self.last_activity = now
+        self.last_change = now
+        self.next_due = now
+
+class BalancePollScheduler:
+    """Per-wallet due-time heap for balance polling, keyed by address registry id.
+
+    Poll intervals come from RiskCalculator.get_monitoring_frequency for the
+    priority of the wallet's last event. Wallets that stay quiet are demoted
+    one level at a time and evicted once LOW and idle past the TTL; the set
+    is also capped LRU-style. A token bucket caps polls per second.
+    """
+
+    def __init__(self, max_wallets: int = BALANCE_MAX_MONITORED_WALLETS,
+                 demote_after_polls: int = BALANCE_DEMOTE_AFTER_POLLS,
+                 ttl_seconds: float = BALANCE_WALLET_TTL_SECONDS,
+                 budget_per_second: float = BALANCE_POLL_BUDGET_PER_SECOND,
+                 burst_seconds: float = BALANCE_POLL_BURST_SECONDS,
+                 clock: Callable[[], float] = time.monotonic,
+                 on_evict: Optional[Callable[[int], None]] = None):
+        self.max_wallets = max_wallets
+        self.demote_after_polls = demote_after_polls
+        self.ttl_seconds = ttl_seconds
+        self.budget_per_second = budget_per_second
+        self.bucket_capacity = max(1.0, budget_per_second * burst_seconds)
+        self.tokens = self.bucket_capacity
+        self.clock = clock
+        self.last_refill = clock()
+        self.on_evict = on_evict
+        # OrderedDict doubles as the LRU order (least recently active first)
+        self.schedules: "OrderedDict[int, WalletSchedule]" = OrderedDict()
+        self.heap = []
+        self.evicted_count = 0
+
+    def __len__(self):
+        return len(self.schedules)
+
+    def __contains__(self, wallet_id: int):
+        return wallet_id in self.schedules
+
+    def interval(self, priority: EventPriority) -> float:
+        return risk_calculator.get_monitoring_frequency(priority)
+
+    def touch(self, wallet_id: int, priority: Optional[EventPriority] = None):
+        """Record activity for a wallet; an event priority re-grades its poll interval"""
+        now = self.clock()
+        schedule = self.schedules.get(wallet_id)
+        if schedule is None:
+            schedule = self.schedules[wallet_id] = WalletSchedule(priority or EventPriority.MEDIUM, now)
+            heapq.heappush(self.heap, (schedule.next_due, wallet_id))
+            self._enforce_capacity()
+            return
+
+        self.schedules.move_to_end(wallet_id)
+        schedule.last_activity = now
+        schedule.last_change = now
+        if priority is not None and priority != schedule.priority:
+            schedule.priority = priority
+            next_due = min(schedule.next_due, now + self.interval(priority))
+            if next_due < schedule.next_due:
+                schedule.next_due = next_due
+                heapq.heappush(self.heap, (next_due, wallet_id))
+
+    def remove(self, wallet_id: int):
+        # Heap entries for removed wallets are discarded lazily when popped
+        self.schedules.pop(wallet_id, None)
+
+    def due_wallets(self, limit: Optional[int] = None, predicate: Optional[Callable[[int], bool]] = None) -> List[int]:
+        """Pop wallets due for a poll, within the RPC budget, and reschedule them.
+
+        Due wallets failing predicate are left due, without using budget or
+        being rescheduled, so a later call can still take them.
+        """
+        now = self.clock()
+        self.tokens = min(self.bucket_capacity, self.tokens + (now - self.last_refill) * self.budget_per_second)
+        self.last_refill = now
+
+        due = []
+        passed_over = []
+        while self.heap and self.heap[0][0] <= now and self.tokens >= 1 and (limit is None or len(due) < limit):
+            next_due, wallet_id = heapq.heappop(self.heap)
+            schedule = self.schedules.get(wallet_id)
+            if schedule is None or schedule.next_due != next_due:
+                continue  # stale heap entry
+
+            if predicate is not None and not predicate(wallet_id):
+                passed_over.append((next_due, wallet_id))
+                continue
+
+            if not self._age(wallet_id, schedule, now):
+                continue
+
+            schedule.next_due = now + self.interval(schedule.priority)
+            heapq.heappush(self.heap, (schedule.next_due, wallet_id))
+            self.tokens -= 1
+            due.append(wallet_id)
+
+        for entry in passed_over:
+            heapq.heappush(self.heap, entry)
+        return due
+
+    def _age(self, wallet_id: int, schedule: WalletSchedule, now: float) -> bool:
+        """Demote quiet wallets one level; evict idle LOW wallets. Returns False if evicted"""
+        level = PRIORITY_ORDER.index(schedule.priority)
+        if level == 0:
+            if now - schedule.last_activity > self.ttl_seconds:
+                self._evict(wallet_id)
+                return False
+            return True
+
+        if now - schedule.last_change > self.demote_after_polls * self.interval(schedule.priority):
+            schedule.priority = PRIORITY_ORDER[level - 1]
+            schedule.last_change = now
+        return True
+
+    def _enforce_capacity(self):
+        while len(self.schedules) > self.max_wallets:
+            wallet_id = next(iter(self.schedules))
+            self._evict(wallet_id)
+
+    def _evict(self, wallet_id: int):
+        self.schedules.pop(wallet_id, None)
+        self.evicted_count += 1
+        if self.on_evict:
+            self.on_evict(wallet_id)
+
+    def get_stats(self) -> Dict:
+        by_priority = {priority.name: 0 for priority in PRIORITY_ORDER}
+        for schedule in self.schedules.values():
+            by_priority[schedule.priority.name] += 1
+        return {
+            'wallets': len(self.schedules),
+            'by_priority': by_priority,
+            'evicted': self.evicted_count,
+            'tokens': self.tokens
+        }
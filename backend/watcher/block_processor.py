@@ -1,20 +1,65 @@
-from core.rpc_client import RPCClient
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from core.rpc_client import RPCClient, RPCError
 from watcher.transaction_analyzer import TransactionAnalyzer
 from watcher.whale_tracker import WhaleTracker
 from watcher.balance_monitor import BalanceMonitor
+from watcher.checkpoint import IngestionCheckpoint
 from core.utils import format_whale_event
-from config.settings import BALANCE_MONITORING_ENABLED, BALANCE_CHECK_INTERVAL_BLOCKS, EVENT_BUS_ENABLED, EVENT_BUS_AUTO_START
+from core.bloom import LogsBloomFilter
+from config.settings import (
+    USDC_DECIMALS, BALANCE_MONITORING_ENABLED, BALANCE_CHECK_INTERVAL_BLOCKS, EVENT_BUS_ENABLED, EVENT_BUS_AUTO_START,
+    CORRELATION_ENABLED, LOGS_BLOOM_PREFILTER_ENABLED,
+    STABLECOIN_ADDRESSES, TRANSFER_EVENT_TOPIC, INGESTION_MODE,
+    LOGS_RANGE_INITIAL_CHUNK, LOGS_RANGE_MIN_CHUNK, LOGS_RANGE_MAX_CHUNK, PIPELINE_WINDOW,
+    CATCHUP_THRESHOLD_BLOCKS, CATCHUP_CHUNK_BLOCKS, CATCHUP_CONCURRENCY, CATCHUP_RETRY_DELAY,
+    ADDRESS_REGISTRY_SWEEP_SECONDS
+)
+
+# Error codes/messages nodes use when an eth_getLogs query exceeds their result or range limits
+LOG_LIMIT_ERROR_CODES = {-32005}
+LOG_LIMIT_ERROR_HINTS = ("limit", "too many", "too large", "exceed", "range")
 
 class BlockProcessor:
-    def __init__(self, rpc_client: RPCClient):
+    def __init__(self, rpc_client: RPCClient, ingestion_mode: str = INGESTION_MODE,
+                 pipeline_window: int = PIPELINE_WINDOW,
+                 checkpoint: Optional[IngestionCheckpoint] = None,
+                 clock: Optional[Callable[[], float]] = None):
         self.rpc_client = rpc_client
-        self.transaction_analyzer = TransactionAnalyzer()
-        self.whale_tracker = WhaleTracker()
-        self.balance_monitor = BalanceMonitor(rpc_client)
+        # Epoch seconds used for whale windows and event times; ReplayEngine injects block time
+        self.clock = clock or time.time
+        self.transaction_analyzer = TransactionAnalyzer(clock=self.clock)
+        self.whale_tracker = WhaleTracker(clock=self.clock)
+        self.balance_monitor = BalanceMonitor(rpc_client, clock=clock)
+        self.ingestion_mode = ingestion_mode
+        self.stablecoin_addresses = list(STABLECOIN_ADDRESSES.values())
+        # Skips receipt fetches for blocks whose logsBloom rules out a stablecoin Transfer
+        self.bloom_filter = (
+            LogsBloomFilter(self.stablecoin_addresses, TRANSFER_EVENT_TOPIC) if LOGS_BLOOM_PREFILTER_ENABLED else None
+        )
+        # eth_getLogs range chunk size learned by the live path; catch-up keeps its own
+        self.logs_chunk = {'size': LOGS_RANGE_INITIAL_CHUNK}
+        self.pipeline_window = max(1, pipeline_window)
         self.last_block_number = None
+        self.head_block_number = None
+        self.checkpoint = checkpoint
+        # Background backfill of blocks missed while down; see _resume_from_checkpoint
+        self.catchup_task: Optional[asyncio.Task] = None
+        self.catchup_last_block = None
+        self.catchup_target = None
+        self.catchup_logs_chunk = None
+        self.historical_whale_tracker = None
+        # Optional push source of Transfer logs (e.g. HeadTracker with a logs subscription)
+        self.log_feed = None
         self.blocks_since_balance_check = 0
+        # Wall-clock (monotonic) time of the last address registry sweep; see _sweep_registry
+        self.last_registry_sweep = time.monotonic()
+        self.registry_sweep_seconds = ADDRESS_REGISTRY_SWEEP_SECONDS
         self.event_bus = None
-        self.concurrent_events = []
+        self.risk_correlator = None
         
         if EVENT_BUS_ENABLED:
             self._initialize_event_bus()
@@ -32,6 +77,11 @@ class BlockProcessor:
             # Set up mock agent for Phase 1 testing
             self.mock_agent = setup_mock_agent()
             
+            if CORRELATION_ENABLED:
+                from core.risk_correlator import RiskCorrelator
+                self.risk_correlator = RiskCorrelator(clock=self.clock)
+                self.risk_correlator.attach(event_bus)
+            
             print("Event bus initialized in BlockProcessor")
         except ImportError:
             print("Warning: Event bus not available")
@@ -50,63 +100,352 @@ class BlockProcessor:
             print("Event bus processing stopped")
     
     async def get_latest_block_number(self):
-        latest_block_data = await self.rpc_client.get_latest_block()
-        return int(latest_block_data["number"])
+        return await self.rpc_client.get_block_number()
     
     async def process_block(self, block_number):
+        transfers = await self.fetch_and_decode_block(block_number)
+        whale_events = self._track_transfers(transfers)
+        return transfers, whale_events
+    
+    async def fetch_block(self, block_number):
+        """Fetch stage: download a block and all of its receipts"""
         print(f"Processing block: {block_number}")
         block_data = await self.rpc_client.get_block_by_number(block_number)
-        txs = block_data.get("transactions", [])
+        if self.bloom_filter and not self.bloom_filter.check_block(block_data):
+            return block_data, []
         
-        all_transfers = []
-        whale_events = []
-        for tx in txs:
-            receipt_data = await self.rpc_client.get_transaction_receipt(tx["hash"])
-            logs = receipt_data.get("logs", [])
-            transfers = self.transaction_analyzer.analyze_transaction_logs(logs, tx["hash"])
-            all_transfers.extend(transfers)
-            
-            for transfer in transfers:
-                whale_event = self.whale_tracker.analyze_transfer(transfer)
-                if whale_event:
-                    whale_events.append(whale_event)
-                    print(format_whale_event(whale_event))
-                    
-                    if BALANCE_MONITORING_ENABLED:
-                        self.balance_monitor.add_wallet_to_monitor(transfer['from_address'])
-                        self.balance_monitor.add_wallet_to_monitor(transfer['to_address'])
+        tx_hashes = [tx["hash"] for tx in block_data.get("transactions", [])]
+        receipts = await self.rpc_client.get_transaction_receipts(tx_hashes)
+        return block_data, receipts
+    
+    def decode_block(self, block_data, receipts):
+        """Decode stage: extract stablecoin transfers into a TransferBatch, without touching tracker state"""
+        batch = self.transaction_analyzer.new_batch()
+        block_number = block_data["number"]
+        timestamp = int(block_data["timestamp"], 16) if block_data.get("timestamp") else None
+        for tx, receipt_data in zip(block_data.get("transactions", []), receipts):
+            if self.bloom_filter and not self.bloom_filter.check_receipt(receipt_data):
+                continue
+            self.transaction_analyzer.decode_transfers(
+                receipt_data.get("logs", []), batch, tx["hash"], block_number, timestamp
+            )
+        if batch:
+            print(f"Block {block_number}: {len(batch)} stablecoin transfers")
+        return batch
+    
+    async def fetch_and_decode_block(self, block_number):
+        block_data, receipts = await self.fetch_block(block_number)
+        return self.decode_block(block_data, receipts)
+    
+    async def process_block_range_logs(self, from_block: int, to_block: int):
+        """Process an inclusive block range from stablecoin Transfer logs only"""
+        print(f"Processing blocks {from_block}-{to_block} via eth_getLogs")
+        logs = await self.fetch_transfer_logs(from_block, to_block)
+        
+        # eth_getLogs returns logs ordered by block and log index, so the batch keeps chain order
+        transfers = self.transaction_analyzer.decode_transfers(logs)
+        print(f"Blocks {from_block}-{to_block}: {len(transfers)} stablecoin transfers")
+        whale_events = self._track_transfers(transfers)
+        return transfers, whale_events
+    
+    async def fetch_transfer_logs(self, from_block: int, to_block: int, chunk_state: Optional[Dict] = None):
+        """Fetch Transfer logs for the range, adapting the chunk size to the node's limits
+
+        chunk_state ({'size': blocks}) carries the learned chunk size between
+        calls; callers with their own range sizes pass their own, so a large
+        backfill shrinking or growing it does not resize the live path's fetches.
+        """
+        if self.log_feed:
+            logs = self.log_feed.take_logs(from_block, to_block)
+            if logs is not None:
+                return logs
         
-        return all_transfers, whale_events
+        logs = []
+        start = from_block
+        chunk_state = self.logs_chunk if chunk_state is None else chunk_state
+        # Largest chunk known to fit during this fetch; re-probed on the next call
+        chunk_ceiling = LOGS_RANGE_MAX_CHUNK
+        while start <= to_block:
+            chunk_size = chunk_state['size']
+            end = min(start + chunk_size - 1, to_block)
+            try:
+                chunk_logs = await self.rpc_client.get_logs(
+                    start, end, self.stablecoin_addresses, [TRANSFER_EVENT_TOPIC]
+                )
+            except RPCError as e:
+                if chunk_size <= LOGS_RANGE_MIN_CHUNK or not self._is_log_limit_error(e):
+                    raise
+                chunk_ceiling = max(LOGS_RANGE_MIN_CHUNK, chunk_size - 1)
+                chunk_state['size'] = max(LOGS_RANGE_MIN_CHUNK, chunk_size // 2)
+                print(f"eth_getLogs limit hit, shrinking range chunk to {chunk_state['size']} blocks")
+                continue
+            
+            logs.extend(log for log in chunk_logs if not log.get("removed"))
+            
+            # Grow again after a full-size chunk succeeds
+            if end - start + 1 == chunk_size:
+                chunk_state['size'] = min(chunk_ceiling, chunk_size * 2)
+            start = end + 1
+        return logs
+    
+    def _is_log_limit_error(self, error: RPCError) -> bool:
+        if error.code in LOG_LIMIT_ERROR_CODES:
+            return True
+        message = str(error.error).lower()
+        return any(hint in message for hint in LOG_LIMIT_ERROR_HINTS)
     
-    async def process_new_blocks(self):
-        current_block = await self.get_latest_block_number()
+    def _track_transfers(self, transfers):
+        """Run a TransferBatch through whale tracking and balance monitoring"""
+        whale_events = []
+        scale = 10**USDC_DECIMALS
+        now = datetime.fromtimestamp(self.clock())
+        for tx_hash, from_id, to_id, raw_value in zip(
+            transfers.tx_hashes, transfers.from_ids, transfers.to_ids, transfers.raw_amounts
+        ):
+            whale_event = self.whale_tracker.analyze(raw_value / scale, tx_hash, from_id, to_id, now)
+            if whale_event:
+                whale_events.append(whale_event)
+                print(format_whale_event(whale_event))
+                
+                if BALANCE_MONITORING_ENABLED:
+                    self.balance_monitor.monitor_wallet(from_id, whale_event['priority'])
+                    self.balance_monitor.monitor_wallet(to_id, whale_event['priority'])
+        return whale_events
+    
+    async def process_new_blocks(self, current_block: Optional[int] = None):
+        """Process blocks up to the given head (fetched via eth_blockNumber if not supplied)"""
+        if current_block is None:
+            current_block = await self.get_latest_block_number()
         print("Latest block number:", current_block)
+        self.rpc_client.observe_head(current_block)
         
         if self.last_block_number is None:
-            self.last_block_number = current_block - 1
+            self._resume_from_checkpoint(current_block)
         
-        all_transfers = []
+        self.head_block_number = current_block
+        
+        if self.ingestion_mode == "logs":
+            return await self._process_new_blocks_from_logs(current_block)
+        
+        all_transfers, all_whale_events = await self._process_range_pipelined(
+            self.last_block_number + 1, current_block
+        )
+        
+        self._sweep_registry()
+        self.whale_tracker.clear_old_events()
+        print(f"Ingestion lag: {self.get_lag()} blocks")
+        
+        return all_transfers, all_whale_events
+    
+    async def _process_range_pipelined(self, from_block: int, to_block: int):
+        """Fetch and decode up to pipeline_window blocks ahead, committing strictly in block order"""
+        all_transfers = self.transaction_analyzer.new_batch()
         all_whale_events = []
-        for block_num in range(self.last_block_number + 1, current_block + 1):
-            transfers, whale_events = await self.process_block(block_num)
-            all_transfers.extend(transfers)
-            all_whale_events.extend(whale_events)
-            
-            if BALANCE_MONITORING_ENABLED:
-                blocks_processed = current_block - (self.last_block_number or current_block - 1)
-                self.blocks_since_balance_check += blocks_processed
+        in_flight = deque()
+        next_block = from_block
+        
+        # Blocks decoded ahead of their commit keep their address ids until the range is done
+        try:
+            with self.transaction_analyzer.registry.pinned():
+                while next_block <= to_block or in_flight:
+                    while next_block <= to_block and len(in_flight) < self.pipeline_window:
+                        task = asyncio.create_task(self.fetch_and_decode_block(next_block))
+                        in_flight.append((next_block, task))
+                        next_block += 1
+                    
+                    block_num, task = in_flight.popleft()
+                    transfers = await task
+                    whale_events = await self.commit_block(block_num, transfers)
+                    all_transfers.extend(transfers)
+                    all_whale_events.extend(whale_events)
+        finally:
+            # On failure, drop blocks fetched past the last commit; the next poll resumes from there
+            for _, task in in_flight:
+                task.cancel()
+        
+        return all_transfers, all_whale_events
+    
+    async def commit_block(self, block_number: int, transfers, block_count: int = 1):
+        """Stateful stage: apply a decoded block to whale and balance tracking.
+
+        block_count covers blocks without transfers skipped since the last commit.
+        """
+        whale_events = self._track_transfers(transfers)
+        await self._update_balances(block_number, transfers, block_count)
+        
+        self.last_block_number = block_number
+        self._save_checkpoint()
+        self._sweep_registry()
+        return whale_events
+    
+    async def _update_balances(self, block_number: int, transfers, block_count: int):
+        """Apply committed blocks to the balance ledger, or poll balances on the block interval"""
+        if not BALANCE_MONITORING_ENABLED:
+            return
+        
+        if self.balance_monitor.ledger_enabled:
+            await self.balance_monitor.apply_block(block_number, transfers, block_count)
+        else:
+            self.blocks_since_balance_check += block_count
+            if self.blocks_since_balance_check >= BALANCE_CHECK_INTERVAL_BLOCKS:
+                await self._check_monitored_balances()
+                self.blocks_since_balance_check = 0
+        self.balance_monitor.clear_old_data()
+    
+    def _resume_from_checkpoint(self, current_block: int):
+        """Pick the first block to process, backfilling a large restart gap in the background"""
+        checkpoint_block = self.checkpoint.load() if self.checkpoint else None
+        if checkpoint_block is None:
+            self.last_block_number = current_block - 1
+            return
+        
+        gap = current_block - 1 - checkpoint_block
+        if gap <= CATCHUP_THRESHOLD_BLOCKS:
+            print(f"Resuming from checkpoint block {checkpoint_block} ({max(0, gap)} blocks missed)")
+            self.last_block_number = min(checkpoint_block, current_block - 1)
+            return
+        
+        # Live processing starts at the head right away; the gap is replayed without live alerts
+        print(f"Catching up on {gap} missed blocks ({checkpoint_block + 1}-{current_block - 1}) "
+              f"while processing live blocks from {current_block}")
+        self.last_block_number = current_block - 1
+        self.catchup_last_block = checkpoint_block
+        self.catchup_target = current_block - 1
+        self.catchup_logs_chunk = {'size': LOGS_RANGE_INITIAL_CHUNK}
+        self.historical_whale_tracker = WhaleTracker(historical=True, clock=self.clock)
+        self.catchup_task = asyncio.create_task(self._run_catchup())
+    
+    def _save_checkpoint(self):
+        """Persist the highest block below which every block is committed"""
+        if not self.checkpoint:
+            return
+        if self.catchup_task:
+            self.checkpoint.save(self.catchup_last_block)
+        else:
+            self.checkpoint.save(self.last_block_number)
+    
+    async def _run_catchup(self):
+        while self.catchup_last_block < self.catchup_target:
+            try:
+                await self._catchup_range(self.catchup_last_block + 1, self.catchup_target)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Catch-up failed after block {self.catchup_last_block}: {e}; "
+                      f"retrying in {CATCHUP_RETRY_DELAY}s")
+                await asyncio.sleep(CATCHUP_RETRY_DELAY)
+        
+        print(f"Catch-up complete through block {self.catchup_target}")
+        self.catchup_task = None
+        self.catchup_logs_chunk = None
+        self.historical_whale_tracker = None
+        self._save_checkpoint()
+    
+    async def _catchup_range(self, from_block: int, to_block: int):
+        """Fetch Transfer logs in large ranges, several ahead, committing ranges in order"""
+        previous_block = from_block - 1
+        previous_time = await self._get_block_time(previous_block)
+        in_flight = deque()
+        next_start = from_block
+        
+        try:
+            while next_start <= to_block or in_flight:
+                while next_start <= to_block and len(in_flight) < CATCHUP_CONCURRENCY:
+                    end = min(next_start + CATCHUP_CHUNK_BLOCKS - 1, to_block)
+                    task = asyncio.create_task(self._fetch_catchup_range(next_start, end))
+                    in_flight.append((end, task))
+                    next_start = end + 1
                 
-                if self.blocks_since_balance_check >= BALANCE_CHECK_INTERVAL_BLOCKS:
-                    await self._check_monitored_balances()
-                    self.blocks_since_balance_check = 0
+                end, task = in_flight.popleft()
+                logs, end_time = await task
+                self._commit_catchup_range(logs, previous_block, previous_time, end, end_time)
+                previous_block, previous_time = end, end_time
+                self.catchup_last_block = end
+                self._save_checkpoint()
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+    
+    async def _fetch_catchup_range(self, from_block: int, to_block: int):
+        logs, end_time = await asyncio.gather(
+            self.fetch_transfer_logs(from_block, to_block, self.catchup_logs_chunk),
+            self._get_block_time(to_block)
+        )
+        return logs, end_time
+    
+    async def _get_block_time(self, block_number: int) -> float:
+        header = await self.rpc_client.get_block_by_number(block_number, full_transactions=False)
+        return int(header["timestamp"], 16)
+    
+    def _commit_catchup_range(self, logs, start_block: int, start_time: float, end_block: int, end_time: float):
+        """Replay a range through the historical whale tracker at interpolated block times"""
+        seconds_per_block = (end_time - start_time) / max(1, end_block - start_block)
+        transfers = self.transaction_analyzer.decode_transfers(logs, timestamp=0.0)
+        scale = 10**USDC_DECIMALS
+        whale_count = 0
+        for tx_hash, from_id, to_id, raw_value, block_number in zip(
+            transfers.tx_hashes, transfers.from_ids, transfers.to_ids, transfers.raw_amounts, transfers.block_numbers
+        ):
+            block_time = datetime.fromtimestamp(start_time + (block_number - start_block) * seconds_per_block)
             
-                self.balance_monitor.clear_old_data()
+            whale_event = self.historical_whale_tracker.analyze(raw_value / scale, tx_hash, from_id, to_id, block_time)
+            if whale_event:
+                whale_count += 1
+                if BALANCE_MONITORING_ENABLED:
+                    self.balance_monitor.monitor_wallet(from_id, whale_event['priority'])
+                    self.balance_monitor.monitor_wallet(to_id, whale_event['priority'])
+        self.historical_whale_tracker.clear_old_events()
         
-        self.last_block_number = current_block
-        self.whale_tracker.clear_old_events()
+        print(f"Catch-up: committed through block {end_block} ({len(transfers)} transfers, "
+              f"{whale_count} historical whale events, {self.catchup_target - end_block} blocks left)")
+    
+    async def stop_catchup(self):
+        """Cancel a running catch-up; the checkpoint still points at its last committed range"""
+        if self.catchup_task:
+            self.catchup_task.cancel()
+            try:
+                await self.catchup_task
+            except asyncio.CancelledError:
+                pass
+            self.catchup_task = None
+    
+    def _sweep_registry(self):
+        """Free address ids no tracker holds any more, every registry_sweep_seconds of wall time.
+
+        Deferred while a pipelined range or replayed range holds the registry pinned.
+        """
+        now = time.monotonic()
+        registry = self.transaction_analyzer.registry
+        if now - self.last_registry_sweep < self.registry_sweep_seconds or registry.pins:
+            return
+        self.last_registry_sweep = now
+        freed = registry.sweep()
+        if freed:
+            print(f"Address registry: freed {freed} ids, {len(registry)} in use")
+    
+    def get_bloom_stats(self) -> dict:
+        return self.bloom_filter.get_stats() if self.bloom_filter else {}
+    
+    def get_lag(self) -> int:
+        """Blocks between the chain head and the last committed block"""
+        if self.head_block_number is None or self.last_block_number is None:
+            return 0
+        return max(0, self.head_block_number - self.last_block_number)
+    
+    async def _process_new_blocks_from_logs(self, current_block: int):
+        if current_block <= self.last_block_number:
+            return self.transaction_analyzer.new_batch(), []
         
+        all_transfers, all_whale_events = await self.process_block_range_logs(
+            self.last_block_number + 1, current_block
+        )
         
+        await self._update_balances(current_block, all_transfers, current_block - self.last_block_number)
         
+        self.last_block_number = current_block
+        self._save_checkpoint()
+        self._sweep_registry()
+        self.whale_tracker.clear_old_events()
         return all_transfers, all_whale_events
     
     async def _check_monitored_balances(self):
@@ -0,0 +1,49 @@
+import json
+import os
+import time
+from typing import Optional
+
+class IngestionCheckpoint:
+    """Last fully committed block, persisted so a restart resumes where it stopped.
+
+    save() writes a temp file, fsyncs it and renames it over the checkpoint,
+    so a crash leaves either the old or the new value, never a torn file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_saved: Optional[int] = None
+
+    def load(self) -> Optional[int]:
+        try:
+            with open(self.path) as f:
+                block_number = json.load(f)["last_block"]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable ingestion checkpoint {self.path}: {e}")
+            return None
+        self.last_saved = block_number
+        return block_number
+
+    def save(self, block_number: int):
+        if block_number == self.last_saved:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"last_block": block_number, "updated_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+        # Persist the rename itself
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        self.last_saved = block_number
@@ -0,0 +1,206 @@
+import asyncio
+import aiohttp
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from core.rpc_client import RPCClient
+from config.settings import (
+    POLL_INTERVAL, STABLECOIN_ADDRESSES, TRANSFER_EVENT_TOPIC,
+    HEAD_RECONNECT_MIN_DELAY, HEAD_RECONNECT_MAX_DELAY, HEAD_LOG_BUFFER_BLOCKS
+)
+
+class HeadTracker:
+    """Chain head source: eth_subscribe("newHeads") over WebSocket, falling back to polling.
+
+    Heads are coalesced, so a slow consumer always receives the newest head
+    and BlockProcessor catches up any gap from its last committed block.
+    With subscribe_logs, USDC Transfer logs are buffered from a "logs"
+    subscription and served to BlockProcessor through take_logs(); heads are
+    then reported one block behind so every reported block's logs are complete.
+    """
+
+    def __init__(self, rpc_client: RPCClient, ws_url: Optional[str] = None,
+                 poll_interval: float = POLL_INTERVAL, subscribe_logs: bool = False):
+        self.rpc_client = rpc_client
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.subscribe_logs = subscribe_logs and bool(ws_url)
+        self.latest_head: Optional[int] = None
+        self.subscribed = False
+        self.head_event = asyncio.Event()
+        self.maintain_task: Optional[asyncio.Task] = None
+        # Per block: (log index, log) as received
+        self.pending_logs: Dict[int, List[Tuple[int, Dict]]] = defaultdict(list)
+        self.logs_covered_from: Optional[int] = None
+        self.logs_complete_through: Optional[int] = None
+        self.reconnects = 0
+
+    async def heads(self):
+        """Async generator yielding the newest head block number whenever it advances"""
+        self.maintain_task = asyncio.create_task(self._maintain())
+        self.maintain_task.add_done_callback(lambda _: self.head_event.set())
+        last_yielded = None
+        try:
+            while True:
+                await self.head_event.wait()
+                self.head_event.clear()
+                if self.maintain_task.done():
+                    self.maintain_task.result()
+                head = self.latest_head
+                if head is not None and (last_yielded is None or head > last_yielded):
+                    last_yielded = head
+                    yield head
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self.maintain_task and not self.maintain_task.done():
+            self.maintain_task.cancel()
+            try:
+                await self.maintain_task
+            except asyncio.CancelledError:
+                pass
+
+    def take_logs(self, from_block: int, to_block: int) -> Optional[List[Dict]]:
+        """Return buffered Transfer logs for the range, or None if the subscription did not cover all of it"""
+        if (self.logs_covered_from is None or self.logs_complete_through is None
+                or from_block < self.logs_covered_from or to_block > self.logs_complete_through):
+            return None
+
+        logs = []
+        for block_number in sorted(self.pending_logs):
+            if block_number > to_block:
+                break
+            block_logs = self.pending_logs.pop(block_number)
+            if block_number >= from_block:
+                logs.extend(log for _, log in sorted(block_logs, key=lambda entry: entry[0]))
+        return logs
+
+    async def _maintain(self):
+        """Keep a subscription alive, polling while it is down"""
+        reconnect_delay = HEAD_RECONNECT_MIN_DELAY
+        while True:
+            if self.ws_url:
+                try:
+                    await self._run_subscription()
+                except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError,
+                        ValueError, TypeError, KeyError, AttributeError) as e:
+                    print(f"Head subscription unavailable ({e}), falling back to polling")
+                if self.subscribed:
+                    reconnect_delay = HEAD_RECONNECT_MIN_DELAY
+                self._reset_subscription_state()
+                await self._poll_for(reconnect_delay)
+                reconnect_delay = min(HEAD_RECONNECT_MAX_DELAY, reconnect_delay * 2)
+                self.reconnects += 1
+            else:
+                await self._poll_for(None)
+
+    async def _poll_for(self, duration: Optional[float]):
+        """Poll eth_blockNumber for the given duration (forever if None)"""
+        loop = asyncio.get_running_loop()
+        deadline = None if duration is None else loop.time() + duration
+        while deadline is None or loop.time() < deadline:
+            try:
+                self._set_head(await self.rpc_client.get_block_number())
+            except Exception as e:
+                print(f"Error polling head block: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_subscription(self):
+        async with self.rpc_client.session.ws_connect(self.ws_url, heartbeat=30) as ws:
+            heads_id = await self._subscribe(ws, 1, ["newHeads"])
+            logs_id = None
+            if self.subscribe_logs:
+                logs_id = await self._subscribe(ws, 2, ["logs", {
+                    "address": list(STABLECOIN_ADDRESSES.values()),
+                    "topics": [TRANSFER_EVENT_TOPIC]
+                }])
+            self.subscribed = True
+            print(f"Subscribed to new heads via {self.ws_url}")
+            recorder = self.rpc_client.recorder
+            if recorder:
+                recorder.record_notification("subscribed", {"logs": logs_id is not None})
+
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    if message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+                    continue
+                try:
+                    self._on_message(json.loads(message.data), heads_id, logs_id, recorder)
+                except (KeyError, AttributeError, TypeError, ValueError) as e:
+                    # Skipping it could leave a hole in the buffered logs; resubscribe instead
+                    raise ConnectionError(f"malformed subscription message: {e!r}") from e
+        raise ConnectionError("subscription closed by server")
+
+    def _on_message(self, payload: Dict, heads_id: str, logs_id: Optional[str], recorder):
+        if payload.get("method") != "eth_subscription":
+            return
+        params = payload.get("params", {})
+        if params.get("subscription") == heads_id:
+            head = int(params["result"]["number"], 16)
+            if recorder:
+                recorder.record_notification("newHeads", params["result"])
+            self._on_new_head(head)
+        elif params.get("subscription") == logs_id:
+            self._on_log(params["result"])
+            if recorder:
+                recorder.record_notification("logs", params["result"])
+
+    async def _subscribe(self, ws, request_id: int, params: list) -> str:
+        await ws.send_json({"jsonrpc": "2.0", "id": request_id, "method": "eth_subscribe", "params": params})
+        while True:
+            message = await ws.receive(timeout=10)
+            if message.type != aiohttp.WSMsgType.TEXT:
+                # CLOSE, CLOSING, ERROR or a binary frame: receive_json would raise TypeError here
+                raise ConnectionError(f"subscription socket got {message.type.name} while subscribing")
+            reply = json.loads(message.data)
+            if reply.get("id") == request_id:
+                if "error" in reply:
+                    raise ValueError(f"eth_subscribe {params[0]} rejected: {reply['error']}")
+                return reply["result"]
+
+    def _on_new_head(self, head: int):
+        if not self.subscribe_logs:
+            self._set_head(head)
+            return
+        # Logs of the first head after (re)subscribing may predate the logs subscription
+        if self.logs_covered_from is None:
+            self.logs_covered_from = head + 1
+            return
+        # Logs for block N are complete once head N+1 is announced
+        self.logs_complete_through = head - 1
+        self._trim_pending_logs(head - HEAD_LOG_BUFFER_BLOCKS)
+        if head - 1 >= self.logs_covered_from:
+            self._set_head(head - 1)
+
+    def _on_log(self, log: Dict):
+        # Parsed on arrival, so a malformed log fails the subscription rather than take_logs
+        block_number = int(log["blockNumber"], 16)
+        log_index = int(log["logIndex"], 16)
+        if log.get("removed"):
+            self.pending_logs[block_number] = [
+                (pending_index, pending) for pending_index, pending in self.pending_logs.get(block_number, [])
+                if (pending["blockHash"], pending_index) != (log["blockHash"], log_index)
+            ]
+        else:
+            self.pending_logs[block_number].append((log_index, log))
+
+    def _trim_pending_logs(self, keep_from: int):
+        """Bound the buffer if nobody consumes it; trimmed blocks are no longer covered"""
+        if self.logs_covered_from is None or keep_from <= self.logs_covered_from:
+            return
+        for block_number in [number for number in self.pending_logs if number < keep_from]:
+            del self.pending_logs[block_number]
+        self.logs_covered_from = keep_from
+
+    def _set_head(self, head: int):
+        if self.latest_head is None or head > self.latest_head:
+            self.latest_head = head
+            self.head_event.set()
+
+    def _reset_subscription_state(self):
+        self.subscribed = False
+        self.pending_logs.clear()
+        self.logs_covered_from = None
+        self.logs_complete_through = None
@@ -0,0 +1,196 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, List, Optional
+from core.rpc_client import RPCClient, RPCError
+from watcher.block_processor import BlockProcessor
+from watcher.transaction_analyzer import TransactionAnalyzer
+from watcher.transfer_batch import TransferBatch
+from config.settings import REPLAY_CHUNK_BLOCKS, REPLAY_CONCURRENCY
+
+class BlockClock:
+    """Clock reading the timestamp of the block being replayed (epoch seconds, never goes back)"""
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def __call__(self) -> float:
+        return self.current
+
+    def advance(self, timestamp: float):
+        if timestamp > self.current:
+            self.current = timestamp
+
+class ReplayEngine:
+    """Runs the watcher stack over a historical block range on chain time.
+
+    Transfer logs are fetched in chunks of chunk_blocks, up to concurrency
+    chunks ahead, and committed strictly in block order through the same
+    BlockProcessor.commit_block path the live watcher uses. Before each block
+    is committed the injected BlockClock is set to its timestamp, so whale
+    windows, balance timestamps and event times follow the chain rather than
+    the wall clock, and a replay raises the alerts the live watcher would
+    have raised. With exact_timestamps, every block holding a transfer has
+    its header fetched (batched); otherwise times are interpolated between
+    each chunk's first and last block.
+    """
+
+    def __init__(self, rpc_client: RPCClient, chunk_blocks: int = REPLAY_CHUNK_BLOCKS,
+                 concurrency: int = REPLAY_CONCURRENCY, exact_timestamps: bool = True,
+                 alerts_path: Optional[str] = None):
+        self.rpc_client = rpc_client
+        self.chunk_blocks = max(1, chunk_blocks)
+        self.concurrency = max(1, concurrency)
+        self.exact_timestamps = exact_timestamps
+        self.clock = BlockClock()
+        self.block_processor = BlockProcessor(rpc_client, ingestion_mode="logs", clock=self.clock)
+        self.alerts_path = alerts_path
+        self.alerts_file = None
+        self.first_block_time = None
+        self.stats = {'blocks': 0, 'transfers': 0, 'whale_events': 0, 'headers_fetched': 0}
+
+    async def run(self, from_block: int, to_block: int) -> Dict:
+        """Replay the inclusive range and return a summary"""
+        self.rpc_client.observe_head(await self.rpc_client.get_block_number())
+        self.block_processor.last_block_number = from_block - 1
+        if self.alerts_path:
+            self.alerts_file = open(self.alerts_path, "w")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        in_flight = deque()
+        next_start = from_block
+        try:
+            while next_start <= to_block or in_flight:
+                while next_start <= to_block and len(in_flight) < self.concurrency:
+                    end = min(next_start + self.chunk_blocks - 1, to_block)
+                    in_flight.append((next_start, end, asyncio.create_task(self.fetch_range(next_start, end))))
+                    next_start = end + 1
+
+                start, end, task = in_flight.popleft()
+                await self._commit_range(start, end, await task)
+        finally:
+            for _, _, task in in_flight:
+                task.cancel()
+            if self.alerts_file:
+                self.alerts_file.close()
+                self.alerts_file = None
+
+        elapsed = loop.time() - started
+        return {
+            'from_block': from_block,
+            'to_block': to_block,
+            **self.stats,
+            'wall_seconds': round(elapsed, 3),
+            'blocks_per_sec': round(self.stats['blocks'] / elapsed, 1) if elapsed else None,
+            'chain_seconds': round(self.clock() - self.first_block_time, 1) if self.first_block_time else 0.0,
+            'exact_timestamps': self.exact_timestamps
+        }
+
+    async def fetch_range(self, start: int, end: int):
+        """Transfer logs for start..end and the block times needed to stamp them"""
+        logs = await self.block_processor.fetch_transfer_logs(start, end)
+        if self.exact_timestamps:
+            block_numbers = {int(log["blockNumber"], 16) for log in logs} | {start, end}
+        else:
+            block_numbers = {start, end}
+        return logs, await self._block_times(sorted(block_numbers))
+
+    async def _block_times(self, block_numbers: List[int]) -> Dict[int, float]:
+        results = await self.rpc_client.rpc_batch(
+            [("eth_getBlockByNumber", [hex(block_number), False]) for block_number in block_numbers]
+        )
+        block_times = {}
+        for block_number, header in zip(block_numbers, results):
+            if isinstance(header, RPCError) or not header:
+                header = await self.rpc_client.get_block_by_number(block_number, full_transactions=False)
+            block_times[block_number] = int(header["timestamp"], 16)
+        self.stats['headers_fetched'] += len(block_numbers)
+        return block_times
+
+    async def _commit_range(self, start: int, end: int, fetched):
+        logs, block_times = fetched
+        transfers = self.decode_range(start, end, logs, block_times)
+        await self.commit_range(start, end, transfers, block_times[start], block_times[end])
+
+    def decode_range(self, start: int, end: int, logs, block_times: Dict[int, float],
+                     analyzer: Optional[TransactionAnalyzer] = None) -> TransferBatch:
+        """Decode a fetched range, stamping each transfer with its block time.
+
+        block_times must hold start and end; blocks missing from it are
+        interpolated between the two.
+        """
+        analyzer = analyzer or self.block_processor.transaction_analyzer
+        transfers = analyzer.decode_transfers(logs, timestamp=0.0)
+        seconds_per_block = (block_times[end] - block_times[start]) / max(1, end - start)
+        for index, block_number in enumerate(transfers.block_numbers):
+            block_time = block_times.get(block_number)
+            if block_time is None:
+                block_time = block_times[start] + (block_number - start) * seconds_per_block
+            transfers.timestamps[index] = block_time
+        return transfers
+
+    async def commit_range(self, start: int, end: int, transfers: TransferBatch, start_time: float, end_time: float):
+        """Stateful stage: commit a decoded range block by block, on block time.
+
+        transfers must be decoded (or remapped) against the block processor's
+        registry with no await in between; the registry is not swept until the
+        whole range is committed.
+        """
+        block_processor = self.block_processor
+        if self.first_block_time is None:
+            self.first_block_time = start_time
+            self.clock.advance(start_time)
+
+        # The whole range is decoded up front, so its ids stay pinned until its last block commits
+        registry = block_processor.transaction_analyzer.registry
+        with registry.pinned():
+            block_numbers = transfers.block_numbers
+            index = 0
+            while index < len(transfers):
+                block_number = block_numbers[index]
+                stop = index
+                while stop < len(transfers) and block_numbers[stop] == block_number:
+                    stop += 1
+                self.clock.advance(transfers.timestamps[index])
+                whale_events = await block_processor.commit_block(
+                    block_number, transfers.slice(index, stop), block_number - block_processor.last_block_number
+                )
+                if whale_events:
+                    self._record_alerts(block_number, whale_events)
+                    await self._drain_event_bus()
+                index = stop
+
+            self.clock.advance(end_time)
+            if block_processor.last_block_number < end:
+                await block_processor.commit_block(
+                    end, block_processor.transaction_analyzer.new_batch(), end - block_processor.last_block_number
+                )
+        block_processor._sweep_registry()
+        block_processor.whale_tracker.clear_old_events()
+
+        self.stats['blocks'] += end - start + 1
+        self.stats['transfers'] += len(transfers)
+        print(f"Replay: blocks {start}-{end} ({len(transfers)} transfers, "
+              f"{self.stats['whale_events']} whale events so far)")
+
+    def _record_alerts(self, block_number: int, whale_events: List[Dict]):
+        self.stats['whale_events'] += len(whale_events)
+        if not self.alerts_file:
+            return
+        for whale_event in whale_events:
+            self.alerts_file.write(json.dumps({
+                **whale_event,
+                'block_number': block_number,
+                'timestamp': whale_event['timestamp'].isoformat(),
+                'priority': whale_event['priority'].name
+            }) + "\n")
+
+    async def _drain_event_bus(self):
+        """Let handlers see each alert before the clock moves on, so correlation windows match live"""
+        event_bus = self.block_processor.event_bus
+        if not event_bus or not event_bus.running:
+            return
+        while event_bus.queue_size:
+            await asyncio.sleep(0)
+        await event_bus.flush_batches()
@@ -1,27 +1,41 @@
-from config.settings import STABLECOIN_ADDRESSES, USDC_DECIMALS
+from config.settings import STABLECOIN_ADDRESSES, USDC_DECIMALS, TRANSFER_EVENT_TOPIC
 from core.utils import extract_address_from_topic, format_transfer_output
+from core.address_registry import AddressRegistry, address_registry
+from watcher.transfer_batch import TransferBatch
 from datetime import datetime
+from typing import Callable, Optional
+import time
 
 class TransactionAnalyzer:
-    def __init__(self):
+    def __init__(self, registry: AddressRegistry = address_registry, clock: Callable[[], float] = time.time):
         self.stablecoin_addresses = {addr.lower() for addr in STABLECOIN_ADDRESSES.values()}
+        # Batches carry ids from this registry
+        self.registry = registry
+        self.clock = clock
     
     def is_stablecoin_transfer(self, log):
-        return log.get("address", "").lower() in self.stablecoin_addresses
+        topics = log.get("topics", [])
+        return (
+            log.get("address", "").lower() in self.stablecoin_addresses
+            and len(topics) == 3
+            and topics[0].lower() == TRANSFER_EVENT_TOPIC
+        )
     
     def parse_transfer_log(self, log, tx_hash):
         from_addr = extract_address_from_topic(log["topics"][1])
         to_addr = extract_address_from_topic(log["topics"][2])
-        value = int(log["data"], 16) / 10**USDC_DECIMALS
+        raw_value = int(log["data"], 16)
+        value = raw_value / 10**USDC_DECIMALS
         
         return {
             "tx_hash": tx_hash,
             "from_address": from_addr,
             "to_address": to_addr,
             "value": value,
+            "raw_value": raw_value,
             "block_number": log["blockNumber"],
             "log_index": log["logIndex"],
-            "timestamp": datetime.now()
+            "timestamp": datetime.fromtimestamp(self.clock())
         }
     
     def analyze_transaction_logs(self, logs, tx_hash):
@@ -36,4 +50,41 @@ class TransactionAnalyzer:
                     transfer["block_number"],
                     transfer["log_index"]
                 ))
-        return transfers
\ No newline at end of file
+        return transfers
+    
+    def new_batch(self) -> TransferBatch:
+        return TransferBatch(self.registry.addresses)
+    
+    def decode_transfers(self, logs, batch: Optional[TransferBatch] = None, tx_hash: Optional[str] = None,
+                         block_number: Optional[int] = None, timestamp: Optional[float] = None) -> TransferBatch:
+        """Decode the stablecoin Transfer logs among logs into a TransferBatch.
+        
+        Logs must carry the Transfer signature as topic0 with both parties
+        indexed; Approval and other events from the same contracts are
+        skipped. tx_hash and block_number default to each log's own fields;
+        timestamp (block time in epoch seconds) defaults to the clock.
+        """
+        if batch is None:
+            batch = self.new_batch()
+        if timestamp is None:
+            timestamp = self.clock()
+        stablecoins = self.stablecoin_addresses
+        address_id = self.registry.id_of
+        
+        for log in logs:
+            topics = log.get("topics")
+            if not topics or len(topics) != 3 or log.get("address", "").lower() not in stablecoins:
+                continue
+            topic0 = topics[0]
+            if topic0 != TRANSFER_EVENT_TOPIC and topic0.lower() != TRANSFER_EVENT_TOPIC:
+                continue
+            batch.append(
+                tx_hash or log["transactionHash"],
+                address_id(topics[1]),
+                address_id(topics[2]),
+                int(log["data"], 16),
+                block_number if block_number is not None else int(log["blockNumber"], 16),
+                int(log["logIndex"], 16),
+                timestamp
+            )
+        return batch
@@ -0,0 +1,102 @@
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+from config.settings import USDC_DECIMALS
+
+UINT64_MAX = 2**64 - 1
+
+class TransferBatch:
+    """Decoded stablecoin transfers for a block or block range, stored by column.
+
+    Row i is the transfer (tx_hashes[i], from_ids[i], to_ids[i],
+    raw_amounts[i], block_numbers[i], log_indices[i], timestamps[i]).
+    Addresses are ids into the addresses list of the AddressRegistry the
+    batch was decoded against. Consumers should zip over the columns they need
+    instead of building a dict per transfer; iterating the batch or calling
+    to_dicts() gives the parse_transfer_log shape for callers that want it.
+    """
+
+    __slots__ = ('addresses', 'tx_hashes', 'from_ids', 'to_ids', 'raw_amounts',
+                 'block_numbers', 'log_indices', 'timestamps')
+
+    def __init__(self, addresses: List[str]):
+        self.addresses = addresses
+        self.tx_hashes: List[str] = []
+        self.from_ids = array('I')
+        self.to_ids = array('I')
+        # Switched to a list if an amount does not fit in 64 bits
+        self.raw_amounts = array('Q')
+        self.block_numbers = array('Q')
+        self.log_indices = array('I')
+        self.timestamps = array('d')
+
+    def __len__(self) -> int:
+        return len(self.tx_hashes)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.to_dicts(index, index + 1)[0]
+
+    def append(self, tx_hash: str, from_id: int, to_id: int, raw_amount: int,
+               block_number: int, log_index: int, timestamp: float):
+        if raw_amount > UINT64_MAX and isinstance(self.raw_amounts, array):
+            self.raw_amounts = list(self.raw_amounts)
+        self.tx_hashes.append(tx_hash)
+        self.from_ids.append(from_id)
+        self.to_ids.append(to_id)
+        self.raw_amounts.append(raw_amount)
+        self.block_numbers.append(block_number)
+        self.log_indices.append(log_index)
+        self.timestamps.append(timestamp)
+
+    def extend(self, other: "TransferBatch"):
+        """Append another batch decoded against the same address registry"""
+        if other.addresses is not self.addresses:
+            raise ValueError("Batches use different address registries")
+        if isinstance(other.raw_amounts, list) and isinstance(self.raw_amounts, array):
+            self.raw_amounts = list(self.raw_amounts)
+        self.tx_hashes.extend(other.tx_hashes)
+        self.from_ids.extend(other.from_ids)
+        self.to_ids.extend(other.to_ids)
+        self.raw_amounts.extend(other.raw_amounts)
+        self.block_numbers.extend(other.block_numbers)
+        self.log_indices.extend(other.log_indices)
+        self.timestamps.extend(other.timestamps)
+
+    def slice(self, start: int, stop: int) -> "TransferBatch":
+        """Rows start..stop-1 as a new batch on the same address registry"""
+        batch = TransferBatch(self.addresses)
+        batch.tx_hashes = self.tx_hashes[start:stop]
+        batch.from_ids = self.from_ids[start:stop]
+        batch.to_ids = self.to_ids[start:stop]
+        batch.raw_amounts = self.raw_amounts[start:stop]
+        batch.block_numbers = self.block_numbers[start:stop]
+        batch.log_indices = self.log_indices[start:stop]
+        batch.timestamps = self.timestamps[start:stop]
+        return batch
+
+    def remap(self, addresses: List[str], id_map: List[int]):
+        """Re-point the batch at another registry's addresses list; id_map[old_id] is the new id"""
+        self.from_ids = array('I', map(id_map.__getitem__, self.from_ids))
+        self.to_ids = array('I', map(id_map.__getitem__, self.to_ids))
+        self.addresses = addresses
+
+    def value(self, index: int) -> float:
+        return self.raw_amounts[index] / 10**USDC_DECIMALS
+
+    def to_dicts(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        addresses = self.addresses
+        transfers = []
+        for index in range(start, len(self) if stop is None else stop):
+            raw_value = self.raw_amounts[index]
+            transfers.append({
+                "tx_hash": self.tx_hashes[index],
+                "from_address": addresses[self.from_ids[index]],
+                "to_address": addresses[self.to_ids[index]],
+                "value": raw_value / 10**USDC_DECIMALS,
+                "raw_value": raw_value,
+                "block_number": hex(self.block_numbers[index]),
+                "log_index": hex(self.log_indices[index]),
+                "timestamp": datetime.fromtimestamp(self.timestamps[index])
+            })
+        return transfers
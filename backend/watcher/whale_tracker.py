@@ -1,13 +1,32 @@
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from config.settings import WHALE_SINGLE_TX_THRESHOLD, WHALE_VOLUME_THRESHOLD, WHALE_TIME_WINDOW_MINUTES, EVENT_BUS_ENABLED
-import asyncio
+from typing import Callable, Dict, List, Optional
+from config.settings import (
+    WHALE_SINGLE_TX_THRESHOLD, WHALE_VOLUME_THRESHOLD, WHALE_TIME_WINDOW_MINUTES,
+    WHALE_WINDOW_BUCKET_SECONDS, EVENT_BUS_ENABLED
+)
+from core.address_registry import AddressRegistry, address_registry
+from core.risk_calculator import risk_calculator
 import time
 
 class WhaleTracker:
-    def __init__(self):
-        self.wallet_activity = {}
+    def __init__(self, historical: bool = False, registry: AddressRegistry = address_registry,
+                 clock: Callable[[], float] = time.time):
+        # Historical trackers replay missed blocks; their events are published as
+        # HISTORICAL_WHALE_ACTIVITY at LOW priority instead of live alerts
+        self.historical = historical
+        self.registry = registry
+        # Epoch seconds; a replay injects chain time
+        self.clock = clock
+        # Per-wallet time buckets [bucket_id, amount] in time order, with a running volume sum,
+        # keyed by registry address id (held while the wallet has activity in the window)
+        self.wallet_activity: Dict[int, deque] = {}
+        self.wallet_volumes: Dict[int, float] = {}
+        # Global (bucket_id, wallet_id) queue in creation order, so expiry never scans idle wallets
+        self.expiry_queue = deque()
+        self.bucket_seconds = WHALE_WINDOW_BUCKET_SECONDS
         self.whale_events = []
+        self.risk_calculator = risk_calculator
         self.event_bus = None
         if EVENT_BUS_ENABLED:
             self._initialize_event_bus()
@@ -16,88 +35,106 @@ class WhaleTracker:
         """Initialize event bus connection"""
         try:
             from core.event_bus import event_bus
-            from core.risk_calculator import risk_calculator
             self.event_bus = event_bus
-            self.risk_calculator = risk_calculator
         except ImportError:
             print("Warning: Event bus not available")
             self.event_bus = None
     
+    def _bucket_id(self, timestamp: datetime) -> int:
+        return int(timestamp.timestamp() // self.bucket_seconds)
+    
     def _clean_old_activity(self, current_time: datetime):
+        """Expire buckets that ended before the window start; amortized O(1) per transfer"""
         cutoff_time = current_time - timedelta(minutes=WHALE_TIME_WINDOW_MINUTES)
+        expired_before = self._bucket_id(cutoff_time)
         
-        for wallet in list(self.wallet_activity.keys()):
-            self.wallet_activity[wallet] = [
-                tx for tx in self.wallet_activity[wallet] 
-                if tx['timestamp'] > cutoff_time
-            ]
-            if not self.wallet_activity[wallet]:
-                del self.wallet_activity[wallet]
+        while self.expiry_queue and self.expiry_queue[0][0] < expired_before:
+            _, wallet_id = self.expiry_queue.popleft()
+            buckets = self.wallet_activity[wallet_id]
+            _, amount = buckets.popleft()
+            if buckets:
+                self.wallet_volumes[wallet_id] -= amount
+            else:
+                del self.wallet_activity[wallet_id]
+                del self.wallet_volumes[wallet_id]
+                self.registry.release(wallet_id)
     
-    def _update_wallet_activity(self, wallet_address: str, amount: float, timestamp: datetime, tx_hash: str):
-        if wallet_address not in self.wallet_activity:
-            self.wallet_activity[wallet_address] = []
+    def _update_wallet_activity(self, wallet_id: int, amount: float, timestamp: datetime, tx_hash: str):
+        bucket_id = self._bucket_id(timestamp)
+        buckets = self.wallet_activity.get(wallet_id)
+        if buckets is None:
+            buckets = self.wallet_activity[wallet_id] = deque()
+            self.wallet_volumes[wallet_id] = 0.0
+            self.registry.retain(wallet_id)
         
-        self.wallet_activity[wallet_address].append({
-            'amount': amount,
-            'timestamp': timestamp,
-            'tx_hash': tx_hash
-        })
+        # Late timestamps fold into the newest bucket to keep both queues time-ordered
+        if buckets and bucket_id <= buckets[-1][0]:
+            buckets[-1][1] += amount
+        else:
+            buckets.append([bucket_id, amount])
+            self.expiry_queue.append((bucket_id, wallet_id))
+        self.wallet_volumes[wallet_id] += amount
     
-    def _calculate_wallet_volume(self, wallet_address: str) -> float:
-        if wallet_address not in self.wallet_activity:
-            return 0.0
-        
-        return sum(tx['amount'] for tx in self.wallet_activity[wallet_address])
+    def _calculate_wallet_volume(self, wallet_id: int) -> float:
+        return self.wallet_volumes.get(wallet_id, 0.0)
+    
+    def get_wallet_volume(self, wallet_address: str) -> float:
+        wallet_id = self.registry.get(wallet_address)
+        return 0.0 if wallet_id is None else self._calculate_wallet_volume(wallet_id)
     
-    def _create_whale_event(self, wallet_address: str, tx_hash: str, amount: float, 
+    def _create_whale_event(self, wallet_id: int, tx_hash: str, amount: float, 
                            timestamp: datetime, direction: str, event_type: str) -> Dict:
         return {
-            'wallet_address': wallet_address,
+            'wallet_address': self.registry.addresses[wallet_id],
             'tx_hash': tx_hash,
             'amount': amount,
             'timestamp': timestamp,
             'direction': direction,
             'event_type': event_type,
-            'total_volume': self._calculate_wallet_volume(wallet_address)
+            'total_volume': self._calculate_wallet_volume(wallet_id)
         }
     
-    def analyze_transfer(self, transfer: Dict) -> Optional[Dict]:
-        timestamp = datetime.now()
-        amount = transfer['value']
-        tx_hash = transfer['tx_hash']
-        from_address = transfer['from_address']
-        to_address = transfer['to_address']
-        
+    def analyze_transfer(self, transfer: Dict, timestamp: Optional[datetime] = None) -> Optional[Dict]:
+        return self.analyze(
+            transfer['value'], transfer['tx_hash'],
+            self.registry.id_of(transfer['from_address']), self.registry.id_of(transfer['to_address']),
+            timestamp or datetime.fromtimestamp(self.clock())
+        )
+    
+    def analyze(self, amount: float, tx_hash: str, from_id: int, to_id: int,
+                timestamp: datetime) -> Optional[Dict]:
+        """analyze_transfer on registry address ids, for callers iterating a TransferBatch"""
         self._clean_old_activity(timestamp)
         
         whale_event = None
         
-        self._update_wallet_activity(from_address, amount, timestamp, tx_hash)
-        self._update_wallet_activity(to_address, amount, timestamp, tx_hash)
+        self._update_wallet_activity(from_id, amount, timestamp, tx_hash)
+        self._update_wallet_activity(to_id, amount, timestamp, tx_hash)
         
         if amount >= WHALE_SINGLE_TX_THRESHOLD:
             whale_event = self._create_whale_event(
-                from_address, tx_hash, amount, timestamp, 'outgoing', 'large_transaction'
+                from_id, tx_hash, amount, timestamp, 'outgoing', 'large_transaction'
             )
         else:
-            from_volume = self._calculate_wallet_volume(from_address)
-            to_volume = self._calculate_wallet_volume(to_address)
+            from_volume = self._calculate_wallet_volume(from_id)
+            to_volume = self._calculate_wallet_volume(to_id)
             
             if from_volume >= WHALE_VOLUME_THRESHOLD:
                 whale_event = self._create_whale_event(
-                    from_address, tx_hash, amount, timestamp, 'outgoing', 'high_volume'
+                    from_id, tx_hash, amount, timestamp, 'outgoing', 'high_volume'
                 )
             elif to_volume >= WHALE_VOLUME_THRESHOLD:
                 whale_event = self._create_whale_event(
-                    to_address, tx_hash, amount, timestamp, 'incoming', 'high_volume'
+                    to_id, tx_hash, amount, timestamp, 'incoming', 'high_volume'
                 )
         
         if whale_event:
+            # Scored once here; the event bus and balance monitoring both use it
+            whale_event['priority'] = self.risk_calculator.calculate_whale_priority(whale_event)
             self.whale_events.append(whale_event)
             
             # Publish event to event bus if available
-            if self.event_bus and hasattr(self, 'risk_calculator'):
+            if self.event_bus:
                 self._publish_whale_event(whale_event)
         
         return whale_event
@@ -109,7 +146,7 @@ class WhaleTracker:
         """Publish whale event to event bus"""
         try:
             from core.events import WhaleActivityEventData, EventTypes
-            from core.event_bus import Event
+            from core.event_bus import Event, EventPriority
             
             # Convert whale event to structured data
             event_data = WhaleActivityEventData(
@@ -122,19 +159,18 @@ class WhaleTracker:
                 timestamp=whale_event['timestamp']
             )
             
-            # Calculate priority
-            priority = self.risk_calculator.calculate_whale_priority(whale_event)
+            priority = EventPriority.LOW if self.historical else whale_event['priority']
             
             # Create and publish event
             event = Event(
-                event_type=EventTypes.WHALE_ACTIVITY,
+                event_type=EventTypes.HISTORICAL_WHALE_ACTIVITY if self.historical else EventTypes.WHALE_ACTIVITY,
                 data=event_data.to_dict(),
                 priority=priority,
-                timestamp=time.time()
+                timestamp=self.clock()
             )
             
-            # Schedule async publish (will be handled by event loop)
-            asyncio.create_task(self.event_bus.publish(event))
+            # Enqueue without awaiting; the bus applies its overflow policy
+            self.event_bus.publish_nowait(event)
             
         except Exception as e:
             print(f"Error publishing whale event: {e}")